@@ -0,0 +1,367 @@
+"""
+ECO-MOVE API - Almacén Analítico Embebido
+Copia opcional (SQLite o DuckDB) de las tablas que alimentan los reportes,
+sincronizada de forma incremental con created_at/updated_at para no cargar
+la base transaccional con agregaciones pesadas.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.cache import get_version_datos
+from app.config import get_settings
+from app.models import Alquiler, Cliente, Devolucion, Vehiculo
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# En PostgreSQL current_timestamp es la hora de inicio de la transacción, así que
+# una transacción larga puede confirmar filas con una marca anterior a la última
+# sincronización. Se relee este margen en cada pasada (el upsert es idempotente).
+MARGEN_SINCRONIZACION = timedelta(minutes=5)
+TAMANO_LOTE = 5000
+
+# Vistas en vivo equivalentes a cada reporte
+VISTAS = {
+    "clientes_multiples_alquileres": "v_clientes_multiples_alquileres",
+    "vehiculos_mas_alquilados": "v_vehiculos_mas_alquilados",
+    "alquileres_doble_descuento": "v_alquileres_doble_descuento",
+    "total_recaudado": "v_total_recaudado",
+    "clientes_multa_mayor_deposito": "v_clientes_multa_mayor_deposito",
+}
+
+# Tablas replicadas: (modelo, columnas, columnas monetarias, columnas fecha, marca)
+# Los importes se guardan en centavos enteros para que las sumas sean exactas.
+TABLAS = {
+    "clientes": (
+        Cliente,
+        ["id", "nombre", "apellido", "dni", "es_frecuente"],
+        [],
+        [],
+        "updated_at",
+    ),
+    "vehiculos": (
+        Vehiculo,
+        ["id", "codigo", "nombre"],
+        [],
+        [],
+        "updated_at",
+    ),
+    "alquileres": (
+        Alquiler,
+        [
+            "id", "cliente_id", "vehiculo_id", "fecha_inicio", "fecha_tentativa_devolucion",
+            "dias", "importe", "descuento_uso_extendido", "descuento_cliente_frecuente",
+            "deposito", "total_pagar", "estado",
+        ],
+        ["importe", "descuento_uso_extendido", "descuento_cliente_frecuente", "deposito", "total_pagar"],
+        ["fecha_inicio", "fecha_tentativa_devolucion"],
+        "updated_at",
+    ),
+    "devoluciones": (
+        Devolucion,
+        [
+            "id", "alquiler_id", "fecha_devolucion_real", "dias_mora", "multa",
+            "deposito_devuelto", "monto_adicional", "total_final",
+        ],
+        ["multa", "deposito_devuelto", "monto_adicional", "total_final"],
+        ["fecha_devolucion_real"],
+        "created_at",
+    ),
+}
+
+ESQUEMA = [
+    """CREATE TABLE IF NOT EXISTS clientes (
+        id INTEGER PRIMARY KEY, nombre VARCHAR, apellido VARCHAR, dni VARCHAR, es_frecuente BOOLEAN
+    )""",
+    """CREATE TABLE IF NOT EXISTS vehiculos (
+        id INTEGER PRIMARY KEY, codigo VARCHAR, nombre VARCHAR
+    )""",
+    """CREATE TABLE IF NOT EXISTS alquileres (
+        id INTEGER PRIMARY KEY, cliente_id INTEGER, vehiculo_id INTEGER,
+        fecha_inicio DATE, fecha_tentativa_devolucion DATE, dias INTEGER,
+        importe BIGINT, descuento_uso_extendido BIGINT, descuento_cliente_frecuente BIGINT,
+        deposito BIGINT, total_pagar BIGINT, estado VARCHAR
+    )""",
+    """CREATE TABLE IF NOT EXISTS devoluciones (
+        id INTEGER PRIMARY KEY, alquiler_id INTEGER, fecha_devolucion_real DATE, dias_mora INTEGER,
+        multa BIGINT, deposito_devuelto BIGINT, monto_adicional BIGINT, total_final BIGINT
+    )""",
+    "CREATE TABLE IF NOT EXISTS sincronizacion (tabla VARCHAR PRIMARY KEY, marca VARCHAR)",
+]
+
+# Consultas de reportes sobre la copia: (sql, índices en centavos, índices de fechas).
+# Devuelven las mismas columnas y en el mismo orden que las vistas en vivo.
+CONSULTAS = {
+    "clientes_multiples_alquileres": ("""
+        SELECT c.id, c.nombre, c.apellido, c.dni, COUNT(a.id) AS total_alquileres
+        FROM clientes c
+        JOIN alquileres a ON a.cliente_id = c.id AND a.estado <> 'cancelado'
+        GROUP BY c.id, c.nombre, c.apellido, c.dni
+        HAVING COUNT(a.id) > 1
+        ORDER BY total_alquileres DESC, c.id
+    """, (), ()),
+    "vehiculos_mas_alquilados": ("""
+        SELECT v.id, v.codigo, v.nombre, COUNT(a.id) AS total_alquileres,
+               SUM(a.total_pagar) AS ingresos_generados
+        FROM vehiculos v
+        LEFT JOIN alquileres a ON a.vehiculo_id = v.id AND a.estado <> 'cancelado'
+        GROUP BY v.id, v.codigo, v.nombre
+        ORDER BY total_alquileres DESC, v.id
+    """, (4,), ()),
+    "alquileres_doble_descuento": ("""
+        SELECT a.id, c.nombre || ' ' || c.apellido AS cliente, v.nombre AS vehiculo,
+               a.fecha_inicio, a.fecha_tentativa_devolucion, a.dias, a.importe,
+               a.descuento_uso_extendido, a.descuento_cliente_frecuente, a.total_pagar
+        FROM alquileres a
+        JOIN clientes c ON c.id = a.cliente_id
+        JOIN vehiculos v ON v.id = a.vehiculo_id
+        WHERE a.descuento_uso_extendido > 0 AND a.descuento_cliente_frecuente > 0
+        ORDER BY a.id
+    """, (6, 7, 8, 9), (3, 4)),
+    "total_recaudado": ("""
+        SELECT r.neto AS total_alquileres, r.depositos AS total_depositos, m.multas AS total_multas,
+               COALESCE(r.neto, 0) + COALESCE(r.depositos, 0) + COALESCE(m.multas, 0) AS total_recaudado
+        FROM (
+            SELECT SUM(importe - descuento_uso_extendido - descuento_cliente_frecuente) AS neto,
+                   SUM(deposito) AS depositos
+            FROM alquileres WHERE estado <> 'cancelado'
+        ) r, (SELECT SUM(multa) AS multas FROM devoluciones) m
+    """, (0, 1, 2, 3), ()),
+    "clientes_multa_mayor_deposito": ("""
+        SELECT c.id, c.nombre, c.apellido, c.dni, a.id AS alquiler_id, a.deposito, d.multa, d.monto_adicional
+        FROM devoluciones d
+        JOIN alquileres a ON a.id = d.alquiler_id
+        JOIN clientes c ON c.id = a.cliente_id
+        WHERE d.multa > a.deposito
+        ORDER BY a.id
+    """, (5, 6, 7), ()),
+}
+
+
+def _a_centavos(valor) -> Optional[int]:
+    """Convierte un importe a centavos enteros"""
+    if valor is None:
+        return None
+    return int((Decimal(str(valor)) * 100).to_integral_value())
+
+
+def _desde_centavos(valor) -> Optional[Decimal]:
+    """Convierte centavos enteros a Decimal con dos decimales"""
+    if valor is None:
+        return None
+    return Decimal(int(valor)).scaleb(-2)
+
+
+def _normalizar(valor):
+    """Normaliza un valor para comparar filas de ambas fuentes"""
+    if isinstance(valor, (Decimal, float)):
+        return Decimal(str(valor)).quantize(Decimal("0.01"))
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()[:10]
+    return valor
+
+
+class AlmacenAnalitico:
+    """Copia embebida de las tablas de reportes con sincronización incremental"""
+
+    def __init__(self, backend: str, path: str, intervalo: int):
+        self.backend = backend
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._ultima_sincronizacion = 0.0
+        self._version_sincronizada = None
+        self._conn = self._conectar(backend, path)
+        for ddl in ESQUEMA:
+            self._conn.execute(ddl)
+
+    @staticmethod
+    def _conectar(backend: str, path: str):
+        if backend == "duckdb":
+            try:
+                import duckdb
+            except ImportError as exc:
+                raise RuntimeError("analytics_backend='duckdb' requiere el paquete duckdb") from exc
+            try:
+                return duckdb.connect(path)
+            except duckdb.IOException:
+                # DuckDB admite un solo proceso escritor por archivo: con varios
+                # workers, el primero usa ANALYTICS_PATH y los demás una copia propia
+                return AlmacenAnalitico._conectar_duckdb_propio(duckdb, path)
+        if backend == "sqlite":
+            return sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        raise ValueError(f"analytics_backend no soportado: {backend}")
+
+    @staticmethod
+    def _conectar_duckdb_propio(duckdb, path: str):
+        """Archivo del proceso (ruta.<pid>.ext), que se borra al salir"""
+        raiz, extension = os.path.splitext(path)
+        propio = f"{raiz}.{os.getpid()}{extension}"
+        logger.warning("%s está en uso por otro proceso: este worker usa %s", path, propio)
+
+        def borrar():
+            for archivo in (propio, f"{propio}.wal"):
+                if os.path.exists(archivo):
+                    os.remove(archivo)
+
+        borrar()
+        conn = duckdb.connect(propio)
+        atexit.register(borrar)
+        atexit.register(conn.close)
+        return conn
+
+    # -------------------------------------------------
+    # Sincronización
+    # -------------------------------------------------
+    def _marca(self, tabla: str) -> Optional[datetime]:
+        row = self._conn.execute(
+            "SELECT marca FROM sincronizacion WHERE tabla = ?", [tabla]
+        ).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def _sincronizar_tabla(self, db: Session, tabla: str) -> int:
+        modelo, columnas, dinero, fechas, columna_marca = TABLAS[tabla]
+        marca_col = getattr(modelo, columna_marca)
+        marca = self._marca(tabla)
+
+        stmt = select(*[getattr(modelo, c) for c in columnas], marca_col)
+        if marca is not None:
+            stmt = stmt.where(marca_col >= marca - MARGEN_SINCRONIZACION)
+        stmt = stmt.order_by(marca_col).execution_options(yield_per=TAMANO_LOTE)
+
+        idx_dinero = [columnas.index(c) for c in dinero]
+        idx_fechas = [columnas.index(c) for c in fechas]
+        insertar = (
+            f"INSERT OR REPLACE INTO {tabla} ({', '.join(columnas)}) "
+            f"VALUES ({', '.join('?' for _ in columnas)})"
+        )
+
+        total = 0
+        nueva_marca = marca
+        for lote in db.execute(stmt).partitions():
+            filas = []
+            for row in lote:
+                fila = list(row[:-1])
+                for i in idx_dinero:
+                    fila[i] = _a_centavos(fila[i])
+                for i in idx_fechas:
+                    fila[i] = fila[i].isoformat() if fila[i] is not None else None
+                filas.append(fila)
+                if row[-1] is not None and (nueva_marca is None or row[-1] > nueva_marca):
+                    nueva_marca = row[-1]
+            self._conn.executemany(insertar, filas)
+            total += len(filas)
+
+        if nueva_marca is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sincronizacion (tabla, marca) VALUES (?, ?)",
+                [tabla, nueva_marca.isoformat()],
+            )
+        return total
+
+    def sincronizar(self, db: Session, completa: bool = False) -> dict:
+        """Copia las filas nuevas o modificadas desde la base transaccional"""
+        version = get_version_datos()
+        with self._lock:
+            self._conn.execute("BEGIN TRANSACTION")
+            try:
+                if completa:
+                    for tabla in TABLAS:
+                        self._conn.execute(f"DELETE FROM {tabla}")
+                    self._conn.execute("DELETE FROM sincronizacion")
+
+                resultado = {tabla: self._sincronizar_tabla(db, tabla) for tabla in TABLAS}
+
+                # Los vehículos sin alquileres pueden borrarse y aparecen en el
+                # ranking (LEFT JOIN); la flota es pequeña, se poda por id.
+                ids = [row[0] for row in db.execute(select(Vehiculo.id))]
+                if ids:
+                    self._conn.execute(
+                        f"DELETE FROM vehiculos WHERE id NOT IN ({', '.join('?' for _ in ids)})", ids
+                    )
+                else:
+                    self._conn.execute("DELETE FROM vehiculos")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._ultima_sincronizacion = time.monotonic()
+            self._version_sincronizada = version
+        return resultado
+
+    def _sincronizar_si_vencido(self, db: Session) -> None:
+        # Se sincroniza al cambiar la versión de datos local o, para captar
+        # escrituras de otros procesos, cuando vence el intervalo
+        if (
+            self._version_sincronizada != get_version_datos()
+            or time.monotonic() - self._ultima_sincronizacion >= self.intervalo
+        ):
+            self.sincronizar(db)
+
+    # -------------------------------------------------
+    # Consultas
+    # -------------------------------------------------
+    def _consultar_copia(self, reporte: str) -> list:
+        sql, idx_dinero, idx_fechas = CONSULTAS[reporte]
+        with self._lock:
+            rows = self._conn.execute(sql).fetchall()
+        resultado = []
+        for row in rows:
+            fila = list(row)
+            for i in idx_dinero:
+                fila[i] = _desde_centavos(fila[i])
+            for i in idx_fechas:
+                if isinstance(fila[i], str):
+                    fila[i] = date.fromisoformat(fila[i])
+            resultado.append(tuple(fila))
+        return resultado
+
+    def consultar(self, db: Session, reporte: str) -> list:
+        """Filas del reporte con el mismo orden de columnas que su vista en vivo"""
+        self._sincronizar_si_vencido(db)
+        return self._consultar_copia(reporte)
+
+    def verificar_consistencia(self, db: Session) -> dict:
+        """Compara cada reporte de la copia contra su vista en vivo"""
+        self.sincronizar(db)
+        resultado = {}
+        for reporte, vista in VISTAS.items():
+            vivo = Counter(
+                tuple(_normalizar(v) for v in row)
+                for row in db.execute(text(f"SELECT * FROM {vista}")).fetchall()
+            )
+            copia = Counter(
+                tuple(_normalizar(v) for v in row)
+                for row in self._consultar_copia(reporte)
+            )
+            resultado[reporte] = {
+                "consistente": vivo == copia,
+                "filas_vivo": sum(vivo.values()),
+                "filas_analytics": sum(copia.values()),
+                "solo_en_vivo": sum((vivo - copia).values()),
+                "solo_en_analytics": sum((copia - vivo).values()),
+            }
+        return resultado
+
+
+@lru_cache()
+def get_almacen() -> Optional[AlmacenAnalitico]:
+    """Almacén analítico configurado, o None si está deshabilitado"""
+    if not settings.analytics_backend:
+        return None
+    return AlmacenAnalitico(
+        settings.analytics_backend,
+        settings.analytics_path,
+        settings.analytics_sync_seconds,
+    )
@@ -1,33 +1,45 @@
 """
 ECO-MOVE API - Authentication Utilities
 """
+import json
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.bus import bus
+from app.cache import backend
 from app.config import get_settings
 from app.database import get_db
+from app.metrics import medir_bcrypt
+from app.tracing import trazado
 from app.models import Usuario
 
 settings = get_settings()
 security = HTTPBearer()
 
+# Cualquier cambio de usuario incrementa la generación y deja obsoletos los principales cacheados
+CONTADOR_PRINCIPALES = "generacion_usuarios"
+COLUMNAS_FECHA_USUARIO = ("created_at", "updated_at")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si la contraseña coincide con el hash"""
-    return bcrypt.checkpw(
-        plain_password.encode('utf-8'), 
-        hashed_password.encode('utf-8')
-    )
+    with medir_bcrypt("verify"):
+        return bcrypt.checkpw(
+            plain_password.encode('utf-8'), 
+            hashed_password.encode('utf-8')
+        )
 
 
 def get_password_hash(password: str) -> str:
     """Genera hash de contraseña"""
     salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    with medir_bcrypt("hash"):
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -45,6 +57,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+@trazado("auth.decode_token")
 def decode_token(token: str) -> dict:
     """Decodifica y valida token JWT"""
     try:
@@ -58,12 +71,39 @@ def decode_token(token: str) -> dict:
         )
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Usuario:
-    """Obtiene el usuario actual desde el token"""
-    token = credentials.credentials
+def _guardar_principal(usuario: Usuario, generacion: int) -> None:
+    """Guarda las columnas del usuario en la caché de principales"""
+    datos = {c.key: getattr(usuario, c.key) for c in Usuario.__table__.columns}
+    for columna in COLUMNAS_FECHA_USUARIO:
+        if datos[columna] is not None:
+            datos[columna] = datos[columna].isoformat()
+    datos["guardado"] = time.time()
+    backend.set(f"usuario:{generacion}:{usuario.id}", json.dumps(datos).encode())
+
+
+def _cargar_principal(user_id: int, generacion: int) -> Optional[Usuario]:
+    """
+    Reconstruye el usuario cacheado sin consultar la base, si no supera
+    PRINCIPAL_CACHE_TTL_S. Queda desasociado de la sesión: las consultas de la
+    solicitud siguen viendo las filas frescas y no estos valores.
+    """
+    cuerpo = backend.get(f"usuario:{generacion}:{user_id}")
+    if cuerpo is None:
+        return None
+    datos = json.loads(cuerpo)
+    if time.time() - datos.pop("guardado", 0) > settings.principal_cache_ttl_s:
+        return None
+    for columna in COLUMNAS_FECHA_USUARIO:
+        if datos[columna] is not None:
+            datos[columna] = datetime.fromisoformat(datos[columna])
+    usuario = Usuario(**datos)
+    make_transient_to_detached(usuario)
+    return usuario
+
+
+@trazado("auth.autenticar_token")
+def autenticar_token(token: str, db: Session) -> Usuario:
+    """Valida el token y devuelve el usuario activo al que pertenece"""
     payload = decode_token(token)
     
     user_id = payload.get("sub")
@@ -73,7 +113,14 @@ def get_current_user(
             detail="Token inválido",
         )
     
-    user = db.query(Usuario).filter(Usuario.id == int(user_id)).first()
+    # La generación se lee antes de consultar: si el usuario cambia mientras
+    # tanto, lo guardado queda bajo una generación que ya no se lee
+    generacion = backend.contador(CONTADOR_PRINCIPALES)
+    user = _cargar_principal(int(user_id), generacion)
+    if user is None:
+        user = db.query(Usuario).filter(Usuario.id == int(user_id)).first()
+        if user is not None:
+            _guardar_principal(user, generacion)
     
     if user is None:
         raise HTTPException(
@@ -90,6 +137,15 @@ def get_current_user(
     return user
 
 
+@trazado("auth.get_current_user")
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Usuario:
+    """Obtiene el usuario actual desde el token"""
+    return autenticar_token(credentials.credentials, db)
+
+
 def require_roles(*roles: str):
     """Decorator para requerir roles específicos"""
     def role_checker(current_user: Usuario = Depends(get_current_user)) -> Usuario:
@@ -121,3 +177,15 @@ def get_staff_user(current_user: Usuario = Depends(get_current_user)) -> Usuario
             detail="Se requiere rol de empleado o administrador",
         )
     return current_user
+
+
+def _al_cambiar(evento: dict) -> None:
+    """Invalida los principales cacheados cuando cambia un usuario"""
+    if evento["entidad"] != "usuario":
+        return
+    # Con backend compartido basta con que lo incremente el proceso que escribió
+    if not backend.compartido or evento["origen"] == bus.origen:
+        backend.incrementar(CONTADOR_PRINCIPALES)
+
+
+bus.suscribir(_al_cambiar)
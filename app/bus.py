@@ -0,0 +1,232 @@
+"""
+ECO-MOVE API - Bus de Invalidación
+Las rutas de escritura publican eventos de cambio por entidad; las cachés en
+memoria de cada proceso se suscriben. Backends: "local" (solo este proceso),
+"unix" (sockets Unix entre workers de la misma máquina) y "postgres"
+(LISTEN/NOTIFY, entre instancias).
+"""
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CANAL_POSTGRES = "ecomove_cambios"
+
+# Entidad especial: "todo pudo cambiar" (p. ej. tras perder la conexión del listener)
+TODAS = "*"
+
+
+class BusInvalidacion:
+    """Bus en proceso; los backends distribuidos además reenvían a otros procesos"""
+
+    def __init__(self):
+        self.origen = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._suscriptores: List[Callable[[dict], None]] = []
+
+    def suscribir(self, callback: Callable[[dict], None]) -> None:
+        self._suscriptores.append(callback)
+
+    def publicar(self, entidad: str, id: Optional[int] = None, accion: str = "actualizar", **datos) -> None:
+        """Publica un cambio (llamar después del commit)"""
+        evento = {
+            "entidad": entidad,
+            "id": id,
+            "accion": accion,
+            "datos": datos,
+            "origen": self.origen,
+        }
+        self._despachar(evento)
+        try:
+            self._enviar(evento)
+        except Exception:
+            logger.exception("No se pudo difundir el evento %s", evento)
+
+    def _despachar(self, evento: dict) -> None:
+        for callback in self._suscriptores:
+            try:
+                callback(evento)
+            except Exception:
+                logger.exception("Error en suscriptor del bus para %s", evento)
+
+    def _recibir(self, mensaje) -> None:
+        evento = json.loads(mensaje)
+        if evento.get("origen") != self.origen:
+            self._despachar(evento)
+
+    def _enviar(self, evento: dict) -> None:
+        pass
+
+    def iniciar(self) -> None:
+        pass
+
+    def detener(self) -> None:
+        pass
+
+
+class _BusConListener(BusInvalidacion, ABC):
+    """Base para backends que reciben eventos remotos en un hilo propio"""
+
+    def __init__(self):
+        super().__init__()
+        self._detenido = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        if self._hilo is None:
+            self._detenido.clear()
+            self._hilo = threading.Thread(target=self._escuchar, name="bus-invalidacion", daemon=True)
+            self._hilo.start()
+
+    def detener(self) -> None:
+        self._detenido.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+    @abstractmethod
+    def _escuchar(self) -> None:
+        """Recibe eventos remotos hasta que se llame a detener()"""
+
+
+class BusUnix(_BusConListener):
+    """Un socket datagrama por proceso en un directorio compartido (pruebas locales / una máquina)"""
+
+    def __init__(self, directorio: str):
+        super().__init__()
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.ruta = self.directorio / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock"
+        self._socket: Optional[socket.socket] = None
+        self._emisor = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # Un receptor lento no debe bloquear la petición que publica
+        self._emisor.setblocking(False)
+
+    def iniciar(self) -> None:
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._socket.bind(str(self.ruta))
+        super().iniciar()
+
+    def _enviar(self, evento: dict) -> None:
+        mensaje = json.dumps(evento).encode()
+        for ruta in self.directorio.glob("*.sock"):
+            if ruta == self.ruta:
+                continue
+            try:
+                self._emisor.sendto(mensaje, str(ruta))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket de un proceso que ya terminó
+                ruta.unlink(missing_ok=True)
+            except BlockingIOError:
+                logger.warning("Cola llena en %s; evento descartado", ruta)
+
+    def _escuchar(self) -> None:
+        self._socket.settimeout(1.0)
+        while not self._detenido.is_set():
+            try:
+                mensaje = self._socket.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                self._recibir(mensaje)
+            except Exception:
+                logger.exception("Mensaje inválido en el bus")
+
+    def detener(self) -> None:
+        super().detener()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        self.ruta.unlink(missing_ok=True)
+
+
+class BusPostgres(_BusConListener):
+    """NOTIFY al publicar y una conexión dedicada en LISTEN por proceso"""
+
+    def _enviar(self, evento: dict) -> None:
+        from sqlalchemy import text
+        from app.database import engine
+
+        with engine.connect() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:canal, :mensaje)"),
+                {"canal": CANAL_POSTGRES, "mensaje": json.dumps(evento)},
+            )
+            conn.commit()
+
+    def _conectar(self):
+        from app.database import engine
+
+        # Conexión fuera del pool: queda en LISTEN durante toda la vida del proceso
+        conexion = engine.raw_connection()
+        conexion.detach()
+        dbapi = conexion.dbapi_connection
+        dbapi.autocommit = True
+        with dbapi.cursor() as cursor:
+            cursor.execute(f"LISTEN {CANAL_POSTGRES}")
+        return dbapi
+
+    def _escuchar(self) -> None:
+        espera = 1.0
+        primera = True
+        while not self._detenido.is_set():
+            try:
+                dbapi = self._conectar()
+            except Exception:
+                logger.exception("No se pudo abrir el listener del bus; reintento en %.0fs", espera)
+                self._detenido.wait(espera)
+                espera = min(espera * 2, 30.0)
+                continue
+
+            espera = 1.0
+            if not primera:
+                # Pudieron perderse eventos mientras no había conexión
+                self._despachar({"entidad": TODAS, "id": None, "accion": "reconectar", "datos": {}, "origen": self.origen})
+            primera = False
+
+            try:
+                while not self._detenido.is_set():
+                    if select.select([dbapi], [], [], 1.0) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        notificacion = dbapi.notifies.pop(0)
+                        try:
+                            self._recibir(notificacion.payload)
+                        except Exception:
+                            logger.exception("Mensaje inválido en el bus")
+            except Exception:
+                logger.exception("Se perdió la conexión del listener del bus")
+            finally:
+                try:
+                    dbapi.close()
+                except Exception:
+                    pass
+            time.sleep(0.1)
+
+
+def _crear_bus() -> BusInvalidacion:
+    if settings.cache_bus_backend == "unix":
+        return BusUnix(settings.cache_bus_unix_dir)
+    if settings.cache_bus_backend == "postgres":
+        return BusPostgres()
+    if settings.cache_bus_backend == "local":
+        return BusInvalidacion()
+    raise ValueError(f"cache_bus_backend no soportado: {settings.cache_bus_backend}")
+
+
+bus = _crear_bus()
@@ -0,0 +1,159 @@
+"""
+ECO-MOVE API - Caché de Respuestas
+Contador global de versión de datos y caché de respuestas serializadas por versión,
+sobre el backend configurado (por proceso o compartido entre workers), y
+validadores condicionales (ETag / Last-Modified) de recursos individuales.
+"""
+import struct
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from app.bus import TODAS, bus
+from app.cache_backends import BackendCache, get_backend_cache
+
+CONTADOR_VERSION = "version_datos"
+
+backend = get_backend_cache()
+
+
+def get_version_datos() -> int:
+    """Versión actual de los datos de negocio"""
+    return backend.contador(CONTADOR_VERSION)
+
+
+def incrementar_version_datos() -> int:
+    """Marca que los datos cambiaron (llamar después de cada commit de escritura)"""
+    return backend.incrementar(CONTADOR_VERSION)
+
+
+def etag_version(version: int) -> str:
+    """ETag débil para una versión de datos"""
+    # La época del backend evita que un ETag emitido antes de un reinicio
+    # coincida con una versión posterior distinta
+    return f'W/"{backend.epoca}-{version}"'
+
+
+class CacheRespuestas:
+    """Cuerpos JSON ya serializados, válidos para una versión de datos"""
+
+    VERSION = struct.Struct("<q")
+
+    def __init__(self, backend: BackendCache, prefijo: str):
+        self.backend = backend
+        self.prefijo = prefijo
+
+    def get(self, clave: str, version: int) -> Optional[bytes]:
+        entrada = self.backend.get(self.prefijo + clave)
+        if entrada is None or self.VERSION.unpack_from(entrada)[0] != version:
+            return None
+        return entrada[self.VERSION.size:]
+
+    def set(self, clave: str, version: int, cuerpo: bytes) -> None:
+        self.backend.set(self.prefijo + clave, self.VERSION.pack(version) + cuerpo)
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Evalúa un encabezado If-None-Match (comparación débil)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    objetivo = etag.removeprefix("W/")
+    return any(
+        candidato.strip().removeprefix("W/") == objetivo
+        for candidato in if_none_match.split(",")
+    )
+
+
+def _utc(marca: datetime) -> datetime:
+    # SQLite devuelve TIMESTAMP sin zona: se guarda en UTC
+    return marca if marca.tzinfo else marca.replace(tzinfo=timezone.utc)
+
+
+def etag_recurso(id: int, updated_at: datetime, fuerte: bool = False) -> str:
+    """
+    ETag derivado de updated_at. Fuerte para los recursos que aceptan If-Match
+    (su JSON depende solo de la fila y no se comprime); débil para el resto.
+    """
+    etag = f'"{id}-{int(_utc(updated_at).timestamp() * 1_000_000)}"'
+    return etag if fuerte else f"W/{etag}"
+
+
+def etag_coincide_fuerte(if_match: Optional[str], etag: str) -> bool:
+    """Evalúa un encabezado If-Match (comparación fuerte: un ETag débil nunca coincide)"""
+    if not if_match:
+        return False
+    if if_match.strip() == "*":
+        return True
+    if not etag or etag.startswith("W/"):
+        return False
+    return any(candidato.strip() == etag for candidato in if_match.split(","))
+
+
+def validadores(id: int, updated_at: Optional[datetime], fuerte: bool = False) -> dict:
+    """Encabezados ETag / Last-Modified de un recurso (vacío si no tiene updated_at)"""
+    if updated_at is None:
+        return {}
+    return {
+        "ETag": etag_recurso(id, updated_at, fuerte),
+        "Last-Modified": format_datetime(_utc(updated_at).astimezone(timezone.utc), usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+def es_condicional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def no_modificado(
+    request: Request, id: int, updated_at: Optional[datetime], fuerte: bool = False
+) -> Optional[Response]:
+    """Respuesta 304 si la copia del cliente sigue vigente (If-None-Match tiene prioridad)"""
+    if updated_at is None:
+        return None
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        vigente = etag_coincide(if_none_match, etag_recurso(id, updated_at, fuerte))
+    else:
+        try:
+            desde = parsedate_to_datetime(request.headers.get("if-modified-since", ""))
+        except (TypeError, ValueError):
+            return None
+        vigente = _utc(updated_at).replace(microsecond=0) <= _utc(desde)
+    if not vigente:
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validadores(id, updated_at, fuerte))
+
+
+def verificar_if_match(request: Request, id: int, updated_at: Optional[datetime]) -> None:
+    """412 si el cliente envió If-Match y el recurso cambió desde que lo leyó (RFC 9110: comparación fuerte)"""
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return
+    etag = etag_recurso(id, updated_at, fuerte=True) if updated_at is not None else ""
+    if not etag_coincide_fuerte(if_match, etag):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="El recurso fue modificado por otra solicitud; vuelva a obtenerlo"
+        )
+
+
+cache_reportes = CacheRespuestas(backend, "reporte:")
+
+
+def _al_cambiar(evento: dict) -> None:
+    """Cualquier cambio de datos de negocio invalida los reportes"""
+    if evento["entidad"] == TODAS:
+        # Se perdieron eventos: nada de lo cacheado es confiable
+        backend.limpiar()
+    if evento["entidad"] == "usuario":
+        return
+    # Con backend compartido basta con que lo incremente el proceso que escribió
+    if not backend.compartido or evento["origen"] == bus.origen:
+        incrementar_version_datos()
+
+
+bus.suscribir(_al_cambiar)
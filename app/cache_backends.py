@@ -0,0 +1,307 @@
+"""
+ECO-MOVE API - Backends de Caché
+Almacenamiento clave -> bytes detrás de una misma API: LRU en el proceso o un
+archivo mapeado en memoria compartido por todos los workers de la máquina.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class BackendCache(ABC):
+    """Interfaz común de los backends de caché"""
+
+    # True si el contenido es visible para otros procesos
+    compartido = False
+
+    @property
+    @abstractmethod
+    def epoca(self) -> str:
+        """Identifica la vida del almacenamiento (cambia si se reinicia/recrea)"""
+
+    @abstractmethod
+    def get(self, clave: str) -> Optional[bytes]:
+        """Valor guardado o None si no está (o fue desalojado)"""
+
+    @abstractmethod
+    def set(self, clave: str, valor: bytes) -> None:
+        """Guarda o reemplaza el valor de la clave"""
+
+    @abstractmethod
+    def delete(self, clave: str) -> None:
+        """Quita la clave si existe"""
+
+    @abstractmethod
+    def limpiar(self) -> None:
+        """Descarta todas las entradas (los contadores se conservan)"""
+
+    @abstractmethod
+    def contador(self, nombre: str) -> int:
+        """Valor de un contador; los contadores nunca se desalojan"""
+
+    @abstractmethod
+    def incrementar(self, nombre: str) -> int:
+        """Incrementa el contador y devuelve el valor nuevo"""
+
+
+class CacheLRU(BackendCache):
+    """LRU en memoria del proceso"""
+
+    def __init__(self, max_entradas: int = 1024):
+        self.max_entradas = max_entradas
+        self._epoca = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, bytes]" = OrderedDict()
+        self._contadores: Dict[str, int] = {}
+
+    @property
+    def epoca(self) -> str:
+        return self._epoca
+
+    def get(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is not None:
+                self._entradas.move_to_end(clave)
+            return valor
+
+    def set(self, clave: str, valor: bytes) -> None:
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def delete(self, clave: str) -> None:
+        with self._lock:
+            self._entradas.pop(clave, None)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def contador(self, nombre: str) -> int:
+        return self._contadores.get(nombre, 0)
+
+    def incrementar(self, nombre: str) -> int:
+        with self._lock:
+            valor = self._contadores.get(nombre, 0) + 1
+            self._contadores[nombre] = valor
+            return valor
+
+
+# Formato del archivo compartido (little-endian):
+#   cabecera   magic, versión, nº de buckets, tamaño de datos, cabeza, época y contadores
+#   buckets    (hash, posición + 1, longitud) por bucket; posición 0 = vacío
+#   datos      búfer circular de registros (long. clave, long. valor, clave, valor)
+MAGIC = b"ECOCACHE"
+VERSION_FORMATO = 1
+CABECERA = struct.Struct("<8sIIQQ8s")
+CONTADOR = struct.Struct("<Qq")
+BUCKET = struct.Struct("<QQI4x")
+REGISTRO = struct.Struct("<II")
+MAX_CONTADORES = 32
+TAMANO_CABECERA = 4096
+SONDEOS = 8
+
+OFFSET_CABEZA = 24
+OFFSET_CONTADORES = CABECERA.size
+
+
+def _hash(texto: str) -> int:
+    # 0 queda reservado para "sin uso"
+    return int.from_bytes(hashlib.blake2b(texto.encode(), digest_size=8).digest(), "little") or 1
+
+
+class CacheMemoriaCompartida(BackendCache):
+    """
+    Caché en un archivo mapeado (p. ej. en /dev/shm) compartido entre procesos.
+    Los valores se escriben en un búfer circular: las entradas más antiguas se
+    sobrescriben solas, sin recolección. Los accesos se serializan con un lock
+    POSIX sobre el archivo (entre procesos) y un lock de hilo (dentro del proceso).
+    """
+
+    compartido = True
+
+    def __init__(self, ruta: str, tamano: int, buckets: int = 16384):
+        self.ruta = ruta
+        self.buckets = buckets
+        self.tamano_datos = tamano
+        self._offset_datos = TAMANO_CABECERA + buckets * BUCKET.size
+        self._tamano_total = self._offset_datos + tamano
+        self._lock = threading.Lock()
+
+        self._fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._bloqueo(exclusivo=True):
+            if os.fstat(self._fd).st_size != self._tamano_total or not self._cabecera_valida():
+                self._inicializar()
+            self._mapa = mmap.mmap(self._fd, self._tamano_total)
+
+    def _cabecera_valida(self) -> bool:
+        cabecera = os.pread(self._fd, CABECERA.size, 0)
+        if len(cabecera) < CABECERA.size:
+            return False
+        magic, version, buckets, tamano, _, _ = CABECERA.unpack(cabecera)
+        return (magic, version, buckets, tamano) == (MAGIC, VERSION_FORMATO, self.buckets, self.tamano_datos)
+
+    def _inicializar(self) -> None:
+        # Truncar a 0 y volver a crecer deja todos los buckets y contadores en cero
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, self._tamano_total)
+        epoca = uuid.uuid4().hex[:8].encode()
+        os.pwrite(self._fd, CABECERA.pack(MAGIC, VERSION_FORMATO, self.buckets, self.tamano_datos, 0, epoca), 0)
+
+    @contextmanager
+    def _bloqueo(self, exclusivo: bool):
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    @property
+    def epoca(self) -> str:
+        return CABECERA.unpack_from(self._mapa, 0)[5].decode()
+
+    def _cabeza(self) -> int:
+        return struct.unpack_from("<Q", self._mapa, OFFSET_CABEZA)[0]
+
+    def _offset_bucket(self, indice: int) -> int:
+        return TAMANO_CABECERA + indice * BUCKET.size
+
+    def _vigente(self, posicion: int, cabeza: int) -> bool:
+        """Un registro sigue vivo mientras el búfer no haya dado la vuelta sobre él"""
+        return posicion > 0 and posicion - 1 >= cabeza - self.tamano_datos
+
+    def _buscar(self, clave: str, h: int):
+        """(offset del bucket, posición, longitud) de la clave, o None"""
+        cabeza = self._cabeza()
+        inicio = h % self.buckets
+        for paso in range(SONDEOS):
+            offset = self._offset_bucket((inicio + paso) % self.buckets)
+            hash_bucket, posicion, longitud = BUCKET.unpack_from(self._mapa, offset)
+            if hash_bucket != h or not self._vigente(posicion, cabeza):
+                continue
+            base = self._offset_datos + (posicion - 1) % self.tamano_datos
+            largo_clave, _ = REGISTRO.unpack_from(self._mapa, base)
+            inicio_clave = base + REGISTRO.size
+            if self._mapa[inicio_clave:inicio_clave + largo_clave] == clave.encode():
+                return offset, posicion, longitud
+        return None
+
+    def get(self, clave: str) -> Optional[bytes]:
+        h = _hash(clave)
+        with self._bloqueo(exclusivo=False):
+            encontrado = self._buscar(clave, h)
+            if encontrado is None:
+                return None
+            _, posicion, _ = encontrado
+            base = self._offset_datos + (posicion - 1) % self.tamano_datos
+            largo_clave, largo_valor = REGISTRO.unpack_from(self._mapa, base)
+            inicio = base + REGISTRO.size + largo_clave
+            return bytes(self._mapa[inicio:inicio + largo_valor])
+
+    def set(self, clave: str, valor: bytes) -> None:
+        clave_bytes = clave.encode()
+        longitud = REGISTRO.size + len(clave_bytes) + len(valor)
+        if longitud > self.tamano_datos // 4:
+            # Demasiado grande: desplazaría buena parte de la caché
+            self.delete(clave)
+            return
+
+        h = _hash(clave)
+        with self._bloqueo(exclusivo=True):
+            # Se busca antes de escribir: el registro nuevo puede pisar al anterior
+            encontrado = self._buscar(clave, h)
+            cabeza = self._cabeza()
+            # Los registros no se parten al final del búfer
+            hueco = self.tamano_datos - cabeza % self.tamano_datos
+            if longitud > hueco:
+                cabeza += hueco
+            base = self._offset_datos + cabeza % self.tamano_datos
+            REGISTRO.pack_into(self._mapa, base, len(clave_bytes), len(valor))
+            inicio = base + REGISTRO.size
+            self._mapa[inicio:inicio + len(clave_bytes)] = clave_bytes
+            self._mapa[inicio + len(clave_bytes):inicio + len(clave_bytes) + len(valor)] = valor
+            nueva_cabeza = cabeza + longitud
+
+            if encontrado is not None:
+                offset = encontrado[0]
+            else:
+                offset = self._elegir_bucket(h, nueva_cabeza)
+            BUCKET.pack_into(self._mapa, offset, h, cabeza + 1, longitud)
+            struct.pack_into("<Q", self._mapa, OFFSET_CABEZA, nueva_cabeza)
+
+    def _elegir_bucket(self, h: int, cabeza: int) -> int:
+        """Primer bucket libre o vencido de la secuencia de sondeo; si no, el más antiguo"""
+        inicio = h % self.buckets
+        mas_antiguo = None
+        for paso in range(SONDEOS):
+            offset = self._offset_bucket((inicio + paso) % self.buckets)
+            _, posicion, _ = BUCKET.unpack_from(self._mapa, offset)
+            if not self._vigente(posicion, cabeza):
+                return offset
+            if mas_antiguo is None or posicion < mas_antiguo[1]:
+                mas_antiguo = (offset, posicion)
+        return mas_antiguo[0]
+
+    def delete(self, clave: str) -> None:
+        h = _hash(clave)
+        with self._bloqueo(exclusivo=True):
+            encontrado = self._buscar(clave, h)
+            if encontrado is not None:
+                BUCKET.pack_into(self._mapa, encontrado[0], 0, 0, 0)
+
+    def limpiar(self) -> None:
+        with self._bloqueo(exclusivo=True):
+            self._mapa[TAMANO_CABECERA:self._offset_datos] = bytes(self._offset_datos - TAMANO_CABECERA)
+
+    def _offset_contador(self, nombre: str, crear: bool) -> Optional[int]:
+        h = _hash(nombre)
+        for indice in range(MAX_CONTADORES):
+            offset = OFFSET_CONTADORES + indice * CONTADOR.size
+            hash_contador, _ = CONTADOR.unpack_from(self._mapa, offset)
+            if hash_contador == h:
+                return offset
+            if hash_contador == 0:
+                if not crear:
+                    return None
+                CONTADOR.pack_into(self._mapa, offset, h, 0)
+                return offset
+        raise RuntimeError("No quedan contadores libres en la caché compartida")
+
+    def contador(self, nombre: str) -> int:
+        with self._bloqueo(exclusivo=False):
+            offset = self._offset_contador(nombre, crear=False)
+            return CONTADOR.unpack_from(self._mapa, offset)[1] if offset is not None else 0
+
+    def incrementar(self, nombre: str) -> int:
+        with self._bloqueo(exclusivo=True):
+            offset = self._offset_contador(nombre, crear=True)
+            h, valor = CONTADOR.unpack_from(self._mapa, offset)
+            CONTADOR.pack_into(self._mapa, offset, h, valor + 1)
+            return valor + 1
+
+
+@lru_cache()
+def get_backend_cache() -> BackendCache:
+    """Backend configurado en CACHE_BACKEND ("local" o "shm")"""
+    if settings.cache_backend == "shm":
+        return CacheMemoriaCompartida(settings.cache_shm_path, settings.cache_shm_mb * 1024 * 1024)
+    if settings.cache_backend == "local":
+        return CacheLRU()
+    raise ValueError(f"cache_backend no soportado: {settings.cache_backend}")
@@ -0,0 +1,171 @@
+"""
+ECO-MOVE API - Captura de Tráfico
+Registra metadatos saneados de cada solicitud (plantilla de ruta, parámetros,
+forma del cuerpo, tiempo, estado y rol) en un JSONL de solo agregado, para
+reproducir la mezcla real con benchmarks/reproducir.py. Con CAPTURE_ENABLED=false
+el middleware no se instala.
+"""
+import json
+import queue
+import re
+import threading
+import time
+from urllib.parse import parse_qsl
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+
+from app.config import get_settings
+from app.metrics import SIN_RUTA, plantilla_ruta
+
+settings = get_settings()
+
+# Parámetros (de ruta, query o cuerpo) cuyo valor nunca se guarda
+PARAMETROS_SENSIBLES = {
+    "q", "dni", "email", "nombre", "apellido", "telefono", "direccion", "fecha_nacimiento",
+}
+
+# Cualquier parámetro cuyo nombre contenga alguno de estos textos es una credencial
+# (password, old_password, access_token, jwt_secret...) y tampoco se guarda
+FRAGMENTOS_CREDENCIALES = ("password", "token", "secret")
+
+# Rutas que no son tráfico de usuarios
+RUTAS_EXCLUIDAS = ("/metrics",)
+
+# Cuerpos más grandes solo se registran por tamaño
+MAX_CUERPO = 64 * 1024
+
+# Fechas y fechas-hora ISO: no son datos personales y la reproducción las necesita
+_FECHA = re.compile(r"^\d{4}-\d{2}-\d{2}([T ][\d:.]+(Z|[+-]\d{2}:?\d{2})?)?$")
+
+
+def enmascarar(valor: str) -> str:
+    """Texto del mismo largo sin el contenido original"""
+    return "*" * len(valor)
+
+
+def es_sensible(clave) -> bool:
+    """Si el valor del parámetro se enmascara (datos personales o credenciales)"""
+    if not isinstance(clave, str):
+        return False
+    clave = clave.lower()
+    return clave in PARAMETROS_SENSIBLES or any(fragmento in clave for fragmento in FRAGMENTOS_CREDENCIALES)
+
+
+def forma(valor, clave: str = None):
+    """Estructura del cuerpo: números, booleanos y fechas se conservan; el texto se reduce a su largo"""
+    if isinstance(valor, dict):
+        return {k: forma(v, k) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [forma(v, clave) for v in valor]
+    if es_sensible(clave):
+        return "<fecha>" if isinstance(valor, str) and _FECHA.match(valor) else f"<str:{len(str(valor))}>"
+    if isinstance(valor, str):
+        return valor if _FECHA.match(valor) else f"<str:{len(valor)}>"
+    return valor
+
+
+def _saneados(pares) -> list:
+    return [[k, enmascarar(v) if es_sensible(k) else v] for k, v in pares]
+
+
+def rol_token(headers: Headers) -> str:
+    """Rol del token (sin consultar la base); anonimo si no hay token"""
+    esquema, _, token = headers.get("authorization", "").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return "anonimo"
+    try:
+        return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]).get("rol", "desconocido")
+    except JWTError:
+        return "invalido"
+
+
+class _Escritor:
+    """Agrega los registros al archivo desde un hilo aparte"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._cola: "queue.SimpleQueue[dict]" = queue.SimpleQueue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def escribir(self, registro: dict) -> None:
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._escribir, name="captura-trafico", daemon=True)
+                    self._hilo.start()
+        self._cola.put(registro)
+
+    def _escribir(self) -> None:
+        with open(self.ruta, "a", encoding="utf-8") as archivo:
+            while True:
+                registro = self._cola.get()
+                archivo.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+                if self._cola.empty():
+                    archivo.flush()
+
+
+escritor = _Escritor(settings.capture_path)
+
+
+class CapturaMiddleware:
+    """Registra cada solicitud al terminar (el cuerpo se lee mientras la app lo consume)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in RUTAS_EXCLUIDAS:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.time()
+        cuerpo = bytearray()
+        tamano = 0
+        estado = 500
+
+        async def recibir():
+            nonlocal tamano
+            message = await receive()
+            if message["type"] == "http.request":
+                parte = message.get("body", b"")
+                tamano += len(parte)
+                if tamano <= MAX_CUERPO:
+                    cuerpo.extend(parte)
+            return message
+
+        async def enviar(message):
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, recibir, enviar)
+        finally:
+            ruta = plantilla_ruta(scope)
+            if ruta != SIN_RUTA:
+                escritor.escribir(self._registro(scope, ruta, inicio, estado, cuerpo, tamano))
+
+    @staticmethod
+    def _registro(scope, ruta: str, inicio: float, estado: int, cuerpo: bytearray, tamano: int) -> dict:
+        headers = Headers(scope=scope)
+        registro = {
+            "t": round(inicio, 6),
+            "ms": round((time.time() - inicio) * 1000, 3),
+            "metodo": scope["method"],
+            "ruta": ruta,
+            "path_params": dict(_saneados((k, str(v)) for k, v in scope.get("path_params", {}).items())),
+            "query": _saneados(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)),
+            "rol": rol_token(headers),
+            "estado": estado,
+        }
+        if tamano:
+            registro["bytes"] = tamano
+            if tamano <= MAX_CUERPO and "json" in headers.get("content-type", ""):
+                try:
+                    registro["cuerpo"] = forma(json.loads(cuerpo))
+                except ValueError:
+                    pass
+        return registro
@@ -0,0 +1,107 @@
+"""
+ECO-MOVE API - Catálogo de Vehículos en Memoria
+Snapshot de la flota con índices por id, código y estado y JSON ya serializado
+por vista. Se invalida con los eventos de vehículos del bus de invalidación.
+"""
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.bus import TODAS, bus
+from app.models import Vehiculo
+from app.schemas import VehiculoResponse
+
+MAX_VISTAS = 64
+
+
+class _Snapshot:
+    """Estado inmutable del catálogo en un momento dado"""
+
+    def __init__(self, vehiculos: List[Vehiculo]):
+        self.ids: List[int] = []
+        self.json_por_id: Dict[int, bytes] = {}
+        self.id_por_codigo: Dict[str, int] = {}
+        self.updated_por_id: Dict[int, Optional[datetime]] = {}
+        self.ids_por_estado: Dict[str, List[int]] = {}
+        self.vistas: Dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+        for vehiculo in vehiculos:
+            self.ids.append(vehiculo.id)
+            self.json_por_id[vehiculo.id] = VehiculoResponse.model_validate(vehiculo).model_dump_json().encode()
+            self.id_por_codigo[vehiculo.codigo] = vehiculo.id
+            self.updated_por_id[vehiculo.id] = vehiculo.updated_at
+            self.ids_por_estado.setdefault(vehiculo.estado, []).append(vehiculo.id)
+
+    def lista(self, estado: Optional[str] = None, skip: int = 0, limit: Optional[int] = None) -> bytes:
+        """Arreglo JSON de la vista pedida, compuesto a partir del JSON de cada vehículo"""
+        clave = (estado, skip, limit)
+        cuerpo = self.vistas.get(clave)
+        if cuerpo is not None:
+            return cuerpo
+
+        ids = self.ids_por_estado.get(estado, []) if estado else self.ids
+        ids = ids[skip:skip + limit] if limit is not None else ids[skip:]
+        cuerpo = b"[" + b",".join(self.json_por_id[i] for i in ids) + b"]"
+
+        with self._lock:
+            if len(self.vistas) < MAX_VISTAS:
+                self.vistas[clave] = cuerpo
+        return cuerpo
+
+    def por_id(self, vehiculo_id: int) -> Optional[bytes]:
+        return self.json_por_id.get(vehiculo_id)
+
+    def por_codigo(self, codigo: str) -> Optional[bytes]:
+        vehiculo_id = self.id_por_codigo.get(codigo)
+        return self.json_por_id.get(vehiculo_id) if vehiculo_id is not None else None
+
+    def por_claves(self, claves: List, buscar) -> bytes:
+        """Objeto JSON {clave: vehículo|null} para un lote de ids o códigos"""
+        partes = []
+        for clave in claves:
+            cuerpo = buscar(clave)
+            partes.append(json.dumps(str(clave)).encode() + b":" + (cuerpo if cuerpo is not None else b"null"))
+        return b"{" + b",".join(partes) + b"}"
+
+
+class CatalogoVehiculos:
+    """Catálogo cacheado; se reconstruye con una sola consulta tras cada invalidación"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._generacion = 0
+
+    def snapshot(self, db: Session) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        generacion = self._generacion
+        snapshot = _Snapshot(db.query(Vehiculo).order_by(Vehiculo.id).all())
+        with self._lock:
+            # Si hubo una escritura mientras se cargaba, no se instala el snapshot
+            if generacion == self._generacion:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidar(self) -> None:
+        """Descarta el snapshot (llamar después del commit de la escritura)"""
+        with self._lock:
+            self._generacion += 1
+            self._snapshot = None
+
+
+catalogo = CatalogoVehiculos()
+
+
+def _al_cambiar(evento: dict) -> None:
+    if evento["entidad"] in ("vehiculo", TODAS):
+        catalogo.invalidar()
+
+
+bus.suscribir(_al_cambiar)
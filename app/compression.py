@@ -0,0 +1,281 @@
+"""
+ECO-MOVE API - Compresión de Respuestas
+Middleware ASGI que negocia gzip / br / zstd con Accept-Encoding. Brotli y zstd son
+opcionales (paquetes brotli y zstandard). Los cuerpos inmutables marcados como
+precomprimibles se comprimen una sola vez, al nivel máximo, y se sirven de caché.
+"""
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import get_settings
+
+settings = get_settings()
+
+MAX_PRECOMPRIMIDAS = 64
+
+TIPOS_COMPRIMIBLES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "application/vnd.apache.arrow.stream")
+TIPOS_EXCLUIDOS = ("text/event-stream",)
+
+
+class _Codec:
+    """Compresión de un cuerpo completo o por trozos para un Content-Encoding"""
+
+    def __init__(self, nombre: str, completo: Callable[[bytes, bool], bytes], por_trozos: Callable[[], tuple]):
+        self.nombre = nombre
+        self._completo = completo
+        self._por_trozos = por_trozos
+
+    def comprimir(self, cuerpo: bytes, maximo: bool = False) -> bytes:
+        return self._completo(cuerpo, maximo)
+
+    def compresor(self):
+        """(comprimir_trozo, finalizar)"""
+        return self._por_trozos()
+
+
+def _gzip() -> _Codec:
+    def completo(cuerpo, maximo):
+        compresor = zlib.compressobj(9 if maximo else 6, zlib.DEFLATED, 31)
+        return compresor.compress(cuerpo) + compresor.flush()
+
+    def por_trozos():
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return (
+            lambda trozo: compresor.compress(trozo) + compresor.flush(zlib.Z_SYNC_FLUSH),
+            compresor.flush,
+        )
+    return _Codec("gzip", completo, por_trozos)
+
+
+def _brotli() -> Optional[_Codec]:
+    try:
+        import brotli
+    except ImportError:
+        return None
+
+    def por_trozos():
+        compresor = brotli.Compressor(quality=4)
+        return (
+            lambda trozo: compresor.process(trozo) + compresor.flush(),
+            compresor.finish,
+        )
+    return _Codec("br", lambda cuerpo, maximo: brotli.compress(cuerpo, quality=11 if maximo else 4), por_trozos)
+
+
+def _zstd() -> Optional[_Codec]:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+
+    def por_trozos():
+        compresor = zstandard.ZstdCompressor(level=3).compressobj()
+        return (
+            lambda trozo: compresor.compress(trozo) + compresor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compresor.flush,
+        )
+    return _Codec(
+        "zstd",
+        lambda cuerpo, maximo: zstandard.ZstdCompressor(level=19 if maximo else 3).compress(cuerpo),
+        por_trozos
+    )
+
+
+CODECS = {"gzip": _gzip, "br": _brotli, "zstd": _zstd}
+
+
+def codecs_disponibles(nombres: Iterable[str]) -> Dict[str, _Codec]:
+    """Codecs configurados que están instalados, en orden de preferencia"""
+    disponibles = {}
+    for nombre in nombres:
+        fabrica = CODECS.get(nombre)
+        codec = fabrica() if fabrica else None
+        if codec is not None:
+            disponibles[nombre] = codec
+    return disponibles
+
+
+def sin_compresion(endpoint):
+    """Excluye la ruta de la compresión (aplicar debajo de @router.get/...)"""
+    endpoint.__compresion__ = "no"
+    return endpoint
+
+
+def precomprimida(endpoint):
+    """La ruta sirve cuerpos inmutables: se comprimen una vez y se reutilizan"""
+    endpoint.__compresion__ = "cache"
+    return endpoint
+
+
+class _CachePrecomprimidas:
+    """LRU de cuerpos comprimidos indexada por codec y hash del contenido"""
+
+    def __init__(self, max_entradas: int = MAX_PRECOMPRIMIDAS):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+    @staticmethod
+    def _clave(nombre: str, cuerpo: bytes) -> tuple:
+        return nombre, hashlib.blake2b(cuerpo, digest_size=16).digest()
+
+    def guardar(self, nombre: str, cuerpo: bytes, comprimido: bytes) -> None:
+        """Agrega una versión comprimida de antemano (p. ej. generada en el build)"""
+        with self._lock:
+            self._entradas[self._clave(nombre, cuerpo)] = comprimido
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def obtener(self, codec: _Codec, cuerpo: bytes) -> bytes:
+        clave = self._clave(codec.nombre, cuerpo)
+        with self._lock:
+            comprimido = self._entradas.get(clave)
+            if comprimido is not None:
+                self._entradas.move_to_end(clave)
+                return comprimido
+        comprimido = codec.comprimir(cuerpo, maximo=True)
+        self.guardar(codec.nombre, cuerpo, comprimido)
+        return comprimido
+
+
+# Compartida por el middleware y el arranque, que la siembra con el esquema OpenAPI
+precomprimidas = _CachePrecomprimidas()
+
+
+def negociar(accept_encoding: str, codecs: Dict[str, _Codec]) -> Optional[_Codec]:
+    """Codec aceptado con mayor q; a igual q gana el orden de preferencia del servidor"""
+    pesos = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        if nombre:
+            pesos[nombre] = q
+
+    mejor, mejor_q = None, 0.0
+    for nombre, codec in codecs.items():
+        q = pesos.get(nombre, pesos.get("*", 0.0))
+        if q > mejor_q:
+            mejor, mejor_q = codec, q
+    return mejor
+
+
+class CompresionMiddleware:
+    """Comprime respuestas comprimibles mayores que el umbral configurado"""
+
+    def __init__(
+        self,
+        app,
+        algoritmos: Optional[str] = None,
+        minimo: Optional[int] = None,
+        rutas_precomprimidas: Iterable[str] = (),
+    ):
+        self.app = app
+        nombres = (algoritmos if algoritmos is not None else settings.compression_algorithms).split(",")
+        self.codecs = codecs_disponibles(n.strip() for n in nombres if n.strip())
+        self.minimo = minimo if minimo is not None else settings.compression_min_size
+        self.rutas_precomprimidas = set(rutas_precomprimidas)
+        self.cache = precomprimidas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.codecs:
+            await self.app(scope, receive, send)
+            return
+        codec = negociar(Headers(scope=scope).get("accept-encoding", ""), self.codecs)
+        respuesta = _Respuesta(self, scope, codec, send)
+        await self.app(scope, receive, respuesta.send)
+
+
+class _Respuesta:
+    """Intercepta los mensajes de una respuesta y decide si comprimirla"""
+
+    def __init__(self, middleware: CompresionMiddleware, scope, codec: Optional[_Codec], send):
+        self.middleware = middleware
+        self.scope = scope
+        self.codec = codec
+        self._send = send
+        self._inicio = None
+        self._modo = None  # None = sin decidir, "pasar", "trozos"
+        self._compresor = None
+
+    def _modo_ruta(self) -> Optional[str]:
+        # El router de Starlette agrega el endpoint al scope compartido
+        endpoint = self.scope.get("endpoint")
+        if self.scope.get("path") in self.middleware.rutas_precomprimidas:
+            return "cache"
+        return getattr(endpoint, "__compresion__", None)
+
+    def _elegible(self, headers: MutableHeaders) -> bool:
+        tipo = headers.get("content-type", "")
+        return (
+            self._inicio["status"] not in (204, 304)
+            and "content-encoding" not in headers
+            and tipo.startswith(TIPOS_COMPRIMIBLES)
+            and not tipo.startswith(TIPOS_EXCLUIDOS)
+            and self._modo_ruta() != "no"
+            # Un ETag fuerte identifica estos bytes exactos (If-Match lo compara así)
+            and headers.get("etag", "W/").startswith("W/")
+        )
+
+    async def send(self, message):
+        tipo = message["type"]
+        if tipo == "http.response.start":
+            self._inicio = message
+            return
+        if tipo != "http.response.body" or self._modo == "pasar":
+            await self._send(message)
+            return
+        if self._modo == "trozos":
+            await self._trozo(message)
+            return
+
+        headers = MutableHeaders(raw=self._inicio["headers"])
+        elegible = self._elegible(headers)
+        if elegible:
+            headers.add_vary_header("Accept-Encoding")
+        cuerpo = message.get("body", b"")
+        mas = message.get("more_body", False)
+
+        if not elegible or self.codec is None or (not mas and len(cuerpo) < self.middleware.minimo):
+            self._modo = "pasar"
+            await self._send(self._inicio)
+            await self._send(message)
+            return
+
+        headers["Content-Encoding"] = self.codec.nombre
+        if not mas:
+            if self._modo_ruta() == "cache":
+                comprimido = self.middleware.cache.obtener(self.codec, cuerpo)
+            else:
+                comprimido = self.codec.comprimir(cuerpo)
+            headers["Content-Length"] = str(len(comprimido))
+            self._modo = "pasar"
+            await self._send(self._inicio)
+            await self._send({"type": "http.response.body", "body": comprimido})
+            return
+
+        # Respuesta por trozos: se comprime a medida que llega
+        del headers["Content-Length"]
+        self._modo = "trozos"
+        self._compresor = self.codec.compresor()
+        await self._send(self._inicio)
+        await self._trozo(message)
+
+    async def _trozo(self, message):
+        comprimir, finalizar = self._compresor
+        datos = comprimir(message.get("body", b""))
+        mas = message.get("more_body", False)
+        if not mas:
+            datos += finalizar()
+        await self._send({"type": "http.response.body", "body": datos, "more_body": mas})
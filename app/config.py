@@ -22,7 +22,58 @@ class Settings(BaseSettings):
     app_name: str = "ECO-MOVE API"
     app_version: str = "1.0.0"
     debug: bool = True
-    
+
+    # Pool de conexiones (timeout y recycle en segundos; recycle -1 = nunca) y threadpool de endpoints síncronos
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    threadpool_tokens: int = 40
+
+    # Umbrales de /ready: fracción del pool en uso, tareas esperando un hilo y latencia del ping
+    ready_pool_utilization: float = 0.9
+    ready_max_waiting: int = 10
+    ready_max_ping_ms: float = 500.0
+
+    # Analytics (almacén embebido opcional para reportes: "", "sqlite" o "duckdb")
+    analytics_backend: str = ""
+    analytics_path: str = "analytics.db"
+    analytics_sync_seconds: int = 60
+
+    # Bus de invalidación de cachés entre procesos ("local", "unix" o "postgres")
+    cache_bus_backend: str = "local"
+    cache_bus_unix_dir: str = "/tmp/ecomove-bus"
+
+    # Backend de cachés ("local" = LRU por proceso, "shm" = memoria compartida entre workers)
+    cache_backend: str = "local"
+    cache_shm_path: str = "/dev/shm/ecomove-cache"
+    cache_shm_mb: int = 64
+    # Antigüedad máxima (s) de un usuario autenticado cacheado; acota lo que tarda en
+    # verse un cambio de activo/rol que no llegó por el bus (otra instancia, edición directa)
+    principal_cache_ttl_s: int = 30
+
+    # Compresión de respuestas (orden de preferencia; br y zstd solo si están instalados)
+    compression_algorithms: str = "zstd,br,gzip"
+    compression_min_size: int = 1024
+
+    # Trazas locales (fracción muestreada y umbral de solicitud lenta en ms; 0 y 0 = desactivadas)
+    tracing_sample_rate: float = 0.0
+    tracing_slow_ms: int = 0
+    tracing_path: str = "traces.jsonl"
+
+    # Perfilado bajo demanda por admins (X-Profile: cpu|alloc)
+    profiling_enabled: bool = False
+    profiling_dir: str = "profiles"
+    profiling_interval_ms: float = 1.0
+
+    # Captura de tráfico saneado para reproducirlo en pruebas de carga
+    capture_enabled: bool = False
+    capture_path: str = "capture.jsonl"
+
+    # Arranque: precalentar pool, consultas y bcrypt; esquema OpenAPI pregenerado (vacío = no se usa)
+    startup_warmup: bool = True
+    openapi_path: str = "openapi.json"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -11,8 +11,10 @@ settings = get_settings()
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -27,3 +29,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def init_db():
+    """
+    Crea las tablas e índices que aún no existen (las existentes no se modifican).
+    Si el acumulado de recaudación no existía, se llena con el historial.
+    """
+    from sqlalchemy import inspect
+    from app.models import RecaudacionPeriodo
+    from app.search import crear_indices_busqueda
+    from app.services import reconstruir_recaudacion
+    acumulado_nuevo = not inspect(engine).has_table(RecaudacionPeriodo.__tablename__)
+    Base.metadata.create_all(bind=engine)
+    crear_indices_busqueda(engine)
+    if acumulado_nuevo:
+        db = SessionLocal()
+        try:
+            reconstruir_recaudacion(db)
+        finally:
+            db.close()
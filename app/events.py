@@ -0,0 +1,119 @@
+"""
+ECO-MOVE API - Eventos de Estado de Vehículos
+Difusión de los cambios de estado de vehículos (recibidos del bus de invalidación,
+también desde otros workers) hacia las conexiones Server-Sent Events, con
+historial acotado para reanudar desde Last-Event-ID.
+"""
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from app.bus import bus
+
+HISTORIAL_EVENTOS = 1000
+MAX_PENDIENTES_POR_CONEXION = 256
+INTERVALO_KEEPALIVE = 15.0
+
+
+class BrokerEstados:
+    """Publica transiciones de estado desde hilos síncronos hacia suscriptores asyncio"""
+
+    def __init__(self, historial: int = HISTORIAL_EVENTOS):
+        # Los ids se reinician con el proceso: la época permite detectar ids ajenos
+        self.epoca = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._historial: deque = deque(maxlen=historial)
+        self._ultimo_id = 0
+        self._suscriptores: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def publicar(self, vehiculo_id: int, estado: str, estado_anterior: Optional[str] = None) -> None:
+        """Registra un cambio de estado (seguro de llamar desde el threadpool)"""
+        if estado == estado_anterior:
+            return
+        with self._lock:
+            self._ultimo_id += 1
+            evento = (
+                self._ultimo_id,
+                json.dumps({
+                    "vehiculo_id": vehiculo_id,
+                    "estado": estado,
+                    "estado_anterior": estado_anterior,
+                }),
+            )
+            self._historial.append(evento)
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._distribuir, evento)
+
+    def _distribuir(self, evento: tuple) -> None:
+        for cola in list(self._suscriptores):
+            try:
+                cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Consumidor lento: se le desconecta y reanudará con Last-Event-ID
+                self._suscriptores.discard(cola)
+                while not cola.empty():
+                    cola.get_nowait()
+                cola.put_nowait(None)
+
+    def _pendientes(self, last_event_id: Optional[str]) -> Optional[list]:
+        """Eventos posteriores a last_event_id, o None si no se puede reanudar"""
+        if not last_event_id:
+            return []
+        epoca, _, numero = last_event_id.partition("-")
+        if epoca != self.epoca or not numero.isdigit():
+            return None
+        desde = int(numero)
+        with self._lock:
+            if self._historial and self._historial[0][0] > desde + 1:
+                return None
+            return [evento for evento in self._historial if evento[0] > desde]
+
+    def _formatear(self, evento: tuple) -> str:
+        return f"id: {self.epoca}-{evento[0]}\nevent: estado\ndata: {evento[1]}\n\n"
+
+    async def suscribir(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Genera mensajes SSE; si no puede reanudar envía 'reset' para recargar el catálogo"""
+        cola: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDIENTES_POR_CONEXION)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+        self._suscriptores.add(cola)
+        try:
+            yield "retry: 3000\n\n"
+            pendientes = self._pendientes(last_event_id)
+            if pendientes is None:
+                yield f"id: {self.epoca}-{self._ultimo_id}\nevent: reset\ndata: {{}}\n\n"
+                pendientes = []
+            ultimo = pendientes[-1][0] if pendientes else 0
+            for evento in pendientes:
+                yield self._formatear(evento)
+
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=INTERVALO_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if evento is None:
+                    break
+                if evento[0] <= ultimo:
+                    continue
+                yield self._formatear(evento)
+        finally:
+            self._suscriptores.discard(cola)
+
+
+broker_estados = BrokerEstados()
+
+
+def _al_cambiar(evento: dict) -> None:
+    datos = evento.get("datos") or {}
+    if evento["entidad"] == "vehiculo" and "estado" in datos:
+        broker_estados.publicar(evento["id"], datos["estado"], datos.get("estado_anterior"))
+
+
+bus.suscribir(_al_cambiar)
@@ -0,0 +1,162 @@
+"""
+ECO-MOVE API - Exportación Columnar
+Respuestas Arrow IPC / Parquet construidas por lotes directamente desde el cursor,
+sin pasar por objetos ORM ni diccionarios por fila. Las consultas se envían en
+streaming: cada lote (un row group en Parquet) sale apenas se escribe. Requiere
+pyarrow (opcional).
+"""
+from typing import Iterator, List, Sequence
+
+from fastapi import HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, Select
+from sqlalchemy.orm import Session
+
+from app.schemas import FormatoExportEnum
+
+TAMANO_LOTE = 50000
+
+MEDIA_TYPES = {
+    FormatoExportEnum.arrow: "application/vnd.apache.arrow.stream",
+    FormatoExportEnum.parquet: "application/vnd.apache.parquet",
+}
+
+EXTENSIONES = {
+    FormatoExportEnum.arrow: "arrow",
+    FormatoExportEnum.parquet: "parquet",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="La exportación columnar requiere el paquete pyarrow",
+        )
+    return pyarrow
+
+
+def _tipo_arrow(pa, tipo_sql):
+    """Tipo Arrow equivalente a un tipo de columna SQLAlchemy"""
+    if isinstance(tipo_sql, Boolean):
+        return pa.bool_()
+    if isinstance(tipo_sql, Integer):
+        return pa.int64()
+    if isinstance(tipo_sql, Numeric):
+        return pa.decimal128(tipo_sql.precision or 38, tipo_sql.scale or 10)
+    if isinstance(tipo_sql, DateTime):
+        return pa.timestamp("us", tz="UTC" if tipo_sql.timezone else None)
+    if isinstance(tipo_sql, Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _Salida:
+    """Destino de pyarrow que acumula lo escrito hasta que se entrega al cliente"""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+        self.closed = False
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        # Parquet guarda en el footer la posición de cada row group: cuenta todo lo escrito
+        return self._posicion
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def tomar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+class _Escritor:
+    """Escribe lotes en formato Arrow IPC (stream) o Parquet (un row group por lote)"""
+
+    def __init__(self, pa, schema, formato: FormatoExportEnum):
+        self.salida = _Salida()
+        if formato == FormatoExportEnum.parquet:
+            self._writer = pa.parquet.ParquetWriter(self.salida, schema)
+        else:
+            self._writer = pa.ipc.new_stream(self.salida, schema)
+
+    def escribir(self, lote) -> bytes:
+        """Escribe el lote y devuelve los bytes listos para enviar"""
+        self._writer.write_batch(lote)
+        return self.salida.tomar()
+
+    def cerrar(self) -> bytes:
+        self._writer.close()
+        return self.salida.tomar()
+
+
+def _encabezados(formato: FormatoExportEnum, nombre: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{nombre}.{EXTENSIONES[formato]}"'}
+
+
+def exportar_consulta(db: Session, stmt: Select, formato: FormatoExportEnum, nombre: str) -> StreamingResponse:
+    """
+    Exporta una consulta Core en streaming; el esquema sale de los tipos de las
+    columnas seleccionadas. La consulta corre en una conexión propia que vive
+    mientras dura la respuesta: la sesión de la solicitud devuelve la suya antes.
+    """
+    pa = _pyarrow()
+    columnas = list(stmt.selected_columns)
+    schema = pa.schema([(c.name, _tipo_arrow(pa, c.type)) for c in columnas])
+
+    bind = db.get_bind()
+    db.close()
+    conn = bind.connect()
+    try:
+        # Se ejecuta antes de responder: un error de la consulta todavía puede ser un 500
+        result = conn.execute(stmt.execution_options(yield_per=TAMANO_LOTE))
+    except BaseException:
+        conn.close()
+        raise
+
+    def lotes() -> Iterator[bytes]:
+        try:
+            escritor = _Escritor(pa, schema, formato)
+            for particion in result.partitions():
+                arrays = [
+                    pa.array(valores, type=campo.type)
+                    for valores, campo in zip(zip(*particion), schema)
+                ]
+                yield escritor.escribir(pa.record_batch(arrays, schema=schema))
+            yield escritor.cerrar()
+        finally:
+            conn.close()
+
+    return StreamingResponse(lotes(), media_type=MEDIA_TYPES[formato], headers=_encabezados(formato, nombre))
+
+
+def exportar_filas(
+    columnas: List[str],
+    filas: Sequence[Sequence],
+    formato: FormatoExportEnum,
+    nombre: str
+) -> Response:
+    """Exporta filas ya obtenidas (reportes agregados), infiriendo los tipos"""
+    pa = _pyarrow()
+    valores = list(zip(*filas)) if filas else [[] for _ in columnas]
+    tabla = pa.table({columna: pa.array(col) for columna, col in zip(columnas, valores)})
+    escritor = _Escritor(pa, tabla.schema, formato)
+    contenido = b"".join(escritor.escribir(lote) for lote in tabla.to_batches()) + escritor.cerrar()
+    return Response(content=contenido, media_type=MEDIA_TYPES[formato], headers=_encabezados(formato, nombre))
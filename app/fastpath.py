@@ -0,0 +1,92 @@
+"""
+ECO-MOVE API - Serialización Rápida de Listados
+Los listados pesados seleccionan filas Core (sin instancias ORM) y las vuelcan a
+JSON con un TypeAdapter precompilado sobre TypedDicts, sin validar de nuevo.
+La salida es la misma que produce el response_model correspondiente.
+"""
+from enum import Enum
+from typing import List, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session, aliased
+from typing_extensions import TypedDict
+
+from app.fieldsets import RECURSO_ALQUILER, RECURSO_DEVOLUCION, Recurso
+from app.models import Cliente
+from app.schemas import ClienteResponse
+from app.tracing import span
+
+
+def _tipo_serializacion(anotacion):
+    """Los Enum llegan de la base como str: se serializan como str para no validar"""
+    if isinstance(anotacion, type) and issubclass(anotacion, Enum):
+        return str
+    return anotacion
+
+
+class ListadoRapido:
+    """Consulta Core con joins de las relaciones expandidas y su volcado directo a bytes"""
+
+    def __init__(self, recurso: Recurso, expansiones: tuple = ()):
+        self.recurso = recurso
+        self._columnas = []
+        self._joins = []
+        self._plan, tipo = self._compilar(recurso, recurso.modelo, expansiones, "")
+        self.adaptador = TypeAdapter(List[tipo])
+
+    def _compilar(self, recurso: Recurso, entidad, expansiones: tuple, prefijo: str):
+        """Registra columnas y joins; devuelve (plan de armado, TypedDict de la fila)"""
+        campos = []
+        anotaciones = {}
+        for campo in recurso.campos:
+            campos.append((campo, len(self._columnas)))
+            self._columnas.append(getattr(entidad, campo).label(f"{prefijo}{campo}"))
+            anotaciones[campo] = _tipo_serializacion(recurso.esquema.model_fields[campo].annotation)
+
+        relaciones = []
+        for nombre, hijo in recurso.relaciones.items():
+            if nombre not in expansiones:
+                continue
+            alias = aliased(hijo.modelo)
+            self._joins.append((alias, getattr(entidad, nombre).of_type(alias)))
+            hijas = tuple(e[len(nombre) + 1:] for e in expansiones if e.startswith(f"{nombre}."))
+            subplan, subtipo = self._compilar(hijo, alias, hijas, f"{prefijo}{nombre}__")
+            # Sin fila relacionada (outer join) el id viene NULL y la relación es null
+            indice_id = dict(subplan[0])["id"]
+            relaciones.append((nombre, indice_id, subplan))
+            anotaciones[nombre] = Optional[subtipo]
+
+        tipo = TypedDict(f"{recurso.esquema.__name__}Fila{prefijo.replace('__', '_')}", anotaciones)
+        return (campos, relaciones), tipo
+
+    def select(self) -> Select:
+        """SELECT base; las rutas agregan filtros, orden y paginación sobre el modelo raíz"""
+        stmt = select(*self._columnas).select_from(self.recurso.modelo)
+        for alias, relacion in self._joins:
+            stmt = stmt.outerjoin(alias, relacion)
+        return stmt
+
+    def _armar(self, fila, plan) -> dict:
+        campos, relaciones = plan
+        datos = {campo: fila[indice] for campo, indice in campos}
+        for nombre, indice_id, subplan in relaciones:
+            datos[nombre] = self._armar(fila, subplan) if fila[indice_id] is not None else None
+        return datos
+
+    def responder(self, db: Session, stmt: Select) -> Response:
+        filas = db.execute(stmt).all()
+        with span("serializar", filas=len(filas)):
+            if self._plan[1]:
+                datos = [self._armar(fila, self._plan) for fila in filas]
+            else:
+                nombres = [campo for campo, _ in self._plan[0]]
+                datos = [dict(zip(nombres, fila)) for fila in filas]
+            cuerpo = self.adaptador.dump_json(datos)
+        return Response(content=cuerpo, media_type="application/json")
+
+
+LISTADO_CLIENTES = ListadoRapido(Recurso(Cliente, ClienteResponse))
+LISTADO_ALQUILERES = ListadoRapido(RECURSO_ALQUILER, ("cliente", "vehiculo"))
+LISTADO_DEVOLUCIONES = ListadoRapido(RECURSO_DEVOLUCION, ("alquiler", "alquiler.cliente", "alquiler.vehiculo"))
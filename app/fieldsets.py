@@ -0,0 +1,124 @@
+"""
+ECO-MOVE API - Campos Parciales
+Soporte de ?fields= y ?expand= en listados: se cargan solo las columnas pedidas,
+solo se hace join de las relaciones expandidas y se serializa solo eso.
+"""
+import threading
+from typing import Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy.orm import joinedload, load_only
+
+from app.models import Alquiler, Cliente, Devolucion, Vehiculo
+from app.params import parse_lista
+from app.schemas import AlquilerResponse, ClienteResponse, DevolucionResponse, VehiculoResponse
+from app.tracing import span
+
+# Combinaciones de campos distintas con modelo compilado en memoria
+MAX_VISTAS = 128
+
+
+class Recurso:
+    """Modelo ORM + esquema de respuesta + relaciones expandibles (por nombre)"""
+
+    def __init__(self, modelo, esquema: Type[BaseModel], relaciones: Optional[Dict[str, "Recurso"]] = None):
+        self.modelo = modelo
+        self.esquema = esquema
+        self.relaciones = relaciones or {}
+        self.campos = tuple(c for c in esquema.model_fields if c not in self.relaciones)
+        self._lock = threading.Lock()
+        self._adaptadores: Dict[tuple, TypeAdapter] = {}
+
+    def _caminos(self, prefijo: str = "") -> List[str]:
+        caminos = []
+        for nombre, recurso in self.relaciones.items():
+            camino = f"{prefijo}{nombre}"
+            caminos.append(camino)
+            caminos.extend(recurso._caminos(f"{camino}."))
+        return caminos
+
+    def interpretar(self, fields: Optional[str], expand: Optional[str]) -> Optional[Tuple[tuple, tuple]]:
+        """(campos, expansiones) pedidos, o None si no se pidió una vista parcial"""
+        campos = parse_lista(fields, "fields")
+        expansiones = parse_lista(expand, "expand")
+        if campos is None and expansiones is None:
+            return None
+
+        campos = campos or list(self.campos)
+        desconocidos = [c for c in campos if c not in self.campos]
+        if desconocidos:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campos no válidos: {', '.join(desconocidos)}. Disponibles: {', '.join(self.campos)}"
+            )
+
+        expansiones = set(expansiones or [])
+        caminos = self._caminos()
+        desconocidas = [e for e in expansiones if e not in caminos]
+        if desconocidas:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Relaciones no válidas: {', '.join(desconocidas)}. Disponibles: {', '.join(caminos)}"
+            )
+        # Expandir "a.b" implica expandir "a"
+        for expansion in list(expansiones):
+            partes = expansion.split(".")
+            expansiones.update(".".join(partes[:i]) for i in range(1, len(partes)))
+        return tuple(campos), tuple(sorted(expansiones))
+
+    def _hijas(self, expansiones: tuple, nombre: str) -> tuple:
+        prefijo = f"{nombre}."
+        return tuple(e[len(prefijo):] for e in expansiones if e.startswith(prefijo))
+
+    def opciones(self, campos: tuple, expansiones: tuple, ruta=None) -> list:
+        """load_only de las columnas pedidas y joinedload de las relaciones expandidas"""
+        columnas = [getattr(self.modelo, c) for c in campos]
+        opciones = [ruta.load_only(*columnas) if ruta is not None else load_only(*columnas)]
+        for nombre, recurso in self.relaciones.items():
+            if nombre not in expansiones:
+                continue
+            relacion = getattr(self.modelo, nombre)
+            hija = ruta.joinedload(relacion) if ruta is not None else joinedload(relacion)
+            opciones.extend(recurso.opciones(recurso.campos, self._hijas(expansiones, nombre), hija))
+        return opciones
+
+    def _modelo(self, campos: tuple, expansiones: tuple) -> Type[BaseModel]:
+        definicion = {c: (self.esquema.model_fields[c].annotation, self.esquema.model_fields[c]) for c in campos}
+        for nombre, recurso in self.relaciones.items():
+            if nombre in expansiones:
+                submodelo = recurso._modelo(recurso.campos, self._hijas(expansiones, nombre))
+                definicion[nombre] = (Optional[submodelo], None)
+        return create_model(
+            f"{self.esquema.__name__}Parcial",
+            __config__=ConfigDict(from_attributes=True),
+            **definicion
+        )
+
+    def _adaptador(self, campos: tuple, expansiones: tuple) -> TypeAdapter:
+        clave = (campos, expansiones)
+        adaptador = self._adaptadores.get(clave)
+        if adaptador is None:
+            adaptador = TypeAdapter(List[self._modelo(campos, expansiones)])
+            with self._lock:
+                if len(self._adaptadores) >= MAX_VISTAS:
+                    self._adaptadores.clear()
+                self._adaptadores[clave] = adaptador
+        return adaptador
+
+    def responder(self, objetos: list, campos: tuple, expansiones: tuple) -> Response:
+        """JSON con solo los campos y relaciones pedidos"""
+        adaptador = self._adaptador(campos, expansiones)
+        with span("serializar", filas=len(objetos)):
+            cuerpo = adaptador.dump_json(adaptador.validate_python(objetos, from_attributes=True))
+        return Response(content=cuerpo, media_type="application/json")
+
+
+RECURSO_ALQUILER = Recurso(Alquiler, AlquilerResponse, {
+    "cliente": Recurso(Cliente, ClienteResponse),
+    "vehiculo": Recurso(Vehiculo, VehiculoResponse),
+})
+
+RECURSO_DEVOLUCION = Recurso(Devolucion, DevolucionResponse, {
+    "alquiler": RECURSO_ALQUILER,
+})
@@ -2,12 +2,44 @@
 ECO-MOVE API - Main Application
 Sistema de gestión de alquiler de vehículos eléctricos
 """
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from anyio.to_thread import current_default_thread_limiter
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import get_settings
-from app.routers import auth, usuarios, clientes, vehiculos, alquileres, devoluciones, reportes
+from app.database import init_db
+from app.bus import bus
+from app.compression import CompresionMiddleware
+from app.metrics import MetricasMiddleware, respuesta_metricas
+from app.tracing import TrazasMiddleware
+from app.profiling import PerfiladoMiddleware
+from app.capture import CapturaMiddleware
+from app.startup import precalentar
+from app.readiness import disponibilidad
+from app.routers import auth, usuarios, clientes, vehiculos, alquileres, devoluciones, reportes, perfiles
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crea las tablas auxiliares que falten, conecta el bus y precalienta; al cerrar, detiene el bus"""
+    inicio = time.perf_counter()
+    # Hilos para endpoints síncronos (el limitador es del event loop: se ajusta aquí)
+    current_default_thread_limiter().total_tokens = settings.threadpool_tokens
+    init_db()
+    bus.iniciar()
+    app.state.arranque = await precalentar(app)
+    app.state.arranque["total_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+    logger.info("Arranque en %.0f ms: %s", app.state.arranque["total_ms"], app.state.arranque)
+    yield
+    bus.detener()
+
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -34,6 +66,7 @@ app = FastAPI(
     version=settings.app_version,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -45,6 +78,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión negociada (el esquema OpenAPI no cambia: se comprime una sola vez)
+app.add_middleware(CompresionMiddleware, rutas_precomprimidas=(app.openapi_url,))
+
+# Perfilado por solicitud (solo se instala si está habilitado)
+if settings.profiling_enabled:
+    app.add_middleware(PerfiladoMiddleware)
+
+# Trazas por solicitud (muestreo y solicitudes lentas)
+app.add_middleware(TrazasMiddleware)
+
+# Captura de tráfico (solo se instala si está habilitada)
+if settings.capture_enabled:
+    app.add_middleware(CapturaMiddleware)
+
+# Métricas (el más externo: mide también la compresión)
+app.add_middleware(MetricasMiddleware)
+
 # Incluir routers
 app.include_router(auth.router)
 app.include_router(usuarios.router)
@@ -53,6 +103,7 @@ app.include_router(vehiculos.router)
 app.include_router(alquileres.router)
 app.include_router(devoluciones.router)
 app.include_router(reportes.router)
+app.include_router(perfiles.router)
 
 
 @app.get("/", tags=["Health"])
@@ -69,3 +120,16 @@ def root():
 def health_check():
     """Health check para monitoreo"""
     return {"status": "healthy"}
+
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Disponibilidad para el balanceador: 503 si el pool o el threadpool están saturados o la base no responde"""
+    lista, detalle = await disponibilidad()
+    return JSONResponse(detalle, status_code=200 if lista else 503)
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus"""
+    return respuesta_metricas()
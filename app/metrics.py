@@ -0,0 +1,167 @@
+"""
+ECO-MOVE API - Métricas
+Métricas Prometheus del proceso: latencia por plantilla de ruta, solicitudes en
+curso, saturación del threadpool, uso del pool de conexiones y tiempo de bcrypt.
+"""
+import time
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.responses import Response
+
+from app.database import engine
+
+# Ruta de las solicitudes que no coinciden con ninguna plantilla (404, etc.)
+SIN_RUTA = "sin_ruta"
+
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SOLICITUDES = Counter(
+    "ecomove_http_requests_total",
+    "Solicitudes HTTP atendidas",
+    ("method", "route", "status"),
+)
+LATENCIA = Histogram(
+    "ecomove_http_request_duration_seconds",
+    "Duración de las solicitudes HTTP hasta enviar el último byte",
+    ("method", "route"),
+    buckets=LATENCIA_BUCKETS,
+)
+EN_CURSO = Gauge(
+    "ecomove_http_requests_in_progress",
+    "Solicitudes HTTP en curso",
+)
+BCRYPT = Histogram(
+    "ecomove_bcrypt_seconds",
+    "Duración de las operaciones bcrypt",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+
+# Limitador del threadpool de anyio (se toma dentro del event loop en la primera solicitud)
+_limitador = None
+
+
+def estado_pool() -> Optional[dict]:
+    """Conexiones del pool (None si el pool no lleva la cuenta, p. ej. NullPool)"""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # overflow() es negativo mientras no se llenan las conexiones fijas
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+def estado_threadpool(limitador) -> dict:
+    return {
+        "tokens": limitador.total_tokens,
+        "borrowed": limitador.borrowed_tokens,
+        "waiting": limitador.statistics().tasks_waiting,
+    }
+
+
+class _ColectorRecursos:
+    """Lee el estado del pool de conexiones y del threadpool en cada scrape"""
+
+    def collect(self):
+        pool = estado_pool()
+        if pool is not None:
+            tamano = GaugeMetricFamily("ecomove_db_pool_size", "Conexiones fijas del pool")
+            tamano.add_metric([], pool["size"])
+            yield tamano
+            usadas = GaugeMetricFamily("ecomove_db_pool_checked_out", "Conexiones prestadas")
+            usadas.add_metric([], pool["checked_out"])
+            yield usadas
+            libres = GaugeMetricFamily("ecomove_db_pool_checked_in", "Conexiones libres en el pool")
+            libres.add_metric([], pool["checked_in"])
+            yield libres
+            desborde = GaugeMetricFamily("ecomove_db_pool_overflow", "Conexiones abiertas por encima del pool")
+            desborde.add_metric([], pool["overflow"])
+            yield desborde
+
+        if _limitador is not None:
+            hilos = estado_threadpool(_limitador)
+            total = GaugeMetricFamily("ecomove_threadpool_tokens", "Hilos disponibles para endpoints síncronos")
+            total.add_metric([], hilos["tokens"])
+            yield total
+            ocupados = GaugeMetricFamily("ecomove_threadpool_borrowed", "Hilos ocupados")
+            ocupados.add_metric([], hilos["borrowed"])
+            yield ocupados
+            espera = GaugeMetricFamily("ecomove_threadpool_waiting", "Tareas esperando un hilo libre")
+            espera.add_metric([], hilos["waiting"])
+            yield espera
+
+
+REGISTRY.register(_ColectorRecursos())
+
+
+def medir_bcrypt(operacion: str):
+    """Context manager que registra la duración de una operación bcrypt"""
+    return BCRYPT.labels(operacion).time()
+
+
+def respuesta_metricas() -> Response:
+    """Exposición en formato de texto de Prometheus"""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+_plantillas = None
+
+
+def plantilla_ruta(scope) -> str:
+    """Plantilla de la ruta que atendió la solicitud (/clientes/{cliente_id})"""
+    global _plantillas
+    # Starlette reciente deja la ruta en el scope; si no, se busca por endpoint
+    ruta = scope.get("route")
+    if ruta is not None and hasattr(ruta, "path"):
+        return ruta.path
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return SIN_RUTA
+    if _plantillas is None:
+        _plantillas = {
+            getattr(r, "endpoint", None): r.path for r in scope["app"].router.routes if hasattr(r, "path")
+        }
+    return _plantillas.get(endpoint, SIN_RUTA)
+
+
+class MetricasMiddleware:
+    """Mide cada solicitud HTTP etiquetándola con la plantilla de ruta (no la ruta real)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _limitador
+        if _limitador is None:
+            from anyio.to_thread import current_default_thread_limiter
+            _limitador = current_default_thread_limiter()
+
+        estado: Optional[int] = None
+
+        async def enviar(message):
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            await send(message)
+
+        EN_CURSO.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            EN_CURSO.dec()
+            ruta = plantilla_ruta(scope)
+            metodo = scope["method"]
+            LATENCIA.labels(metodo, ruta).observe(duracion)
+            SOLICITUDES.labels(metodo, ruta, str(estado or 500)).inc()
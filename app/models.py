@@ -1,7 +1,9 @@
 """
 ECO-MOVE API - SQLAlchemy Models
+Las relaciones usan lazy="raise": cada consulta declara qué relaciones carga
+(joinedload/selectinload) y un acceso no previsto falla en vez de consultar.
 """
-from sqlalchemy import Column, Integer, String, Boolean, Date, Numeric, Text, ForeignKey, TIMESTAMP, CheckConstraint
+from sqlalchemy import Column, Integer, String, Boolean, Date, Numeric, Text, ForeignKey, TIMESTAMP, CheckConstraint, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -21,7 +23,7 @@ class Usuario(Base):
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.current_timestamp(), onupdate=func.current_timestamp())
     
     # Relación con cliente (opcional)
-    cliente = relationship("Cliente", back_populates="usuario", uselist=False)
+    cliente = relationship("Cliente", back_populates="usuario", uselist=False, lazy="raise", passive_deletes=True)
     
     __table_args__ = (
         CheckConstraint("rol IN ('admin', 'empleado', 'cliente')", name="check_rol"),
@@ -45,8 +47,9 @@ class Cliente(Base):
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.current_timestamp(), onupdate=func.current_timestamp())
     
     # Relaciones
-    usuario = relationship("Usuario", back_populates="cliente")
-    alquileres = relationship("Alquiler", back_populates="cliente")
+    usuario = relationship("Usuario", back_populates="cliente", lazy="raise")
+    # passive_deletes: la base aplica el ON DELETE sin cargar el historial
+    alquileres = relationship("Alquiler", back_populates="cliente", lazy="raise", passive_deletes=True)
 
 
 class Vehiculo(Base):
@@ -64,7 +67,7 @@ class Vehiculo(Base):
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.current_timestamp(), onupdate=func.current_timestamp())
     
     # Relaciones
-    alquileres = relationship("Alquiler", back_populates="vehiculo")
+    alquileres = relationship("Alquiler", back_populates="vehiculo", lazy="raise", passive_deletes=True)
     
     __table_args__ = (
         CheckConstraint("estado IN ('disponible', 'alquilado', 'mantenimiento')", name="check_estado_vehiculo"),
@@ -91,9 +94,9 @@ class Alquiler(Base):
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.current_timestamp(), onupdate=func.current_timestamp())
     
     # Relaciones
-    cliente = relationship("Cliente", back_populates="alquileres")
-    vehiculo = relationship("Vehiculo", back_populates="alquileres")
-    devolucion = relationship("Devolucion", back_populates="alquiler", uselist=False)
+    cliente = relationship("Cliente", back_populates="alquileres", lazy="raise")
+    vehiculo = relationship("Vehiculo", back_populates="alquileres", lazy="raise")
+    devolucion = relationship("Devolucion", back_populates="alquiler", uselist=False, lazy="raise", passive_deletes=True)
     
     __table_args__ = (
         CheckConstraint("estado IN ('activo', 'devuelto', 'cancelado')", name="check_estado_alquiler"),
@@ -116,4 +119,24 @@ class Devolucion(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.current_timestamp())
     
     # Relaciones
-    alquiler = relationship("Alquiler", back_populates="devolucion")
+    alquiler = relationship("Alquiler", back_populates="devolucion", lazy="raise")
+
+
+class RecaudacionPeriodo(Base):
+    """Acumulado de recaudación por periodo y vehículo (se actualiza en cada alquiler/devolución)"""
+    __tablename__ = "recaudacion_periodos"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    granularidad = Column(String(10), nullable=False)
+    periodo = Column(Date, nullable=False)
+    vehiculo_id = Column(Integer, ForeignKey("vehiculos.id", ondelete="CASCADE"), nullable=False)
+    alquileres = Column(Integer, nullable=False, default=0)
+    importe = Column(Numeric(12, 2), nullable=False, default=0)
+    descuentos = Column(Numeric(12, 2), nullable=False, default=0)
+    depositos = Column(Numeric(12, 2), nullable=False, default=0)
+    multas = Column(Numeric(12, 2), nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("granularidad", "periodo", "vehiculo_id", name="uq_recaudacion_periodo"),
+        CheckConstraint("granularidad IN ('dia', 'semana', 'mes')", name="check_granularidad"),
+    )
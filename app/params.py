@@ -0,0 +1,36 @@
+"""
+ECO-MOVE API - Parámetros de Consulta
+Interpretación de parámetros compuestos de query string (listas separadas por comas).
+"""
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+MAX_IDS_POR_CONSULTA = 500
+
+
+def parse_lista(valor: Optional[str], nombre: str) -> Optional[List[str]]:
+    """'a,b,c' -> ['a', 'b', 'c'] sin vacíos ni duplicados (None si no se envió)"""
+    if valor is None:
+        return None
+    elementos = list(dict.fromkeys(e.strip() for e in valor.split(",") if e.strip()))
+    if len(elementos) > MAX_IDS_POR_CONSULTA:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'{nombre}' admite como máximo {MAX_IDS_POR_CONSULTA} valores"
+        )
+    return elementos
+
+
+def parse_ids(valor: Optional[str], nombre: str = "ids") -> Optional[List[int]]:
+    """'1,2,3' -> [1, 2, 3]"""
+    elementos = parse_lista(valor, nombre)
+    if elementos is None:
+        return None
+    try:
+        return list(dict.fromkeys(int(e) for e in elementos))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'{nombre}' debe ser una lista de enteros separados por comas"
+        )
@@ -0,0 +1,239 @@
+"""
+ECO-MOVE API - Perfilado bajo demanda
+Un admin puede perfilar una solicitud puntual con el encabezado X-Profile: cpu|alloc.
+El perfil (pilas en formato folded, listo para flamegraph.pl / speedscope) se guarda
+en PROFILING_DIR y se consulta en /perfiles. Con PROFILING_ENABLED=false el
+middleware no se instala.
+
+cpu muestrea solo los hilos que atienden la solicitud perfilada. alloc usa
+tracemalloc, que es global al proceso: incluye lo que asignen al mismo tiempo
+otras solicitudes.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextvars import Context, ContextVar
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.config import get_settings
+from app.database import SessionLocal
+
+settings = get_settings()
+
+MODOS = ("cpu", "alloc")
+
+# Profundidad de las pilas de tracemalloc y asignaciones listadas en el resumen
+PROFUNDIDAD_ALLOC = 32
+TOP_ALLOC = 50
+
+# Nombres de archivo válidos en PROFILING_DIR (evita salir del directorio)
+PATRON_ARCHIVO = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}-(cpu|alloc)\.(folded|top\.txt)$")
+
+# Módulos en los que un hilo está esperando, no trabajando
+MODULOS_ESPERA = ("threading.py", "selectors.py", "queue.py")
+
+# Perfil de la solicitud en curso: llega a los hilos del threadpool con el contexto copiado
+_perfil_en_curso: ContextVar = ContextVar("perfil_en_curso", default=None)
+
+
+def _marco(codigo) -> str:
+    return f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}:{codigo.co_firstlineno}"
+
+
+class _MuestreadorCPU:
+    """Toma las pilas de los hilos que atienden la solicitud cada intervalo mientras dura"""
+
+    def __init__(self, intervalo: float, marco_solicitud):
+        self.intervalo = intervalo
+        self.pilas: Counter = Counter()
+        # Marco del middleware para esta solicitud: está en la pila del event loop
+        # solo mientras corre la tarea de esta solicitud
+        self._marco_solicitud = marco_solicitud
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, name="perfilador-cpu", daemon=True)
+
+    def iniciar(self) -> None:
+        self._hilo.start()
+
+    def detener(self) -> str:
+        self._fin.set()
+        self._hilo.join()
+        return "".join(f"{pila} {n}\n" for pila, n in self.pilas.most_common())
+
+    def _es_de_la_solicitud(self, marco) -> bool:
+        """
+        En el event loop, si la pila pasa por el marco del middleware de esta
+        solicitud. En el threadpool, si la tarea del hilo corre con el contexto de
+        esta solicitud (el Context que el worker de anyio pasa a context.run).
+        """
+        while marco is not None:
+            if marco is self._marco_solicitud:
+                return True
+            if marco.f_code.co_name == "run":
+                contexto = marco.f_locals.get("context")
+                if isinstance(contexto, Context):
+                    return contexto.get(_perfil_en_curso) is self
+            marco = marco.f_back
+        return False
+
+    def _muestrear(self) -> None:
+        propio = threading.get_ident()
+        while not self._fin.wait(self.intervalo):
+            nombres = {h.ident: h.name for h in threading.enumerate()}
+            for ident, marco in sys._current_frames().items():
+                if ident == propio or os.path.basename(marco.f_code.co_filename) in MODULOS_ESPERA:
+                    continue
+                if not self._es_de_la_solicitud(marco):
+                    continue
+                pila = []
+                while marco is not None:
+                    pila.append(_marco(marco.f_code))
+                    marco = marco.f_back
+                pila.append(nombres.get(ident, str(ident)))
+                self.pilas[";".join(reversed(pila))] += 1
+
+
+class _PerfilAlloc:
+    """
+    tracemalloc durante la solicitud: pilas con los bytes vivos justo antes de
+    enviar el final de la respuesta (con el cuerpo todavía en memoria) y el pico
+    de memoria trazada, que cubre también las asignaciones temporales.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+
+    def iniciar(self) -> None:
+        tracemalloc.start(PROFUNDIDAD_ALLOC)
+
+    def capturar(self) -> None:
+        """Instantánea de lo vivo (una sola vez, antes de soltar el cuerpo de la respuesta)"""
+        if self._snapshot is None:
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def detener(self) -> tuple:
+        # Sin respuesta enviada (error en la app) la instantánea se toma aquí
+        self.capturar()
+        actual, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = self._snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        estadisticas = snapshot.statistics("traceback")
+        folded = "".join(
+            ";".join(f"{os.path.basename(f.filename)}:{f.lineno}" for f in e.traceback) + f" {e.size}\n"
+            for e in estadisticas
+        )
+        vivos = sum(e.size for e in estadisticas)
+        top = (
+            f"pico {pico / 1024:.1f} KiB, vivos al enviar la respuesta {vivos / 1024:.1f} KiB, "
+            f"al terminar {actual / 1024:.1f} KiB (todo el proceso)\n"
+        ) + "".join(
+            f"{e.size / 1024:10.1f} KiB {e.count:8d} bloques  {e.traceback[0].filename}:{e.traceback[0].lineno}\n"
+            for e in snapshot.statistics("lineno")[:TOP_ALLOC]
+        )
+        return folded, top
+
+
+def _autorizar(headers: Headers) -> None:
+    """Exige un token de admin (misma regla que get_admin_user)"""
+    from app.auth import autenticar_token, get_admin_user
+
+    esquema, _, token = headers.get("authorization", "").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="El perfilado requiere un token de administrador")
+    db = SessionLocal()
+    try:
+        get_admin_user(autenticar_token(token, db))
+    finally:
+        db.close()
+
+
+def ruta_perfil(nombre: str) -> Optional[str]:
+    """Ruta del archivo de perfil, o None si el nombre no es válido o no existe"""
+    if not PATRON_ARCHIVO.match(nombre):
+        return None
+    ruta = os.path.join(settings.profiling_dir, nombre)
+    return ruta if os.path.isfile(ruta) else None
+
+
+def listar_perfiles() -> list:
+    if not os.path.isdir(settings.profiling_dir):
+        return []
+    return sorted((n for n in os.listdir(settings.profiling_dir) if PATRON_ARCHIVO.match(n)), reverse=True)
+
+
+class PerfiladoMiddleware:
+    """Perfila solo las solicitudes de admin que traen X-Profile"""
+
+    def __init__(self, app):
+        self.app = app
+        # tracemalloc y el muestreo son globales al proceso: un perfil a la vez
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        modo = headers.get("x-profile")
+        if modo is None:
+            await self.app(scope, receive, send)
+            return
+
+        if modo not in MODOS:
+            await JSONResponse({"detail": f"X-Profile debe ser {' o '.join(MODOS)}"}, 400)(scope, receive, send)
+            return
+        try:
+            await run_in_threadpool(_autorizar, headers)
+        except HTTPException as e:
+            await JSONResponse({"detail": e.detail}, e.status_code)(scope, receive, send)
+            return
+        if not self._lock.acquire(blocking=False):
+            await JSONResponse({"detail": "Ya hay un perfilado en curso"}, 409)(scope, receive, send)
+            return
+
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}-{modo}"
+
+        if modo == "cpu":
+            perfil = _MuestreadorCPU(settings.profiling_interval_ms / 1000, sys._getframe())
+        else:
+            perfil = _PerfilAlloc()
+
+        async def enviar(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", f"{nombre}.folded".encode())]
+            elif message["type"] == "http.response.body" and not message.get("more_body") and modo == "alloc":
+                perfil.capturar()
+            await send(message)
+
+        token = _perfil_en_curso.set(perfil)
+        try:
+            perfil.iniciar()
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                resultado = perfil.detener()
+        finally:
+            _perfil_en_curso.reset(token)
+            self._lock.release()
+        await run_in_threadpool(self._guardar, nombre, resultado)
+
+    def _guardar(self, nombre: str, resultado) -> None:
+        os.makedirs(settings.profiling_dir, exist_ok=True)
+        folded, top = resultado if isinstance(resultado, tuple) else (resultado, None)
+        with open(os.path.join(settings.profiling_dir, f"{nombre}.folded"), "w", encoding="utf-8") as archivo:
+            archivo.write(folded)
+        if top is not None:
+            with open(os.path.join(settings.profiling_dir, f"{nombre}.top.txt"), "w", encoding="utf-8") as archivo:
+                archivo.write(top)
@@ -0,0 +1,73 @@
+"""
+ECO-MOVE API - Disponibilidad
+Estado de /ready para el balanceador y el autoescalado: uso del pool de
+conexiones, tareas esperando un hilo del threadpool y latencia de un ping a la
+base. Una instancia saturada responde 503 para que el tráfico vaya a otra.
+"""
+import time
+from typing import Optional
+
+from anyio import CapacityLimiter, to_thread
+from anyio.to_thread import current_default_thread_limiter
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import get_settings
+from app.database import engine
+from app.metrics import estado_pool, estado_threadpool
+
+settings = get_settings()
+
+# Hilo propio para el ping: no espera detrás de los endpoints en el threadpool compartido
+# (se crea dentro del event loop)
+_limitador_ping: Optional[CapacityLimiter] = None
+
+
+def _ping() -> float:
+    inicio = time.perf_counter()
+    with engine.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+    return (time.perf_counter() - inicio) * 1000
+
+
+async def disponibilidad() -> tuple:
+    """(lista, detalle); el detalle incluye los motivos si no debe recibir tráfico"""
+    global _limitador_ping
+    motivos = []
+    detalle = {}
+
+    pool = estado_pool()
+    conexion_libre = True
+    if pool is not None:
+        capacidad = pool["size"] + settings.db_max_overflow
+        pool["max_overflow"] = settings.db_max_overflow
+        pool["utilization"] = round(pool["checked_out"] / capacidad, 3) if capacidad else 0.0
+        if pool["utilization"] >= settings.ready_pool_utilization:
+            motivos.append(f"pool de conexiones al {pool['utilization']:.0%}")
+        conexion_libre = pool["checked_out"] < capacidad
+        detalle["pool"] = pool
+
+    hilos = estado_threadpool(current_default_thread_limiter())
+    if hilos["waiting"] > settings.ready_max_waiting:
+        motivos.append(f"{hilos['waiting']} tareas esperando un hilo")
+    detalle["threadpool"] = hilos
+
+    # Sin conexiones libres el ping esperaría DB_POOL_TIMEOUT: ya se sabe que no está lista
+    if conexion_libre:
+        if _limitador_ping is None:
+            _limitador_ping = CapacityLimiter(1)
+        try:
+            ping = await to_thread.run_sync(_ping, limiter=_limitador_ping)
+            detalle["db"] = {"ping_ms": round(ping, 3)}
+            if ping > settings.ready_max_ping_ms:
+                motivos.append(f"ping a la base de {ping:.0f} ms")
+        except SQLAlchemyError as e:
+            detalle["db"] = {"error": type(e).__name__}
+            motivos.append("la base no responde")
+    else:
+        detalle["db"] = {"ping_ms": None}
+
+    detalle["status"] = "not_ready" if motivos else "ready"
+    if motivos:
+        detalle["motivos"] = motivos
+    return not motivos, detalle
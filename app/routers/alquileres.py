@@ -1,62 +1,132 @@
 """
 ECO-MOVE API - Alquileres Router
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
 from app.models import Alquiler, Cliente, Vehiculo, Usuario
-from app.schemas import AlquilerCreate, AlquilerResponse, AlquilerCalculado
+from app.schemas import AlquilerCreate, AlquilerResponse, AlquilerCalculado, FormatoExportEnum
+from app.bus import bus
+from app.cache import es_condicional, no_modificado, validadores
 from app.auth import get_current_user, get_staff_user
-from app.services import calcular_alquiler, validar_edad_cliente
+from app.export import exportar_consulta
+from app.fastpath import LISTADO_ALQUILERES
+from app.fieldsets import RECURSO_ALQUILER
+from app.params import parse_ids
+from app.services import calcular_alquiler, validar_edad_cliente, registrar_recaudacion_alquiler
 
 router = APIRouter(prefix="/alquileres", tags=["Alquileres"])
 
+# Tamaño de página por defecto de los listados JSON (las exportaciones columnares no tienen)
+LIMITE_JSON = 100
 
-@router.get("/", response_model=List[AlquilerResponse])
+
+@router.get("/", response_model=Union[List[AlquilerResponse], Dict[int, Optional[AlquilerResponse]]])
 def get_alquileres(
     skip: int = 0,
-    limit: int = 100,
+    limit: Optional[int] = Query(None, description=f"Máximo de filas ({LIMITE_JSON} por defecto; sin límite en arrow/parquet)"),
     estado: str = None,
     cliente_id: int = None,
+    ids: Optional[str] = Query(None, description="Ids separados por comas; responde un objeto {id: alquiler|null}"),
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas"),
+    expand: Optional[str] = Query(None, description="Relaciones a incluir: cliente, vehiculo"),
+    formato: Optional[FormatoExportEnum] = Query(None, alias="format"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_staff_user)
 ):
-    """Lista todos los alquileres"""
-    query = db.query(Alquiler).options(
-        joinedload(Alquiler.cliente),
-        joinedload(Alquiler.vehiculo)
-    )
+    """
+    Lista todos los alquileres (format=arrow|parquet exporta las columnas planas,
+    en streaming y sin límite de filas salvo que se pida).
+    Con fields= y/o expand= se devuelve una vista parcial sin relaciones no pedidas.
+    """
+    lista_ids = parse_ids(ids)
+    if lista_ids is not None:
+        encontrados = {
+            a.id: a for a in db.query(Alquiler).options(
+                joinedload(Alquiler.cliente),
+                joinedload(Alquiler.vehiculo)
+            ).filter(Alquiler.id.in_(lista_ids)).all()
+        }
+        return {i: encontrados.get(i) for i in lista_ids}
+    
+    if formato in (FormatoExportEnum.arrow, FormatoExportEnum.parquet):
+        stmt = select(*Alquiler.__table__.columns)
+        if estado:
+            stmt = stmt.where(Alquiler.estado == estado)
+        if cliente_id:
+            stmt = stmt.where(Alquiler.cliente_id == cliente_id)
+        stmt = stmt.order_by(Alquiler.created_at.desc()).offset(skip).limit(limit)
+        return exportar_consulta(db, stmt, formato, "alquileres")
+    
+    if limit is None:
+        limit = LIMITE_JSON
+    
+    parcial = RECURSO_ALQUILER.interpretar(fields, expand)
+    if parcial is None:
+        stmt = LISTADO_ALQUILERES.select()
+        if estado:
+            stmt = stmt.where(Alquiler.estado == estado)
+        if cliente_id:
+            stmt = stmt.where(Alquiler.cliente_id == cliente_id)
+        stmt = stmt.order_by(Alquiler.created_at.desc()).offset(skip).limit(limit)
+        return LISTADO_ALQUILERES.responder(db, stmt)
     
+    query = db.query(Alquiler).options(*RECURSO_ALQUILER.opciones(*parcial))
     if estado:
         query = query.filter(Alquiler.estado == estado)
     if cliente_id:
         query = query.filter(Alquiler.cliente_id == cliente_id)
     
     alquileres = query.order_by(Alquiler.created_at.desc()).offset(skip).limit(limit).all()
-    return alquileres
+    return RECURSO_ALQUILER.responder(alquileres, *parcial)
 
 
 @router.get("/activos", response_model=List[AlquilerResponse])
 def get_alquileres_activos(
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas"),
+    expand: Optional[str] = Query(None, description="Relaciones a incluir: cliente, vehiculo"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_staff_user)
 ):
     """Lista alquileres activos"""
-    alquileres = db.query(Alquiler).options(
-        joinedload(Alquiler.cliente),
-        joinedload(Alquiler.vehiculo)
-    ).filter(Alquiler.estado == "activo").all()
-    return alquileres
+    parcial = RECURSO_ALQUILER.interpretar(fields, expand)
+    if parcial is not None:
+        alquileres = db.query(Alquiler).options(
+            *RECURSO_ALQUILER.opciones(*parcial)
+        ).filter(Alquiler.estado == "activo").all()
+        return RECURSO_ALQUILER.responder(alquileres, *parcial)
+    
+    return LISTADO_ALQUILERES.responder(db, LISTADO_ALQUILERES.select().where(Alquiler.estado == "activo"))
+
+
+def _ultima_modificacion(*marcas):
+    """El alquiler incluye cliente y vehículo: cambia si cambia cualquiera de los tres"""
+    marcas = [m for m in marcas if m is not None]
+    return max(marcas) if marcas else None
 
 
 @router.get("/{alquiler_id}", response_model=AlquilerResponse)
 def get_alquiler(
     alquiler_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_staff_user)
 ):
-    """Obtiene un alquiler por ID"""
+    """Obtiene un alquiler por ID (admite If-None-Match / If-Modified-Since)"""
+    if es_condicional(request):
+        marcas = db.query(Alquiler.updated_at, Cliente.updated_at, Vehiculo.updated_at).join(
+            Cliente, Alquiler.cliente_id == Cliente.id
+        ).join(
+            Vehiculo, Alquiler.vehiculo_id == Vehiculo.id
+        ).filter(Alquiler.id == alquiler_id).first()
+        if marcas is not None:
+            no_modificada = no_modificado(request, alquiler_id, _ultima_modificacion(*marcas))
+            if no_modificada is not None:
+                return no_modificada
+    
     alquiler = db.query(Alquiler).options(
         joinedload(Alquiler.cliente),
         joinedload(Alquiler.vehiculo)
@@ -64,6 +134,9 @@ def get_alquiler(
     
     if not alquiler:
         raise HTTPException(status_code=404, detail="Alquiler no encontrado")
+    response.headers.update(validadores(alquiler.id, _ultima_modificacion(
+        alquiler.updated_at, alquiler.cliente.updated_at, alquiler.vehiculo.updated_at
+    )))
     return alquiler
 
 
@@ -162,7 +235,10 @@ def create_alquiler(
     vehiculo.estado = "alquilado"
     
     db.add(db_alquiler)
+    registrar_recaudacion_alquiler(db, db_alquiler)
     db.commit()
+    bus.publicar("alquiler", db_alquiler.id, "crear")
+    bus.publicar("vehiculo", alquiler_data.vehiculo_id, estado="alquilado", estado_anterior="disponible")
     db.refresh(db_alquiler)
     
     # Cargar relaciones
@@ -192,11 +268,17 @@ def cancelar_alquiler(
         )
     
     # Liberar vehículo
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == alquiler.vehiculo_id).first()
+    vehiculo_id = alquiler.vehiculo_id
+    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
+    estado_anterior = vehiculo.estado if vehiculo else None
     if vehiculo:
         vehiculo.estado = "disponible"
     
     alquiler.estado = "cancelado"
+    registrar_recaudacion_alquiler(db, alquiler, signo=-1)
     db.commit()
+    bus.publicar("alquiler", alquiler_id, "cancelar")
+    if vehiculo:
+        bus.publicar("vehiculo", vehiculo_id, estado="disponible", estado_anterior=estado_anterior)
     
     return {"message": "Alquiler cancelado exitosamente"}
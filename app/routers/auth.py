@@ -7,6 +7,7 @@ from app.database import get_db
 from app.models import Usuario
 from app.schemas import UsuarioCreate, UsuarioResponse, UsuarioLogin, Token
 from app.auth import verify_password, get_password_hash, create_access_token, get_current_user
+from app.bus import bus
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
 
@@ -87,13 +88,16 @@ def change_password(
     db: Session = Depends(get_db)
 ):
     """Cambia la contraseña del usuario actual"""
-    if not verify_password(old_password, current_user.password_hash):
+    # current_user puede venir de la caché de principales (fuera de la sesión)
+    usuario = db.get(Usuario, current_user.id)
+    if not verify_password(old_password, usuario.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contraseña actual incorrecta"
         )
     
-    current_user.password_hash = get_password_hash(new_password)
+    usuario.password_hash = get_password_hash(new_password)
     db.commit()
+    bus.publicar("usuario", usuario.id)
     
     return {"message": "Contraseña actualizada exitosamente"}
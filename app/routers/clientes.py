@@ -1,45 +1,77 @@
 """
 ECO-MOVE API - Clientes Router
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import Cliente, Usuario
+from app.models import Alquiler, Cliente, Usuario
 from app.schemas import ClienteCreate, ClienteUpdate, ClienteResponse
+from app.bus import bus
+from app.cache import es_condicional, no_modificado, validadores, verificar_if_match
 from app.auth import get_current_user, get_staff_user
+from app.fastpath import LISTADO_CLIENTES
+from app.params import parse_ids
+from app.search import MIN_BUSQUEDA, buscador_clientes
 
 router = APIRouter(prefix="/clientes", tags=["Clientes"])
 
 
-@router.get("/", response_model=List[ClienteResponse])
+@router.get("/", response_model=Union[List[ClienteResponse], Dict[int, Optional[ClienteResponse]]])
 def get_clientes(
     skip: int = 0,
     limit: int = 100,
     es_frecuente: bool = None,
+    ids: Optional[str] = Query(None, description="Ids separados por comas; responde un objeto {id: cliente|null}"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_staff_user)
 ):
     """Lista todos los clientes (admin/empleado)"""
-    query = db.query(Cliente)
+    lista_ids = parse_ids(ids)
+    if lista_ids is not None:
+        encontrados = {c.id: c for c in db.query(Cliente).filter(Cliente.id.in_(lista_ids)).all()}
+        return {i: encontrados.get(i) for i in lista_ids}
+    
+    stmt = LISTADO_CLIENTES.select()
     
     if es_frecuente is not None:
-        query = query.filter(Cliente.es_frecuente == es_frecuente)
+        stmt = stmt.where(Cliente.es_frecuente == es_frecuente)
     
-    clientes = query.offset(skip).limit(limit).all()
-    return clientes
+    return LISTADO_CLIENTES.responder(db, stmt.offset(skip).limit(limit))
+
+
+@router.get("/buscar", response_model=List[ClienteResponse])
+def buscar_clientes(
+    q: str = Query(..., min_length=MIN_BUSQUEDA, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_staff_user)
+):
+    """Busca clientes por nombre, apellido, DNI, teléfono o email (más relevantes primero)"""
+    return buscador_clientes.buscar(db, q, limit)
 
 
 @router.get("/{cliente_id}", response_model=ClienteResponse)
 def get_cliente(
     cliente_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_staff_user)
 ):
-    """Obtiene un cliente por ID"""
+    """Obtiene un cliente por ID (admite If-None-Match / If-Modified-Since)"""
+    if es_condicional(request):
+        marca = db.query(Cliente.updated_at).filter(Cliente.id == cliente_id).first()
+        if marca is not None:
+            no_modificada = no_modificado(request, cliente_id, marca.updated_at, fuerte=True)
+            if no_modificada is not None:
+                return no_modificada
+    
     cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    response.headers.update(validadores(cliente.id, cliente.updated_at, fuerte=True))
     return cliente
 
 
@@ -74,6 +106,7 @@ def create_cliente(
     db_cliente = Cliente(**cliente.model_dump())
     db.add(db_cliente)
     db.commit()
+    bus.publicar("cliente", db_cliente.id, "crear")
     db.refresh(db_cliente)
     return db_cliente
 
@@ -82,20 +115,29 @@ def create_cliente(
 def update_cliente(
     cliente_id: int,
     cliente_update: ClienteUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_staff_user)
 ):
-    """Actualiza un cliente"""
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+    """Actualiza un cliente (con If-Match responde 412 si cambió desde que se leyó)"""
+    query = db.query(Cliente).filter(Cliente.id == cliente_id)
+    if "if-match" in request.headers:
+        # La fila queda bloqueada entre la verificación y el commit
+        query = query.with_for_update()
+    cliente = query.first()
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    verificar_if_match(request, cliente.id, cliente.updated_at)
     
     update_data = cliente_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(cliente, field, value)
     
     db.commit()
+    bus.publicar("cliente", cliente_id)
     db.refresh(cliente)
+    response.headers.update(validadores(cliente.id, cliente.updated_at, fuerte=True))
     return cliente
 
 
@@ -110,15 +152,17 @@ def delete_cliente(
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     
-    # Verificar que no tenga alquileres activos
-    if cliente.alquileres:
-        alquileres_activos = [a for a in cliente.alquileres if a.estado == "activo"]
-        if alquileres_activos:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No se puede eliminar un cliente con alquileres activos"
-            )
+    # Verificar que no tenga alquileres activos (EXISTS, sin cargar el historial)
+    tiene_activos = db.query(
+        exists().where(Alquiler.cliente_id == cliente_id, Alquiler.estado == "activo")
+    ).scalar()
+    if tiene_activos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se puede eliminar un cliente con alquileres activos"
+        )
     
     db.delete(cliente)
     db.commit()
+    bus.publicar("cliente", cliente_id, "eliminar")
     return {"message": "Cliente eliminado exitosamente"}
@@ -1,14 +1,17 @@
 """
 ECO-MOVE API - Devoluciones Router
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
 from app.models import Devolucion, Alquiler, Vehiculo, Usuario
 from app.schemas import DevolucionCreate, DevolucionResponse, DevolucionCalculada
+from app.bus import bus
+from app.fastpath import LISTADO_DEVOLUCIONES
+from app.fieldsets import RECURSO_DEVOLUCION
 from app.auth import get_staff_user
-from app.services import calcular_devolucion
+from app.services import calcular_devolucion, registrar_recaudacion
 
 router = APIRouter(prefix="/devoluciones", tags=["Devoluciones"])
 
@@ -17,15 +20,21 @@ router = APIRouter(prefix="/devoluciones", tags=["Devoluciones"])
 def get_devoluciones(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = Query(None, description="Campos a incluir, separados por comas"),
+    expand: Optional[str] = Query(None, description="Relaciones a incluir: alquiler, alquiler.cliente, alquiler.vehiculo"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_staff_user)
 ):
-    """Lista todas las devoluciones"""
-    devoluciones = db.query(Devolucion).options(
-        joinedload(Devolucion.alquiler).joinedload(Alquiler.cliente),
-        joinedload(Devolucion.alquiler).joinedload(Alquiler.vehiculo)
-    ).order_by(Devolucion.created_at.desc()).offset(skip).limit(limit).all()
-    return devoluciones
+    """Lista todas las devoluciones (fields=/expand= devuelven una vista parcial)"""
+    parcial = RECURSO_DEVOLUCION.interpretar(fields, expand)
+    if parcial is not None:
+        devoluciones = db.query(Devolucion).options(
+            *RECURSO_DEVOLUCION.opciones(*parcial)
+        ).order_by(Devolucion.created_at.desc()).offset(skip).limit(limit).all()
+        return RECURSO_DEVOLUCION.responder(devoluciones, *parcial)
+    
+    stmt = LISTADO_DEVOLUCIONES.select().order_by(Devolucion.created_at.desc()).offset(skip).limit(limit)
+    return LISTADO_DEVOLUCIONES.responder(db, stmt)
 
 
 @router.get("/{devolucion_id}", response_model=DevolucionResponse)
@@ -116,12 +125,23 @@ def create_devolucion(
     alquiler.estado = "devuelto"
     
     # Liberar vehículo
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == alquiler.vehiculo_id).first()
+    vehiculo_id = alquiler.vehiculo_id
+    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
+    estado_anterior = vehiculo.estado if vehiculo else None
     if vehiculo:
         vehiculo.estado = "disponible"
     
     db.add(db_devolucion)
+    registrar_recaudacion(
+        db,
+        fecha=devolucion_data.fecha_devolucion_real,
+        vehiculo_id=vehiculo_id,
+        multas=calculos["multa"],
+    )
     db.commit()
+    bus.publicar("devolucion", db_devolucion.id, "crear")
+    if vehiculo:
+        bus.publicar("vehiculo", vehiculo_id, estado="disponible", estado_anterior=estado_anterior)
     db.refresh(db_devolucion)
     
     # Cargar relaciones
@@ -0,0 +1,26 @@
+"""
+ECO-MOVE API - Perfiles Router
+"""
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.models import Usuario
+from app.auth import get_admin_user
+from app.profiling import listar_perfiles, ruta_perfil
+
+router = APIRouter(prefix="/perfiles", tags=["Perfiles"])
+
+
+@router.get("/", response_model=List[str])
+def get_perfiles(current_user: Usuario = Depends(get_admin_user)):
+    """Perfiles guardados, del más reciente al más antiguo (solo admin)"""
+    return listar_perfiles()
+
+
+@router.get("/{nombre}")
+def get_perfil(nombre: str, current_user: Usuario = Depends(get_admin_user)):
+    """Descarga un perfil: pilas .folded o resumen .top.txt (solo admin)"""
+    ruta = ruta_perfil(nombre)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(ruta, media_type="text/plain; charset=utf-8")
@@ -1,30 +1,120 @@
 """
 ECO-MOVE API - Reportes Router
 """
-from typing import List
-from fastapi import APIRouter, Depends
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.database import get_db
-from app.models import Usuario
+from sqlalchemy import text, func
+from app.config import get_settings
+from app.database import get_db, engine, SessionLocal
+from app.models import Usuario, RecaudacionPeriodo
+from app.analytics import VISTAS, get_almacen
+from app.cache import (
+    cache_reportes,
+    etag_coincide,
+    etag_version,
+    get_version_datos
+)
 from app.schemas import (
     ClienteMultiplesAlquileresResponse,
     VehiculoMasAlquiladoResponse,
-    TotalRecaudadoResponse
+    TotalRecaudadoResponse,
+    RecaudacionPeriodoResponse,
+    GranularidadEnum,
+    FormatoExportEnum
 )
-from app.auth import get_staff_user
+from app.auth import get_staff_user, get_admin_user
+from app.bus import bus
+from app.services import inicio_periodo, reconstruir_recaudacion
+from app.export import exportar_filas
+
+settings = get_settings()
 
 router = APIRouter(prefix="/reportes", tags=["Reportes"])
 
+# Ventana por defecto de la serie de recaudación según granularidad
+VENTANA_SERIE = {
+    GranularidadEnum.dia: timedelta(days=90),
+    GranularidadEnum.semana: timedelta(weeks=52),
+    GranularidadEnum.mes: timedelta(days=730),
+}
 
-@router.get("/clientes-multiples-alquileres", response_model=List[ClienteMultiplesAlquileresResponse])
-def get_clientes_multiples_alquileres(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_staff_user)
-):
-    """Clientes que alquilaron más de un vehículo"""
-    result = db.execute(text("SELECT * FROM v_clientes_multiples_alquileres"))
-    rows = result.fetchall()
+# Columnas de cada reporte en exportaciones columnares (mismos nombres que el JSON)
+COLUMNAS_REPORTES = {
+    "clientes_multiples_alquileres": ["id", "nombre", "apellido", "dni", "total_alquileres"],
+    "vehiculos_mas_alquilados": ["id", "codigo", "nombre", "total_alquileres", "ingresos_generados"],
+    "alquileres_doble_descuento": [
+        "id", "cliente", "vehiculo", "fecha_inicio", "fecha_tentativa_devolucion", "dias",
+        "importe", "descuento_uso_extendido", "descuento_cliente_frecuente", "total_pagar",
+    ],
+    "total_recaudado": ["total_alquileres", "total_depositos", "total_multas", "total_recaudado"],
+    "clientes_multa_mayor_deposito": [
+        "id", "nombre", "apellido", "dni", "alquiler_id", "deposito", "multa", "monto_adicional",
+    ],
+}
+
+
+def _consultar(db: Session, reporte: str) -> list:
+    """Filas del reporte desde el almacén analítico si está habilitado, o desde la vista en vivo"""
+    almacen = get_almacen()
+    if almacen is not None:
+        return almacen.consultar(db, reporte)
+    return db.execute(text(f"SELECT * FROM {VISTAS[reporte]}")).fetchall()
+
+
+def _respuesta_cacheada(request: Request, construir: Callable, clave: Optional[str] = None) -> Response:
+    """
+    Sirve el reporte desde la caché de la versión de datos actual, con ETag.
+    Si el cliente ya tiene esa versión responde 304 sin consultar ni serializar.
+    """
+    version = get_version_datos()
+    clave = clave or f"{request.url.path}?{request.url.query}"
+    etag = etag_version(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    cuerpo = cache_reportes.get(clave, version)
+    if cuerpo is None:
+        cuerpo = JSONResponse(content=jsonable_encoder(construir())).body
+        cache_reportes.set(clave, version, cuerpo)
+    
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
+
+
+def _responder_reporte(
+    request: Request,
+    db: Session,
+    reporte: str,
+    construir: Callable,
+    formato: Optional[FormatoExportEnum]
+) -> Response:
+    """JSON cacheado por versión, o exportación Arrow/Parquet directa de las filas"""
+    if formato in (FormatoExportEnum.arrow, FormatoExportEnum.parquet):
+        return exportar_filas(COLUMNAS_REPORTES[reporte], _consultar(db, reporte), formato, reporte)
+    return _respuesta_cacheada(request, lambda: construir(db))
+
+
+def _get_almacen_o_404():
+    """Almacén analítico configurado o 404 si está deshabilitado"""
+    almacen = get_almacen()
+    if almacen is None:
+        raise HTTPException(status_code=404, detail="Almacén analítico deshabilitado")
+    return almacen
+
+
+# =====================================================
+# CONSTRUCCIÓN DE REPORTES
+# =====================================================
+def _clientes_multiples_alquileres(db: Session) -> List[ClienteMultiplesAlquileresResponse]:
+    rows = _consultar(db, "clientes_multiples_alquileres")
     
     return [
         ClienteMultiplesAlquileresResponse(
@@ -38,14 +128,8 @@ def get_clientes_multiples_alquileres(
     ]
 
 
-@router.get("/vehiculos-mas-alquilados", response_model=List[VehiculoMasAlquiladoResponse])
-def get_vehiculos_mas_alquilados(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_staff_user)
-):
-    """Vehículos más alquilados"""
-    result = db.execute(text("SELECT * FROM v_vehiculos_mas_alquilados"))
-    rows = result.fetchall()
+def _vehiculos_mas_alquilados(db: Session) -> List[VehiculoMasAlquiladoResponse]:
+    rows = _consultar(db, "vehiculos_mas_alquilados")
     
     return [
         VehiculoMasAlquiladoResponse(
@@ -59,14 +143,8 @@ def get_vehiculos_mas_alquilados(
     ]
 
 
-@router.get("/alquileres-doble-descuento")
-def get_alquileres_doble_descuento(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_staff_user)
-):
-    """Alquileres con descuento de cliente frecuente y uso extendido"""
-    result = db.execute(text("SELECT * FROM v_alquileres_doble_descuento"))
-    rows = result.fetchall()
+def _alquileres_doble_descuento(db: Session) -> List[dict]:
+    rows = _consultar(db, "alquileres_doble_descuento")
     
     return [
         {
@@ -85,14 +163,9 @@ def get_alquileres_doble_descuento(
     ]
 
 
-@router.get("/total-recaudado", response_model=TotalRecaudadoResponse)
-def get_total_recaudado(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_staff_user)
-):
-    """Total recaudado por ECO-MOVE (importe neto + depósitos + multas)"""
-    result = db.execute(text("SELECT * FROM v_total_recaudado"))
-    row = result.fetchone()
+def _total_recaudado(db: Session) -> TotalRecaudadoResponse:
+    rows = _consultar(db, "total_recaudado")
+    row = rows[0] if rows else None
     
     if not row:
         return TotalRecaudadoResponse(
@@ -110,14 +183,8 @@ def get_total_recaudado(
     )
 
 
-@router.get("/clientes-multa-mayor-deposito")
-def get_clientes_multa_mayor_deposito(
-    db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_staff_user)
-):
-    """Clientes que devolvieron tarde y pagaron multa mayor al depósito"""
-    result = db.execute(text("SELECT * FROM v_clientes_multa_mayor_deposito"))
-    rows = result.fetchall()
+def _clientes_multa_mayor_deposito(db: Session) -> List[dict]:
+    rows = _consultar(db, "clientes_multa_mayor_deposito")
     
     return [
         {
@@ -132,3 +199,253 @@ def get_clientes_multa_mayor_deposito(
         }
         for row in rows
     ]
+
+
+def _recaudacion_serie(
+    db: Session,
+    granularidad: GranularidadEnum,
+    vehiculo_id: Optional[int],
+    desde: date,
+    hasta: date
+) -> List[RecaudacionPeriodoResponse]:
+    query = db.query(
+        RecaudacionPeriodo.periodo,
+        func.sum(RecaudacionPeriodo.alquileres),
+        func.sum(RecaudacionPeriodo.importe),
+        func.sum(RecaudacionPeriodo.descuentos),
+        func.sum(RecaudacionPeriodo.depositos),
+        func.sum(RecaudacionPeriodo.multas),
+    ).filter(
+        RecaudacionPeriodo.granularidad == granularidad.value,
+        RecaudacionPeriodo.periodo >= desde,
+        RecaudacionPeriodo.periodo <= hasta,
+    )
+    
+    if vehiculo_id:
+        query = query.filter(RecaudacionPeriodo.vehiculo_id == vehiculo_id)
+    
+    rows = query.group_by(RecaudacionPeriodo.periodo).order_by(RecaudacionPeriodo.periodo).all()
+    
+    return [
+        RecaudacionPeriodoResponse(
+            periodo=row[0],
+            alquileres=row[1] or 0,
+            importe=row[2] or 0,
+            descuentos=row[3] or 0,
+            depositos=row[4] or 0,
+            multas=row[5] or 0,
+            neto=(row[2] or 0) - (row[3] or 0),
+            total_recaudado=(row[2] or 0) - (row[3] or 0) + (row[4] or 0) + (row[5] or 0),
+        )
+        for row in rows
+    ]
+
+
+# Secciones del dashboard (se ejecutan en paralelo sobre el mismo snapshot)
+SECCIONES_DASHBOARD = {
+    "total_recaudado": _total_recaudado,
+    "vehiculos_mas_alquilados": _vehiculos_mas_alquilados,
+    "clientes_multiples_alquileres": _clientes_multiples_alquileres,
+    "alquileres_doble_descuento": _alquileres_doble_descuento,
+    "clientes_multa_mayor_deposito": _clientes_multa_mayor_deposito,
+}
+
+# Dashboards en paralelo a la vez: cada uno ocupa la conexión líder más una por
+# sección, y no deben tomar más de la mitad del pool (el resto queda para las
+# demás solicitudes). Sin cupo, las secciones corren en serie en una conexión.
+DASHBOARDS_PARALELOS = (settings.db_pool_size + settings.db_max_overflow) // (2 * (len(SECCIONES_DASHBOARD) + 1))
+
+_cupos_dashboard = threading.BoundedSemaphore(DASHBOARDS_PARALELOS)
+
+_ejecutor_dashboard = ThreadPoolExecutor(
+    max_workers=max(1, DASHBOARDS_PARALELOS) * len(SECCIONES_DASHBOARD),
+    thread_name_prefix="dashboard"
+)
+
+
+def _ejecutar_seccion(construir: Callable, snapshot: str) -> tuple:
+    """Ejecuta una sección en su propia conexión importando el snapshot exportado"""
+    inicio = time.perf_counter()
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        conn.execute(text("SET TRANSACTION SNAPSHOT :snapshot"), {"snapshot": snapshot})
+        db = SessionLocal(bind=conn)
+        try:
+            datos = construir(db)
+        finally:
+            db.close()
+        conn.rollback()
+    return datos, (time.perf_counter() - inicio) * 1000
+
+
+def _secciones_en_serie(db: Session, resultado: dict, tiempos: dict) -> None:
+    for nombre, construir in SECCIONES_DASHBOARD.items():
+        inicio_seccion = time.perf_counter()
+        resultado[nombre] = construir(db)
+        tiempos[nombre] = (time.perf_counter() - inicio_seccion) * 1000
+
+
+def _dashboard(db: Session) -> dict:
+    """
+    Ejecuta todos los reportes. En PostgreSQL, si hay cupo, cada sección usa una
+    conexión del pool en paralelo, todas dentro del mismo snapshot REPEATABLE READ
+    (pg_export_snapshot); sin cupo, en serie dentro de una transacción REPEATABLE
+    READ. En otros motores se ejecutan en serie.
+    """
+    inicio = time.perf_counter()
+    resultado = {}
+    tiempos = {}
+    
+    if engine.dialect.name == "postgresql" and get_almacen() is None:
+        # La sesión de la solicitud (autenticación) devuelve su conexión antes de pedir las del dashboard
+        db.close()
+        if _cupos_dashboard.acquire(blocking=False):
+            try:
+                with engine.connect().execution_options(isolation_level="REPEATABLE READ") as lider:
+                    # El snapshot sigue siendo importable mientras la transacción líder esté abierta
+                    snapshot = lider.execute(text("SELECT pg_export_snapshot()")).scalar()
+                    futuros = {
+                        nombre: _ejecutor_dashboard.submit(_ejecutar_seccion, construir, snapshot)
+                        for nombre, construir in SECCIONES_DASHBOARD.items()
+                    }
+                    for nombre, futuro in futuros.items():
+                        resultado[nombre], tiempos[nombre] = futuro.result()
+                    lider.rollback()
+            finally:
+                _cupos_dashboard.release()
+        else:
+            with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+                db_snapshot = SessionLocal(bind=conn)
+                try:
+                    _secciones_en_serie(db_snapshot, resultado, tiempos)
+                finally:
+                    db_snapshot.close()
+                conn.rollback()
+    else:
+        _secciones_en_serie(db, resultado, tiempos)
+    
+    tiempos["total"] = (time.perf_counter() - inicio) * 1000
+    resultado["tiempos_ms"] = {nombre: round(ms, 2) for nombre, ms in tiempos.items()}
+    return resultado
+
+
+# =====================================================
+# ENDPOINTS
+# =====================================================
+@router.get("/dashboard")
+def get_dashboard(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_staff_user)
+):
+    """Todos los reportes del dashboard en una sola respuesta consistente"""
+    return _respuesta_cacheada(request, lambda: _dashboard(db))
+
+
+@router.get("/clientes-multiples-alquileres", response_model=List[ClienteMultiplesAlquileresResponse])
+def get_clientes_multiples_alquileres(
+    request: Request,
+    formato: Optional[FormatoExportEnum] = Query(None, alias="format"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_staff_user)
+):
+    """Clientes que alquilaron más de un vehículo"""
+    return _responder_reporte(request, db, "clientes_multiples_alquileres", _clientes_multiples_alquileres, formato)
+
+
+@router.get("/vehiculos-mas-alquilados", response_model=List[VehiculoMasAlquiladoResponse])
+def get_vehiculos_mas_alquilados(
+    request: Request,
+    formato: Optional[FormatoExportEnum] = Query(None, alias="format"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_staff_user)
+):
+    """Vehículos más alquilados"""
+    return _responder_reporte(request, db, "vehiculos_mas_alquilados", _vehiculos_mas_alquilados, formato)
+
+
+@router.get("/alquileres-doble-descuento")
+def get_alquileres_doble_descuento(
+    request: Request,
+    formato: Optional[FormatoExportEnum] = Query(None, alias="format"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_staff_user)
+):
+    """Alquileres con descuento de cliente frecuente y uso extendido"""
+    return _responder_reporte(request, db, "alquileres_doble_descuento", _alquileres_doble_descuento, formato)
+
+
+@router.get("/total-recaudado", response_model=TotalRecaudadoResponse)
+def get_total_recaudado(
+    request: Request,
+    formato: Optional[FormatoExportEnum] = Query(None, alias="format"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_staff_user)
+):
+    """Total recaudado por ECO-MOVE (importe neto + depósitos + multas)"""
+    return _responder_reporte(request, db, "total_recaudado", _total_recaudado, formato)
+
+
+@router.get("/recaudacion-serie", response_model=List[RecaudacionPeriodoResponse])
+def get_recaudacion_serie(
+    request: Request,
+    granularidad: GranularidadEnum = GranularidadEnum.dia,
+    vehiculo_id: Optional[int] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_staff_user)
+):
+    """Serie de recaudación por día, semana o mes (opcionalmente de un vehículo)"""
+    hasta = hasta or date.today()
+    desde = inicio_periodo(desde or hasta - VENTANA_SERIE[granularidad], granularidad.value)
+    
+    return _respuesta_cacheada(
+        request,
+        lambda: _recaudacion_serie(db, granularidad, vehiculo_id, desde, hasta),
+        clave=f"recaudacion-serie:{granularidad.value}:{vehiculo_id}:{desde}:{hasta}",
+    )
+
+
+@router.post("/recaudacion-serie/reconstruir")
+def reconstruir_recaudacion_serie(
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_admin_user)
+):
+    """Recalcula el acumulado de recaudación desde los datos históricos"""
+    periodos = reconstruir_recaudacion(db)
+    bus.publicar("recaudacion", accion="reconstruir")
+    return {"periodos": periodos}
+
+
+@router.get("/clientes-multa-mayor-deposito")
+def get_clientes_multa_mayor_deposito(
+    request: Request,
+    formato: Optional[FormatoExportEnum] = Query(None, alias="format"),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_staff_user)
+):
+    """Clientes que devolvieron tarde y pagaron multa mayor al depósito"""
+    return _responder_reporte(request, db, "clientes_multa_mayor_deposito", _clientes_multa_mayor_deposito, formato)
+
+
+@router.post("/analytics/sincronizar")
+def sincronizar_analytics(
+    completa: bool = False,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_admin_user)
+):
+    """Sincroniza el almacén analítico (completa=true reconstruye la copia)"""
+    almacen = _get_almacen_o_404()
+    filas = almacen.sincronizar(db, completa=completa)
+    bus.publicar("analytics", accion="sincronizar")
+    return {"filas_sincronizadas": filas}
+
+
+@router.get("/analytics/consistencia")
+def get_consistencia_analytics(
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_admin_user)
+):
+    """Compara los reportes del almacén analítico contra las vistas en vivo"""
+    almacen = _get_almacen_o_404()
+    return almacen.verificar_consistencia(db)
@@ -8,6 +8,7 @@ from app.database import get_db
 from app.models import Usuario
 from app.schemas import UsuarioResponse, UsuarioUpdate
 from app.auth import get_admin_user, get_password_hash
+from app.bus import bus
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
 
@@ -57,6 +58,7 @@ def update_usuario(
             setattr(usuario, field, value)
     
     db.commit()
+    bus.publicar("usuario", usuario_id)
     db.refresh(usuario)
     return usuario
 
@@ -80,5 +82,6 @@ def delete_usuario(
     
     usuario.activo = False
     db.commit()
+    bus.publicar("usuario", usuario_id, "desactivar")
     
     return {"message": "Usuario desactivado exitosamente"}
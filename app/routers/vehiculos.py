@@ -1,69 +1,130 @@
 """
 ECO-MOVE API - Vehículos Router
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Vehiculo, Usuario
+from app.database import get_db, SessionLocal
+from app.models import Alquiler, Vehiculo, Usuario
 from app.schemas import VehiculoCreate, VehiculoUpdate, VehiculoResponse, EstadoVehiculoEnum
-from app.auth import get_current_user, get_staff_user, get_admin_user
+from app.bus import bus
+from app.cache import no_modificado, validadores, verificar_if_match
+from app.catalog import catalogo
+from app.compression import precomprimida, sin_compresion
+from app.params import parse_ids, parse_lista
+from app.events import broker_estados
+from app.auth import get_current_user, get_staff_user, get_admin_user, autenticar_token, security
 
 router = APIRouter(prefix="/vehiculos", tags=["Vehículos"])
 
 
-@router.get("/", response_model=List[VehiculoResponse])
+@router.get("/", response_model=Union[List[VehiculoResponse], Dict[str, Optional[VehiculoResponse]]])
+@precomprimida
 def get_vehiculos(
     skip: int = 0,
     limit: int = 100,
     estado: EstadoVehiculoEnum = None,
+    ids: Optional[str] = Query(None, description="Ids separados por comas; responde un objeto {id: vehículo|null}"),
+    codigos: Optional[str] = Query(None, description="Códigos separados por comas; responde un objeto {código: vehículo|null}"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Lista todos los vehículos"""
-    query = db.query(Vehiculo)
+    snapshot = catalogo.snapshot(db)
+    lista_ids = parse_ids(ids)
+    if lista_ids is not None:
+        return Response(content=snapshot.por_claves(lista_ids, snapshot.por_id), media_type="application/json")
+    lista_codigos = parse_lista(codigos, "codigos")
+    if lista_codigos is not None:
+        lista_codigos = [codigo.upper() for codigo in lista_codigos]
+        return Response(content=snapshot.por_claves(lista_codigos, snapshot.por_codigo), media_type="application/json")
     
-    if estado:
-        query = query.filter(Vehiculo.estado == estado.value)
-    
-    vehiculos = query.offset(skip).limit(limit).all()
-    return vehiculos
+    cuerpo = snapshot.lista(
+        estado=estado.value if estado else None,
+        skip=skip,
+        limit=limit
+    )
+    return Response(content=cuerpo, media_type="application/json")
 
 
 @router.get("/disponibles", response_model=List[VehiculoResponse])
+@precomprimida
 def get_vehiculos_disponibles(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Lista vehículos disponibles para alquilar"""
-    vehiculos = db.query(Vehiculo).filter(Vehiculo.estado == "disponible").all()
-    return vehiculos
+    cuerpo = catalogo.snapshot(db).lista(estado="disponible")
+    return Response(content=cuerpo, media_type="application/json")
+
+
+def _autenticar_stream(token: str) -> None:
+    """Autentica con una sesión propia que se cierra antes de abrir el stream"""
+    db = SessionLocal()
+    try:
+        autenticar_token(token, db)
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+@sin_compresion
+async def stream_estados_vehiculos(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Stream Server-Sent Events con los cambios de estado de los vehículos.
+    Reanuda desde Last-Event-ID; si no es posible envía un evento 'reset'
+    para que el cliente recargue /vehiculos/disponibles.
+    """
+    # No se usa get_db: una conexión del pool retenida por cada stream abierto agotaría el pool
+    await run_in_threadpool(_autenticar_stream, credentials.credentials)
+    
+    return StreamingResponse(
+        broker_estados.suscribir(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _responder_vehiculo(request: Request, snapshot, vehiculo_id: Optional[int]) -> Response:
+    """JSON del catálogo con ETag / Last-Modified, o 304 si el cliente ya lo tiene"""
+    cuerpo = snapshot.por_id(vehiculo_id) if vehiculo_id is not None else None
+    if cuerpo is None:
+        raise HTTPException(status_code=404, detail="Vehículo no encontrado")
+    updated_at = snapshot.updated_por_id.get(vehiculo_id)
+    no_modificada = no_modificado(request, vehiculo_id, updated_at, fuerte=True)
+    if no_modificada is not None:
+        return no_modificada
+    return Response(content=cuerpo, media_type="application/json", headers=validadores(vehiculo_id, updated_at, fuerte=True))
 
 
 @router.get("/{vehiculo_id}", response_model=VehiculoResponse)
 def get_vehiculo(
     vehiculo_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
-    """Obtiene un vehículo por ID"""
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
-    if not vehiculo:
-        raise HTTPException(status_code=404, detail="Vehículo no encontrado")
-    return vehiculo
+    """Obtiene un vehículo por ID (admite If-None-Match / If-Modified-Since)"""
+    return _responder_vehiculo(request, catalogo.snapshot(db), vehiculo_id)
 
 
 @router.get("/codigo/{codigo}", response_model=VehiculoResponse)
 def get_vehiculo_by_codigo(
     codigo: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """Busca un vehículo por código"""
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.codigo == codigo.upper()).first()
-    if not vehiculo:
-        raise HTTPException(status_code=404, detail="Vehículo no encontrado")
-    return vehiculo
+    snapshot = catalogo.snapshot(db)
+    return _responder_vehiculo(request, snapshot, snapshot.id_por_codigo.get(codigo.upper()))
 
 
 @router.post("/", response_model=VehiculoResponse, status_code=status.HTTP_201_CREATED)
@@ -85,6 +146,7 @@ def create_vehiculo(
     db_vehiculo.codigo = db_vehiculo.codigo.upper()
     db.add(db_vehiculo)
     db.commit()
+    bus.publicar("vehiculo", db_vehiculo.id, "crear")
     db.refresh(db_vehiculo)
     return db_vehiculo
 
@@ -93,23 +155,34 @@ def create_vehiculo(
 def update_vehiculo(
     vehiculo_id: int,
     vehiculo_update: VehiculoUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_admin_user)
 ):
-    """Actualiza un vehículo (solo admin)"""
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
+    """Actualiza un vehículo (solo admin; con If-Match responde 412 si cambió desde que se leyó)"""
+    query = db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id)
+    if "if-match" in request.headers:
+        # La fila queda bloqueada entre la verificación y el commit
+        query = query.with_for_update()
+    vehiculo = query.first()
     if not vehiculo:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
+    verificar_if_match(request, vehiculo.id, vehiculo.updated_at)
     
+    estado_anterior = vehiculo.estado
     update_data = vehiculo_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if field == "estado":
             setattr(vehiculo, field, value.value if value else None)
         else:
             setattr(vehiculo, field, value)
+    estado = vehiculo.estado
     
     db.commit()
+    bus.publicar("vehiculo", vehiculo_id, estado=estado, estado_anterior=estado_anterior)
     db.refresh(vehiculo)
+    response.headers.update(validadores(vehiculo.id, vehiculo.updated_at, fuerte=True))
     return vehiculo
 
 
@@ -125,8 +198,10 @@ def update_vehiculo_estado(
     if not vehiculo:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
     
+    estado_anterior = vehiculo.estado
     vehiculo.estado = estado.value
     db.commit()
+    bus.publicar("vehiculo", vehiculo_id, estado=estado.value, estado_anterior=estado_anterior)
     
     return {"message": f"Estado actualizado a '{estado.value}'"}
 
@@ -142,15 +217,17 @@ def delete_vehiculo(
     if not vehiculo:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
     
-    # Verificar que no tenga alquileres activos
-    if vehiculo.alquileres:
-        alquileres_activos = [a for a in vehiculo.alquileres if a.estado == "activo"]
-        if alquileres_activos:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No se puede eliminar un vehículo con alquileres activos"
-            )
+    # Verificar que no tenga alquileres activos (EXISTS, sin cargar el historial)
+    tiene_activos = db.query(
+        exists().where(Alquiler.vehiculo_id == vehiculo_id, Alquiler.estado == "activo")
+    ).scalar()
+    if tiene_activos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se puede eliminar un vehículo con alquileres activos"
+        )
     
     db.delete(vehiculo)
     db.commit()
+    bus.publicar("vehiculo", vehiculo_id, "eliminar")
     return {"message": "Vehículo eliminado exitosamente"}
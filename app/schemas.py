@@ -29,6 +29,18 @@ class EstadoAlquilerEnum(str, Enum):
     cancelado = "cancelado"
 
 
+class FormatoExportEnum(str, Enum):
+    json = "json"
+    arrow = "arrow"
+    parquet = "parquet"
+
+
+class GranularidadEnum(str, Enum):
+    dia = "dia"
+    semana = "semana"
+    mes = "mes"
+
+
 # =====================================================
 # USUARIO SCHEMAS
 # =====================================================
@@ -254,3 +266,14 @@ class TotalRecaudadoResponse(BaseModel):
     total_depositos: Optional[Decimal]
     total_multas: Optional[Decimal]
     total_recaudado: Optional[Decimal]
+
+
+class RecaudacionPeriodoResponse(BaseModel):
+    periodo: date
+    alquileres: int
+    importe: Decimal
+    descuentos: Decimal
+    depositos: Decimal
+    multas: Decimal
+    neto: Decimal
+    total_recaudado: Decimal
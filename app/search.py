@@ -0,0 +1,233 @@
+"""
+ECO-MOVE API - Búsqueda de Clientes
+Búsqueda por nombre, apellido, DNI, teléfono (solo dígitos) y email, sin distinguir
+mayúsculas ni tildes. En PostgreSQL usa un índice de trigramas (pg_trgm y unaccent);
+en otros motores, un índice de prefijos en memoria. Ambos dan el mismo primer
+resultado; difieren en el resto: los trigramas admiten errores de tipeo y
+coincidencias en medio de una palabra, y buscan "varios términos" como una sola frase.
+"""
+import logging
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.bus import TODAS, bus
+from app.models import Cliente
+
+logger = logging.getLogger(__name__)
+
+# Largo mínimo de la búsqueda: un patrón LIKE de dos letras no produce trigramas y
+# obligaría a recorrer todo el índice
+MIN_BUSQUEDA = 3
+
+# Debe coincidir exactamente con la expresión del índice para que el planificador lo use.
+# unaccent() no es IMMUTABLE: el índice usa un envoltorio que fija el diccionario.
+# El teléfono se indexa sin separadores, como en el índice en memoria.
+EXPRESION_BUSQUEDA = (
+    "ecomove_unaccent(lower(coalesce(nombre, '') || ' ' || coalesce(apellido, '') || ' ' || dni"
+    " || ' ' || regexp_replace(coalesce(telefono, ''), '\\D', '', 'g') || ' ' || coalesce(email, '')))"
+)
+
+DDL_TRIGRAMAS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE OR REPLACE FUNCTION ecomove_unaccent(text) RETURNS text"
+    " LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    " AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$",
+    # Índices anteriores (sin unaccent / con el teléfono sin normalizar)
+    "DROP INDEX IF EXISTS ix_clientes_busqueda_trgm",
+    "DROP INDEX IF EXISTS ix_clientes_busqueda_unaccent_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_clientes_busqueda_norm_trgm ON clientes"
+    f" USING gin (({EXPRESION_BUSQUEDA}) gin_trgm_ops)",
+]
+
+CONSULTA_TRIGRAMAS = text(f"""
+    SELECT id
+    FROM clientes
+    WHERE {EXPRESION_BUSQUEDA} LIKE :patron OR :q <% {EXPRESION_BUSQUEDA}
+    ORDER BY lower(dni) = :q DESC,
+             {EXPRESION_BUSQUEDA} LIKE :prefijo DESC,
+             word_similarity(:q, {EXPRESION_BUSQUEDA}) DESC,
+             id
+    LIMIT :limit
+""")
+
+# En el índice en memoria, cuántas coincidencias de prefijo se consideran por término
+MAX_CANDIDATOS = 5000
+
+_trigramas_disponibles = False
+
+
+def crear_indices_busqueda(engine: Engine) -> None:
+    """Crea las extensiones y el índice de trigramas si el motor es PostgreSQL (idempotente)"""
+    global _trigramas_disponibles
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            for sentencia in DDL_TRIGRAMAS:
+                conn.execute(text(sentencia))
+        _trigramas_disponibles = True
+    except Exception:
+        logger.warning("pg_trgm o unaccent no disponibles; la búsqueda de clientes usará el índice en memoria", exc_info=True)
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes"""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def _tokens(cliente) -> List[str]:
+    tokens = normalizar(f"{cliente.nombre} {cliente.apellido}").split()
+    tokens.append(cliente.dni.lower())
+    if cliente.telefono:
+        tokens.append("".join(c for c in cliente.telefono if c.isdigit()))
+    if cliente.email:
+        email = cliente.email.lower()
+        tokens.extend([email, email.split("@")[0]])
+    return [t for t in tokens if t]
+
+
+def _buscar_trigramas(db: Session, q: str, limit: int) -> List[int]:
+    """Ids de los clientes que coinciden según el índice de trigramas de PostgreSQL"""
+    # La misma normalización que el índice en memoria (y que ecomove_unaccent)
+    termino = normalizar(q)
+    patron = termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return db.execute(CONSULTA_TRIGRAMAS, {
+        "q": termino,
+        "patron": f"%{patron}%",
+        "prefijo": f"{patron}%",
+        "limit": limit,
+    }).scalars().all()
+
+
+class _IndicePrefijos:
+    """Pares (token, id) ordenados para búsquedas por prefijo con bisect"""
+
+    def __init__(self, filas):
+        self.tokens_por_id: Dict[int, set] = {fila.id: set(_tokens(fila)) for fila in filas}
+        self.pares: List[Tuple[str, int]] = sorted(
+            (token, cliente_id)
+            for cliente_id, tokens in self.tokens_por_id.items()
+            for token in tokens
+        )
+
+    def quitar(self, cliente_id: int) -> None:
+        for token in self.tokens_por_id.pop(cliente_id, ()):
+            i = bisect_left(self.pares, (token, cliente_id))
+            if i < len(self.pares) and self.pares[i] == (token, cliente_id):
+                del self.pares[i]
+
+    def agregar(self, fila) -> None:
+        tokens = set(_tokens(fila))
+        self.tokens_por_id[fila.id] = tokens
+        for token in tokens:
+            insort(self.pares, (token, fila.id))
+
+    def _coincidencias(self, termino: str) -> Dict[int, int]:
+        """id -> puntaje del término (exacto 2, prefijo 1)"""
+        puntajes: Dict[int, int] = {}
+        i = bisect_left(self.pares, (termino,))
+        fin = min(len(self.pares), i + MAX_CANDIDATOS)
+        while i < fin and self.pares[i][0].startswith(termino):
+            token, cliente_id = self.pares[i]
+            puntaje = 2 if token == termino else 1
+            if puntaje > puntajes.get(cliente_id, 0):
+                puntajes[cliente_id] = puntaje
+            i += 1
+        return puntajes
+
+    def buscar(self, q: str, limit: int) -> List[int]:
+        """Ids de los clientes que tienen todos los términos como prefijo, mejor puntaje primero"""
+        terminos = normalizar(q).split()
+        if not terminos:
+            return []
+        acumulado: Optional[Dict[int, int]] = None
+        for termino in terminos:
+            puntajes = self._coincidencias(termino)
+            if acumulado is None:
+                acumulado = puntajes
+            else:
+                acumulado = {i: p + puntajes[i] for i, p in acumulado.items() if i in puntajes}
+            if not acumulado:
+                return []
+        ranking = sorted(acumulado.items(), key=lambda par: (-par[1], par[0]))
+        return [cliente_id for cliente_id, _ in ranking[:limit]]
+
+
+class BuscadorClientes:
+    """
+    Índice en memoria: se construye con la primera búsqueda y luego se actualiza
+    solo con los clientes que cambiaron (avisados por el bus).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_eventos = threading.Lock()
+        self._indice: Optional[_IndicePrefijos] = None
+        self._pendientes: set = set()
+        self._invalido = False
+
+    def _consultar_tokens(self, db: Session, ids: Optional[set] = None):
+        query = db.query(
+            Cliente.id, Cliente.nombre, Cliente.apellido, Cliente.dni, Cliente.telefono, Cliente.email
+        )
+        if ids is not None:
+            query = query.filter(Cliente.id.in_(ids))
+        return query.all()
+
+    def _buscar_en_memoria(self, db: Session, q: str, limit: int) -> List[int]:
+        with self._lock:
+            # Las marcas se toman antes de consultar: un cambio posterior se vuelve a aplicar
+            with self._lock_eventos:
+                pendientes, self._pendientes = self._pendientes, set()
+                invalido, self._invalido = self._invalido, False
+
+            if self._indice is None or invalido:
+                self._indice = _IndicePrefijos(self._consultar_tokens(db))
+            elif pendientes:
+                for cliente_id in pendientes:
+                    self._indice.quitar(cliente_id)
+                for fila in self._consultar_tokens(db, pendientes):
+                    self._indice.agregar(fila)
+            return self._indice.buscar(q, limit)
+
+    def marcar(self, cliente_id: Optional[int]) -> None:
+        """Registra un cambio; sin id se reconstruye el índice completo"""
+        with self._lock_eventos:
+            if cliente_id is None:
+                self._invalido = True
+            else:
+                self._pendientes.add(cliente_id)
+
+    def buscar(self, db: Session, q: str, limit: int = 20) -> List[Cliente]:
+        """Clientes que coinciden con q, ordenados por relevancia"""
+        q = q.strip()
+        if _trigramas_disponibles:
+            ids = _buscar_trigramas(db, q, limit)
+        else:
+            ids = self._buscar_en_memoria(db, q, limit)
+
+        if not ids:
+            return []
+        por_id = {c.id: c for c in db.query(Cliente).filter(Cliente.id.in_(ids)).all()}
+        return [por_id[i] for i in ids if i in por_id]
+
+
+buscador_clientes = BuscadorClientes()
+
+
+def _al_cambiar(evento: dict) -> None:
+    if evento["entidad"] == "cliente":
+        buscador_clientes.marcar(evento["id"])
+    elif evento["entidad"] == TODAS:
+        buscador_clientes.marcar(None)
+
+
+bus.suscribir(_al_cambiar)
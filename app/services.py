@@ -1,11 +1,13 @@
 """
 ECO-MOVE API - Business Logic Services
 """
-from datetime import date
+from collections import defaultdict
+from datetime import date, timedelta
 from decimal import Decimal
 from typing import Tuple
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
-from app.models import Cliente, Vehiculo, Alquiler
+from app.models import Cliente, Vehiculo, Alquiler, Devolucion, RecaudacionPeriodo
 
 
 # Constantes de negocio
@@ -15,6 +17,7 @@ DEPOSITO_PORCENTAJE = Decimal("0.12")  # 12%
 MULTA_RETRASO_PORCENTAJE = Decimal("0.10")  # 10% por día
 DIAS_MINIMOS_USO_EXTENDIDO = 5
 EDAD_MAYOR = 18
+GRANULARIDADES = ("dia", "semana", "mes")
 
 
 def calcular_edad(fecha_nacimiento: date) -> int:
@@ -146,3 +149,149 @@ def calcular_devolucion(alquiler: Alquiler, fecha_devolucion_real: date) -> dict
         "monto_adicional": round(monto_adicional, 2),
         "total_final": round(total_final, 2),
     }
+
+
+def inicio_periodo(fecha: date, granularidad: str) -> date:
+    """Primer día del periodo (semanas ISO de lunes a domingo)"""
+    if granularidad == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == "mes":
+        return fecha.replace(day=1)
+    return fecha
+
+
+def registrar_recaudacion(
+    db: Session,
+    fecha: date,
+    vehiculo_id: int,
+    alquileres: int = 0,
+    importe: Decimal = Decimal("0"),
+    descuentos: Decimal = Decimal("0"),
+    depositos: Decimal = Decimal("0"),
+    multas: Decimal = Decimal("0"),
+) -> None:
+    """
+    Suma (o resta, con valores negativos) importes al acumulado de recaudación
+    de cada granularidad. Se ejecuta en la transacción del llamador, así que el
+    acumulado se confirma o revierte junto con el alquiler/devolución.
+    """
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialecto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+    
+    delta = {
+        "alquileres": alquileres,
+        "importe": importe,
+        "descuentos": descuentos,
+        "depositos": depositos,
+        "multas": multas,
+    }
+    
+    for granularidad in GRANULARIDADES:
+        clave = {
+            "granularidad": granularidad,
+            "periodo": inicio_periodo(fecha, granularidad),
+            "vehiculo_id": vehiculo_id,
+        }
+        
+        if insert is None:
+            fila = db.query(RecaudacionPeriodo).filter_by(**clave).with_for_update().first()
+            if fila is None:
+                db.add(RecaudacionPeriodo(**clave, **delta))
+                db.flush()
+            else:
+                for campo, valor in delta.items():
+                    setattr(fila, campo, getattr(fila, campo) + valor)
+            continue
+        
+        stmt = insert(RecaudacionPeriodo).values(**clave, **delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["granularidad", "periodo", "vehiculo_id"],
+            set_={
+                campo: getattr(RecaudacionPeriodo, campo) + getattr(stmt.excluded, campo)
+                for campo in delta
+            },
+        )
+        db.execute(stmt)
+
+
+def registrar_recaudacion_alquiler(db: Session, alquiler: Alquiler, signo: int = 1) -> None:
+    """Registra un alquiler en el acumulado (signo=-1 al cancelarlo)"""
+    registrar_recaudacion(
+        db,
+        fecha=alquiler.fecha_inicio,
+        vehiculo_id=alquiler.vehiculo_id,
+        alquileres=signo,
+        importe=signo * Decimal(str(alquiler.importe)),
+        descuentos=signo * (
+            Decimal(str(alquiler.descuento_uso_extendido or 0))
+            + Decimal(str(alquiler.descuento_cliente_frecuente or 0))
+        ),
+        depositos=signo * Decimal(str(alquiler.deposito)),
+    )
+
+
+def reconstruir_recaudacion(db: Session) -> int:
+    """
+    Recalcula el acumulado de recaudación desde alquileres y devoluciones.
+    La tabla queda bloqueada para escritura antes de leer el historial: un
+    alquiler o devolución concurrente espera y suma su parte después, sobre el
+    acumulado ya reconstruido (ni se pierde ni se cuenta dos veces).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # EXCLUSIVE bloquea los upserts de registrar_recaudacion pero no las lecturas
+        db.execute(text(f"LOCK TABLE {RecaudacionPeriodo.__tablename__} IN EXCLUSIVE MODE"))
+    # En SQLite el DELETE toma el bloqueo de escritura de la base antes de leer
+    db.query(RecaudacionPeriodo).delete()
+    
+    acumulado = defaultdict(lambda: defaultdict(Decimal))
+    
+    alquileres = db.query(
+        Alquiler.fecha_inicio,
+        Alquiler.vehiculo_id,
+        func.count(Alquiler.id),
+        func.sum(Alquiler.importe),
+        func.sum(Alquiler.descuento_uso_extendido + Alquiler.descuento_cliente_frecuente),
+        func.sum(Alquiler.deposito),
+    ).filter(Alquiler.estado != "cancelado").group_by(Alquiler.fecha_inicio, Alquiler.vehiculo_id)
+    
+    for fecha, vehiculo_id, total, importe, descuentos, depositos in alquileres:
+        for granularidad in GRANULARIDADES:
+            fila = acumulado[(granularidad, inicio_periodo(fecha, granularidad), vehiculo_id)]
+            fila["alquileres"] += total
+            fila["importe"] += Decimal(str(importe or 0))
+            fila["descuentos"] += Decimal(str(descuentos or 0))
+            fila["depositos"] += Decimal(str(depositos or 0))
+    
+    multas = db.query(
+        Devolucion.fecha_devolucion_real,
+        Alquiler.vehiculo_id,
+        func.sum(Devolucion.multa),
+    ).join(Alquiler, Alquiler.id == Devolucion.alquiler_id).group_by(
+        Devolucion.fecha_devolucion_real, Alquiler.vehiculo_id
+    )
+    
+    for fecha, vehiculo_id, multa in multas:
+        for granularidad in GRANULARIDADES:
+            fila = acumulado[(granularidad, inicio_periodo(fecha, granularidad), vehiculo_id)]
+            fila["multas"] += Decimal(str(multa or 0))
+    
+    db.bulk_insert_mappings(RecaudacionPeriodo, [
+        {
+            "granularidad": granularidad,
+            "periodo": periodo,
+            "vehiculo_id": vehiculo_id,
+            "alquileres": int(valores["alquileres"]),
+            "importe": valores["importe"],
+            "descuentos": valores["descuentos"],
+            "depositos": valores["depositos"],
+            "multas": valores["multas"],
+        }
+        for (granularidad, periodo, vehiculo_id), valores in acumulado.items()
+    ])
+    db.commit()
+    return len(acumulado)
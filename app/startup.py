@@ -0,0 +1,165 @@
+"""
+ECO-MOVE API - Arranque
+Precalentamiento al iniciar el proceso (conexiones del pool, caché de sentencias
+de SQLAlchemy, catálogo, bcrypt y tablas de rutas de FastAPI) y esquema OpenAPI pregenerado en disco, para
+que las primeras solicitudes de una instancia nueva no paguen esos costos.
+
+Generar el esquema (en el build, después de instalar dependencias):
+    python -m app.startup
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from sqlalchemy import text
+from starlette.responses import JSONResponse
+
+from app.compression import CODECS, codecs_disponibles, precomprimidas
+from app.config import get_settings
+from app.database import SessionLocal, engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Clave del esquema guardado con la huella del código que lo generó
+CLAVE_HUELLA = "x-ecomove-huella"
+
+# Ruta inexistente de la solicitud interna de calentamiento (404: las métricas la cuentan como sin_ruta)
+RUTA_CALENTAMIENTO = "/__arranque"
+
+
+def huella_codigo() -> str:
+    """sha1 de la versión y de los .py de app/: cambia con cualquier ruta o esquema"""
+    h = hashlib.sha1(settings.app_version.encode())
+    for raiz, directorios, archivos in sorted(os.walk(DIRECTORIO_APP)):
+        directorios[:] = sorted(d for d in directorios if d != "__pycache__")
+        for nombre in sorted(archivos):
+            if nombre.endswith(".py"):
+                h.update(nombre.encode())
+                with open(os.path.join(raiz, nombre), "rb") as archivo:
+                    h.update(archivo.read())
+    return h.hexdigest()
+
+
+def guardar_openapi(app, ruta: str) -> None:
+    """Esquema con la huella del código y, al lado, sus versiones comprimidas al máximo (ruta.gzip, ruta.br...)"""
+    esquema = app.openapi()
+    cuerpo = JSONResponse(esquema).body
+    for nombre, codec in codecs_disponibles(CODECS).items():
+        with open(f"{ruta}.{nombre}", "wb") as archivo:
+            archivo.write(codec.comprimir(cuerpo, maximo=True))
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(dict(esquema, **{CLAVE_HUELLA: huella_codigo()}), archivo, ensure_ascii=False, separators=(",", ":"))
+
+
+def cargar_openapi(app, ruta: str) -> bool:
+    """Instala el esquema guardado si corresponde al código actual y siembra sus versiones comprimidas"""
+    if not ruta or not os.path.isfile(ruta):
+        return False
+    with open(ruta, encoding="utf-8") as archivo:
+        esquema = json.load(archivo)
+    if esquema.pop(CLAVE_HUELLA, None) != huella_codigo():
+        logger.warning("%s no corresponde al código actual: el esquema se generará al pedirlo", ruta)
+        return False
+    # Se reemplaza app.openapi (la forma documentada): FastAPI reciente regenera el
+    # esquema guardado en openapi_schema si no lo generó él mismo
+    app.openapi_schema = esquema
+    app.openapi = lambda: esquema
+    # El endpoint responde JSONResponse(app.openapi()): el cuerpo es idéntico al comprimido en el build
+    cuerpo = JSONResponse(esquema).body
+    for nombre in CODECS:
+        if os.path.isfile(f"{ruta}.{nombre}"):
+            with open(f"{ruta}.{nombre}", "rb") as archivo:
+                precomprimidas.guardar(nombre, cuerpo, archivo.read())
+    return True
+
+
+def abrir_pool() -> int:
+    """Abre a la vez las conexiones fijas del pool y las devuelve listas para usar"""
+    tamano = engine.pool.size() if hasattr(engine.pool, "size") else 1
+
+    def conectar(_):
+        conexion = engine.connect()
+        conexion.execute(text("SELECT 1"))
+        return conexion
+
+    with ThreadPoolExecutor(max_workers=tamano) as hilos:
+        conexiones = list(hilos.map(conectar, range(tamano)))
+    for conexion in conexiones:
+        conexion.close()
+    return tamano
+
+
+def calentar_consultas() -> None:
+    """Compila las sentencias de las rutas más usadas (quedan en la caché del engine)"""
+    from app.catalog import catalogo
+    from app.fastpath import LISTADO_ALQUILERES, LISTADO_CLIENTES, LISTADO_DEVOLUCIONES
+    from app.models import Alquiler, Cliente, Devolucion, Usuario
+
+    with SessionLocal() as db:
+        catalogo.snapshot(db)
+        db.execute(LISTADO_CLIENTES.select().offset(0).limit(0)).all()
+        for listado, modelo in ((LISTADO_ALQUILERES, Alquiler), (LISTADO_DEVOLUCIONES, Devolucion)):
+            db.execute(listado.select().order_by(modelo.created_at.desc()).offset(0).limit(0)).all()
+        db.query(Usuario).filter(Usuario.id == 0).first()
+        db.query(Cliente).filter(Cliente.id == 0).first()
+        db.query(Alquiler).filter(Alquiler.id == 0).first()
+
+
+def calentar_bcrypt() -> None:
+    """Carga la extensión de bcrypt con un hash de costo mínimo"""
+    bcrypt.checkpw(b"arranque", bcrypt.hashpw(b"arranque", bcrypt.gensalt(rounds=4)))
+
+
+async def calentar_rutas(app) -> None:
+    """Una solicitud interna a una ruta inexistente: FastAPI arma en la primera
+    solicitud (de cualquier ruta) las tablas de rutas, dependencias y validadores"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": RUTA_CALENTAMIENTO, "raw_path": RUTA_CALENTAMIENTO.encode(), "root_path": "",
+        "query_string": b"", "headers": [], "client": None, "server": None,
+    }
+
+    async def recibir():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(message):
+        pass
+
+    await app(scope, recibir, enviar)
+
+
+async def precalentar(app) -> dict:
+    """Ejecuta las fases de arranque y devuelve su duración en ms"""
+    tiempos = {}
+
+    def fase(nombre, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        tiempos[f"{nombre}_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+        return resultado
+
+    tiempos["openapi_disco"] = fase("openapi", cargar_openapi, app, settings.openapi_path)
+    if settings.startup_warmup:
+        tiempos["conexiones"] = fase("pool", abrir_pool)
+        fase("consultas", calentar_consultas)
+        fase("bcrypt", calentar_bcrypt)
+        inicio = time.perf_counter()
+        await calentar_rutas(app)
+        tiempos["rutas_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+    return tiempos
+
+
+if __name__ == "__main__":
+    from app.main import app
+
+    destino = sys.argv[1] if len(sys.argv) > 1 else settings.openapi_path
+    guardar_openapi(app, destino)
+    print(f"Esquema OpenAPI guardado en {destino}")
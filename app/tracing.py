@@ -0,0 +1,208 @@
+"""
+ECO-MOVE API - Trazas
+Trazas locales por solicitud: spans de autenticación, de cada sentencia SQL y de
+serialización, propagados con contextvars. Se exportan en formato OTLP/JSON (una
+traza por línea) si la solicitud fue muestreada o superó el umbral de lentitud.
+"""
+import functools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import get_settings
+from app.database import engine
+from app.metrics import plantilla_ruta
+
+settings = get_settings()
+
+# Largo máximo de una sentencia SQL guardada como atributo
+MAX_SQL = 2000
+
+
+class Span:
+    __slots__ = ("id", "padre", "nombre", "inicio", "fin", "atributos")
+
+    def __init__(self, nombre: str, padre: Optional[str], atributos: dict):
+        self.id = os.urandom(8).hex()
+        self.padre = padre
+        self.nombre = nombre
+        self.inicio = time.time_ns()
+        self.fin = None
+        self.atributos = atributos
+
+
+class Traza:
+    """Spans de una solicitud (se agregan desde el event loop y desde el threadpool)"""
+
+    def __init__(self, muestreada: bool):
+        self.id = os.urandom(16).hex()
+        self.muestreada = muestreada
+        self.spans = []
+
+
+_traza: ContextVar[Optional[Traza]] = ContextVar("traza", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+def habilitado() -> bool:
+    return settings.tracing_sample_rate > 0 or settings.tracing_slow_ms > 0
+
+
+@contextmanager
+def span(nombre: str, **atributos):
+    """Registra un span hijo del actual; sin traza activa no hace nada"""
+    traza = _traza.get()
+    if traza is None:
+        yield None
+        return
+    padre = _span.get()
+    actual = Span(nombre, padre.id if padre else None, atributos)
+    token = _span.set(actual)
+    try:
+        yield actual
+    except BaseException as e:
+        actual.atributos["error"] = type(e).__name__
+        raise
+    finally:
+        actual.fin = time.time_ns()
+        _span.reset(token)
+        traza.spans.append(actual)
+
+
+def trazado(nombre: str):
+    """Decorador: ejecuta la función dentro de un span (conserva la firma para Depends)"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with span(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def _valor(valor) -> dict:
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+def _otlp(traza: Traza) -> dict:
+    """Traza en el formato JSON de OTLP (ExportTraceServiceRequest)"""
+    spans = [
+        {
+            "traceId": traza.id,
+            "spanId": s.id,
+            "parentSpanId": s.padre or "",
+            "name": s.nombre,
+            "kind": 2 if s.padre is None else 1,
+            "startTimeUnixNano": str(s.inicio),
+            "endTimeUnixNano": str(s.fin),
+            "attributes": [{"key": k, "value": _valor(v)} for k, v in s.atributos.items()],
+        }
+        for s in traza.spans
+    ]
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": settings.app_name}}]},
+        "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+    }]}
+
+
+class _Exportador:
+    """Escribe las trazas en un hilo aparte para no bloquear el event loop"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._cola: "queue.SimpleQueue[Traza]" = queue.SimpleQueue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def exportar(self, traza: Traza) -> None:
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._escribir, name="exportador-trazas", daemon=True)
+                    self._hilo.start()
+        self._cola.put(traza)
+
+    def _escribir(self) -> None:
+        with open(self.ruta, "a", encoding="utf-8") as archivo:
+            while True:
+                traza = self._cola.get()
+                archivo.write(json.dumps(_otlp(traza), ensure_ascii=False, separators=(",", ":")) + "\n")
+                if self._cola.empty():
+                    archivo.flush()
+
+
+exportador = _Exportador(settings.tracing_path)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    if _traza.get() is not None:
+        context._traza_inicio = time.time_ns()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _despues_sql(conn, cursor, statement, parameters, context, executemany):
+    traza = _traza.get()
+    inicio = getattr(context, "_traza_inicio", None)
+    if traza is None or inicio is None:
+        return
+    padre = _span.get()
+    sql = Span("db.query", padre.id if padre else None, {
+        "db.statement": statement[:MAX_SQL],
+        "db.rows": cursor.rowcount,
+    })
+    sql.inicio = inicio
+    sql.fin = time.time_ns()
+    traza.spans.append(sql)
+
+
+class TrazasMiddleware:
+    """Abre la traza de cada solicitud y decide al final si exportarla"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not habilitado():
+            await self.app(scope, receive, send)
+            return
+
+        traza = Traza(random.random() < settings.tracing_sample_rate)
+        raiz = Span(scope["method"], None, {"http.method": scope["method"], "http.target": scope["path"]})
+
+        async def enviar(message):
+            if message["type"] == "http.response.start":
+                raiz.atributos["http.status_code"] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", traza.id.encode())]
+            await send(message)
+
+        token_traza = _traza.set(traza)
+        token_span = _span.set(raiz)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _span.reset(token_span)
+            _traza.reset(token_traza)
+            raiz.fin = time.time_ns()
+            ruta = plantilla_ruta(scope)
+            raiz.nombre = f"{scope['method']} {ruta}"
+            raiz.atributos["http.route"] = ruta
+            traza.spans.append(raiz)
+            lenta = settings.tracing_slow_ms > 0 and raiz.fin - raiz.inicio >= settings.tracing_slow_ms * 1_000_000
+            if traza.muestreada or lenta:
+                raiz.atributos["sampling"] = "muestreo" if traza.muestreada else "lenta"
+                exportador.exportar(traza)
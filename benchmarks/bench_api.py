@@ -0,0 +1,297 @@
+"""
+ECO-MOVE API - Benchmark de la API
+Ejecuta la aplicación ASGI en el mismo proceso (httpx + ASGITransport, con su
+ciclo de vida) contra una base sembrada y mide throughput y p50/p90/p99 de login,
+catálogo, cotización, reserva, devolución y cada reporte (de caché y en frío).
+Los resultados se guardan en JSON para compararlos entre commits.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_api.py --salida base.json
+    python benchmarks/bench_api.py --comparar base.json --salida actual.json
+    python benchmarks/bench_api.py --desde actual.json --comparar base.json
+    python benchmarks/bench_api.py --database-url postgresql://localhost/ecomove_bench
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import entorno
+from generar_datos import generar
+
+REPORTES = (
+    "/reportes/dashboard",
+    "/reportes/total-recaudado",
+    "/reportes/vehiculos-mas-alquilados",
+    "/reportes/clientes-multiples-alquileres",
+    "/reportes/alquileres-doble-descuento",
+    "/reportes/clientes-multa-mayor-deposito",
+    "/reportes/recaudacion-serie?granularidad=mes",
+)
+
+# Clientes distintos usados en cotizaciones y reservas
+MAX_CLIENTES = 1000
+
+# Casos que modifican datos: sin calentamiento y cada iteración usa un vehículo propio
+CASOS_ESCRITURA = ("reserva", "devolucion")
+
+
+def sembrar(n_clientes: int, n_vehiculos: int, n_alquileres: int, n_reservables: int) -> list:
+    """Datos sintéticos de generar_datos más vehículos libres para los casos de reserva"""
+    from app.database import SessionLocal, engine
+    from app.models import Vehiculo
+
+    generar(engine, usuarios=0, clientes=n_clientes, vehiculos=n_vehiculos, alquileres=n_alquileres,
+            progreso=lambda mensaje: None)
+    db = SessionLocal()
+    reservables = [
+        Vehiculo(codigo=f"R{i:05d}", nombre=f"Reservable {i}", tarifa_diaria=Decimal(12))
+        for i in range(n_reservables)
+    ]
+    db.add_all(reservables)
+    db.commit()
+    ids = [v.id for v in reservables]
+    db.close()
+    return ids
+
+
+class Escenario:
+    """Estado compartido por los casos (token, ids disponibles, alquileres creados)"""
+
+    def __init__(self, cliente, reservables: list):
+        from app.database import SessionLocal
+        from app.models import Cliente, Vehiculo
+
+        self.cliente = cliente
+        self.reservables = reservables
+        with SessionLocal() as db:
+            self.clientes = [c for c, in db.query(Cliente.id).order_by(Cliente.id).limit(MAX_CLIENTES)]
+            self.vehiculo_cotizacion = db.query(Vehiculo.id).order_by(Vehiculo.id).limit(1).scalar()
+        self.creados = []
+        self.headers = {}
+
+    async def login(self, i):
+        return await self.cliente.post(
+            "/auth/login", json={"email": entorno.ADMIN_EMAIL, "password": entorno.ADMIN_PASSWORD}
+        )
+
+    async def catalogo(self, i):
+        return await self.cliente.get("/vehiculos/", headers=self.headers)
+
+    def _alquiler(self, i, vehiculo_id):
+        hoy = date.today()
+        return {
+            "cliente_id": self.clientes[i % len(self.clientes)], "vehiculo_id": vehiculo_id,
+            "fecha_inicio": hoy.isoformat(), "fecha_tentativa_devolucion": (hoy + timedelta(days=1 + i % 9)).isoformat(),
+        }
+
+    async def cotizacion(self, i):
+        return await self.cliente.post("/alquileres/calcular", json=self._alquiler(i, self.vehiculo_cotizacion), headers=self.headers)
+
+    async def reserva(self, i):
+        respuesta = await self.cliente.post(
+            "/alquileres/", json=self._alquiler(i, self.reservables[i]), headers=self.headers
+        )
+        if respuesta.status_code == 201:
+            self.creados.append(respuesta.json()["id"])
+        return respuesta
+
+    async def devolucion(self, i):
+        datos = {"alquiler_id": self.creados[i], "fecha_devolucion_real": (date.today() + timedelta(days=i % 12)).isoformat()}
+        return await self.cliente.post("/devoluciones/", json=datos, headers=self.headers)
+
+    def reporte(self, ruta: str, frio: bool):
+        from app.cache import incrementar_version_datos
+
+        async def ejecutar(i):
+            if frio:
+                # Invalida la caché de reportes sin cambiar datos (cuesta microsegundos)
+                incrementar_version_datos()
+            return await self.cliente.get(ruta, headers=self.headers)
+        return ejecutar
+
+
+def _percentil(ordenadas: list, p: float) -> float:
+    indice = min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+
+async def medir(funcion, iteraciones: int, concurrencia: int, calentamiento: int) -> dict:
+    for i in range(calentamiento):
+        await funcion(i)
+
+    tiempos = []
+    errores = 0
+    siguiente = iter(range(iteraciones))
+
+    async def trabajador():
+        nonlocal errores
+        for i in siguiente:
+            inicio = time.perf_counter()
+            respuesta = await funcion(i)
+            tiempos.append(time.perf_counter() - inicio)
+            if respuesta.status_code >= 400:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    total = time.perf_counter() - inicio
+
+    ordenadas = sorted(tiempos)
+    return {
+        "n": len(tiempos),
+        "errores": errores,
+        "rps": round(len(tiempos) / total, 1),
+        "media_ms": round(statistics.fmean(ordenadas) * 1000, 3),
+        "p50_ms": round(_percentil(ordenadas, 50) * 1000, 3),
+        "p90_ms": round(_percentil(ordenadas, 90) * 1000, 3),
+        "p99_ms": round(_percentil(ordenadas, 99) * 1000, 3),
+    }
+
+
+async def ejecutar(args, reservables: list) -> dict:
+    import httpx
+
+    from app.main import app
+
+    resultados = {}
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            escenario = Escenario(cliente, reservables)
+            token = (await escenario.login(0)).json()["access_token"]
+            escenario.headers = {"Authorization": f"Bearer {token}"}
+
+            casos = {
+                "login": escenario.login,
+                "catalogo": escenario.catalogo,
+                "cotizacion": escenario.cotizacion,
+                "reserva": escenario.reserva,
+                "devolucion": escenario.devolucion,
+            }
+            for ruta in REPORTES:
+                casos[ruta] = escenario.reporte(ruta, frio=False)
+                casos[f"{ruta} (frío)"] = escenario.reporte(ruta, frio=True)
+
+            for nombre, funcion in casos.items():
+                if args.casos and not any(filtro in nombre for filtro in args.casos):
+                    continue
+                escritura = nombre in CASOS_ESCRITURA
+                if escritura and not reservables:
+                    continue
+                iteraciones = args.iteraciones_login if nombre == "login" else args.iteraciones
+                if nombre == "devolucion":
+                    iteraciones = min(iteraciones, len(escenario.creados))
+                if iteraciones == 0:
+                    continue
+                resultados[nombre] = await medir(
+                    funcion, iteraciones,
+                    1 if escritura else args.concurrencia,
+                    0 if escritura else args.calentamiento,
+                )
+                _imprimir_fila(nombre, resultados[nombre])
+    return resultados
+
+
+def _imprimir_fila(nombre: str, r: dict, base: dict = None) -> None:
+    linea = f"{nombre:<52}{r['n']:>6}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+    if r["errores"]:
+        linea += f"  errores={r['errores']}"
+    if base is not None:
+        linea += f"  p50 {_variacion(base['p50_ms'], r['p50_ms'])}  p99 {_variacion(base['p99_ms'], r['p99_ms'])}"
+    print(linea)
+
+
+def _variacion(antes: float, despues: float) -> str:
+    return f"{(despues - antes) / antes * 100:+6.1f}%" if antes else "   n/a"
+
+
+def comparar(base: dict, actual: dict, tolerancia: float) -> list:
+    """Casos cuyo p50 o p99 empeoró más que la tolerancia (fracción)"""
+    print(f"\n{'caso':<52}{'n':>6}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}  vs {base['meta'].get('commit')}")
+    regresiones = []
+    for nombre, r in actual["resultados"].items():
+        anterior = base["resultados"].get(nombre)
+        _imprimir_fila(nombre, r, anterior)
+        if anterior is None:
+            continue
+        for clave in ("p50_ms", "p99_ms"):
+            if anterior[clave] and r[clave] > anterior[clave] * (1 + tolerancia):
+                regresiones.append(f"{nombre} {clave}: {anterior[clave]} -> {r[clave]}")
+    return regresiones
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Base a usar (por defecto una SQLite temporal)")
+    parser.add_argument("--sin-sembrar", action="store_true", help="La base ya tiene datos")
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--vehiculos", type=int, default=50)
+    parser.add_argument("--alquileres", type=int, default=20000)
+    parser.add_argument("--iteraciones", type=int, default=200)
+    parser.add_argument("--iteraciones-login", type=int, default=20, help="bcrypt hace lento el login")
+    parser.add_argument("--concurrencia", type=int, default=1)
+    parser.add_argument("--calentamiento", type=int, default=10)
+    parser.add_argument("--casos", nargs="*", help="Solo los casos cuyo nombre contenga alguno de estos textos")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--desde", help="No ejecuta: usa un archivo de resultados existente")
+    parser.add_argument("--comparar", help="Resultados base contra los que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="Empeoramiento tolerado de p50/p99")
+    args = parser.parse_args()
+
+    if args.desde:
+        with open(args.desde, encoding="utf-8") as archivo:
+            actual = json.load(archivo)
+    else:
+        url = entorno.configurar(args.database_url)
+        entorno.preparar_esquema()
+        entorno.crear_admin()
+        reservables = []
+        if not args.sin_sembrar:
+            print(f"Sembrando {args.alquileres} alquileres en {url} ...")
+            reservables = sembrar(args.clientes, args.vehiculos, args.alquileres, args.iteraciones)
+
+        print(f"{'caso':<52}{'n':>6}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+        resultados = asyncio.run(ejecutar(args, reservables))
+        actual = {
+            "meta": {
+                "commit": _commit(),
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "base": url.split("://")[0],
+                "alquileres": 0 if args.sin_sembrar else args.alquileres,
+                "concurrencia": args.concurrencia,
+            },
+            "resultados": resultados,
+        }
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(actual, archivo, ensure_ascii=False, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(base, actual, args.tolerancia)
+        if regresiones:
+            print("\nRegresiones:\n  " + "\n  ".join(regresiones))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+ECO-MOVE API - Benchmark de Arranque
+Mide, en procesos nuevos, cuánto tarda en importarse la app, cuánto dura el
+lifespan (con el desglose de app.state.arranque) y la latencia de la primera y
+la segunda solicitud a cada ruta. Compara el arranque en frío (sin
+precalentamiento ni OpenAPI en disco) con el precalentado.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_arranque.py --repeticiones 5
+    python benchmarks/bench_arranque.py --database-url postgresql://localhost/ecomove_bench --sin-sembrar
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import entorno
+
+RUTAS = ("/openapi.json", "/vehiculos/", "/clientes/", "/alquileres/", "/devoluciones/", "/auth/me")
+
+MODOS = {
+    "frío": {"STARTUP_WARMUP": "false", "OPENAPI_PATH": ""},
+    "precalentado": {"STARTUP_WARMUP": "true"},
+}
+
+
+async def _medir_hijo() -> dict:
+    """Corre dentro del proceso nuevo: import, lifespan y primeras solicitudes"""
+    inicio = time.perf_counter()
+    from app.main import app
+    importacion = time.perf_counter() - inicio
+
+    import httpx
+
+    resultado = {"importacion_ms": round(importacion * 1000, 3), "rutas": {}}
+    inicio = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        resultado["lifespan_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+        resultado["fases"] = app.state.arranque
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            inicio = time.perf_counter()
+            token = (await cliente.post(
+                "/auth/login", json={"email": entorno.ADMIN_EMAIL, "password": entorno.ADMIN_PASSWORD}
+            )).json()["access_token"]
+            resultado["login_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+            headers = {"Authorization": f"Bearer {token}"}
+            for ruta in RUTAS:
+                tiempos = []
+                for _ in range(2):
+                    inicio = time.perf_counter()
+                    respuesta = await cliente.get(ruta, headers=headers)
+                    tiempos.append(round((time.perf_counter() - inicio) * 1000, 3))
+                    respuesta.raise_for_status()
+                resultado["rutas"][ruta] = {"primera_ms": tiempos[0], "segunda_ms": tiempos[1]}
+    return resultado
+
+
+def _ejecutar_hijo(url: str, entorno_modo: dict) -> dict:
+    variables = dict(os.environ, DATABASE_URL=url, **entorno_modo)
+    salida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--hijo", "--database-url", url],
+        env=variables, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def _dato(muestra: dict, claves: tuple):
+    for clave in claves:
+        muestra = muestra.get(clave) if isinstance(muestra, dict) else None
+    return muestra
+
+
+def _mediana(muestras: list, *claves) -> float:
+    """Mediana de un dato anidado; NaN si el modo no lo mide (fases omitidas en frío)"""
+    valores = [v for v in (_dato(m, claves) for m in muestras) if isinstance(v, (int, float))]
+    return statistics.median(valores) if valores else float("nan")
+
+
+def _informe(resultados: dict) -> None:
+    modos = list(resultados)
+    print(f"\n{'medida (mediana, ms)':<40}" + "".join(f"{m:>16}" for m in modos))
+    filas = [("importación", ("importacion_ms",)), ("lifespan", ("lifespan_ms",))]
+    filas += [(f"  {fase}", ("fases", f"{fase}_ms")) for fase in ("openapi", "pool", "consultas", "bcrypt", "rutas")]
+    filas.append(("login", ("login_ms",)))
+    for ruta in RUTAS:
+        filas += [(f"{ruta} 1ª", ("rutas", ruta, "primera_ms")), (f"{ruta} 2ª", ("rutas", ruta, "segunda_ms"))]
+    for nombre, claves in filas:
+        print(f"{nombre:<40}" + "".join(f"{_mediana(resultados[m], *claves):>16.2f}" for m in modos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Base a usar (por defecto una SQLite temporal)")
+    parser.add_argument("--sin-sembrar", action="store_true", help="La base ya tiene datos")
+    parser.add_argument("--alquileres", type=int, default=5000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", help="Archivo JSON con todas las muestras")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    url = entorno.configurar(args.database_url)
+    if args.hijo:
+        print(json.dumps(asyncio.run(_medir_hijo())))
+        return
+
+    entorno.preparar_esquema()
+    entorno.crear_admin()
+    if not args.sin_sembrar:
+        from app.database import engine
+        from generar_datos import generar
+
+        print(f"Sembrando {args.alquileres} alquileres en {url} ...")
+        generar(engine, usuarios=0, clientes=max(args.alquileres // 10, 10), vehiculos=50,
+                alquileres=args.alquileres, progreso=lambda mensaje: None)
+
+    from app.main import app
+    from app.startup import guardar_openapi
+
+    ruta_openapi = os.path.join(tempfile.mkdtemp(prefix="ecomove-openapi-"), "openapi.json")
+    guardar_openapi(app, ruta_openapi)
+    MODOS["precalentado"]["OPENAPI_PATH"] = ruta_openapi
+
+    resultados = {modo: [] for modo in MODOS}
+    for i in range(args.repeticiones):
+        # Se alternan los modos para repartir el ruido entre ambos
+        for modo, variables in MODOS.items():
+            resultados[modo].append(_ejecutar_hijo(url, variables))
+        print(f"  repetición {i + 1}/{args.repeticiones}")
+
+    _informe(resultados)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+ECO-MOVE API - Benchmark de Listados
+Compara la ruta anterior de los listados (instancias ORM + response_model con
+from_attributes + jsonable + json.dumps) con la ruta rápida de app.fastpath.
+
+Uso (desde la raíz del repo, usa una base SQLite temporal):
+    python benchmarks/bench_listados.py --alquileres 20000 --limit 100 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+_directorio = tempfile.mkdtemp(prefix="ecomove-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_directorio}/bench.db"
+os.environ.setdefault("JWT_SECRET", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import List  # noqa: E402
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.fastpath import LISTADO_ALQUILERES, LISTADO_CLIENTES, LISTADO_DEVOLUCIONES  # noqa: E402
+from app.models import Alquiler, Cliente, Devolucion, Vehiculo  # noqa: E402
+from app.schemas import AlquilerResponse, ClienteResponse, DevolucionResponse  # noqa: E402
+
+
+def sembrar(n_alquileres: int) -> None:
+    Base.metadata.create_all(engine)
+    n_clientes = max(n_alquileres // 10, 1)
+    db = SessionLocal()
+    db.bulk_insert_mappings(Vehiculo, [
+        dict(codigo=f"V{i:03d}", nombre=f"Vehículo {i}", tarifa_diaria=Decimal(10 + i % 20), estado="disponible")
+        for i in range(50)
+    ])
+    db.bulk_insert_mappings(Cliente, [
+        dict(dni=f"{10000000 + i}", nombre=f"Nombre{i}", apellido=f"Apellido{i}", telefono=f"09{i:08d}",
+             email=f"cliente{i}@correo.com", fecha_nacimiento=date(1990, 1, 1), es_frecuente=i % 3 == 0)
+        for i in range(n_clientes)
+    ])
+    inicio = date(2024, 1, 1)
+    db.bulk_insert_mappings(Alquiler, [
+        dict(cliente_id=1 + i % n_clientes, vehiculo_id=1 + i % 50,
+             fecha_inicio=inicio + timedelta(days=i % 600),
+             fecha_tentativa_devolucion=inicio + timedelta(days=i % 600 + 3),
+             dias=3, importe=Decimal("30.00"), descuento_uso_extendido=Decimal("0.00"),
+             descuento_cliente_frecuente=Decimal("3.00"), deposito=Decimal("3.60"),
+             total_pagar=Decimal("30.60"), estado="devuelto" if i % 2 == 0 else "activo")
+        for i in range(n_alquileres)
+    ])
+    db.bulk_insert_mappings(Devolucion, [
+        dict(alquiler_id=i + 1, fecha_devolucion_real=inicio + timedelta(days=i % 600 + 4), dias_mora=1,
+             multa=Decimal("1.00"), deposito_devuelto=Decimal("2.60"), monto_adicional=Decimal("0.00"),
+             total_final=Decimal("28.00"))
+        for i in range(0, n_alquileres, 2)
+    ])
+    db.commit()
+    db.close()
+
+
+def _anterior(esquema, consulta):
+    """Lo que hace FastAPI con response_model=List[esquema] sobre instancias ORM"""
+    adaptador = TypeAdapter(List[esquema])
+
+    def ejecutar(db, limit):
+        objetos = consulta(db).limit(limit).all()
+        validados = adaptador.validate_python(objetos, from_attributes=True)
+        contenido = adaptador.dump_python(validados, mode="json")
+        return json.dumps(contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    return ejecutar
+
+
+def _rapido(listado, consulta):
+    def ejecutar(db, limit):
+        return listado.responder(db, consulta(listado.select()).limit(limit)).body
+    return ejecutar
+
+
+CASOS = {
+    "/clientes/": (
+        _anterior(ClienteResponse, lambda db: db.query(Cliente)),
+        _rapido(LISTADO_CLIENTES, lambda stmt: stmt),
+    ),
+    "/alquileres/": (
+        _anterior(AlquilerResponse, lambda db: db.query(Alquiler).options(
+            joinedload(Alquiler.cliente), joinedload(Alquiler.vehiculo)
+        ).order_by(Alquiler.created_at.desc())),
+        _rapido(LISTADO_ALQUILERES, lambda stmt: stmt.order_by(Alquiler.created_at.desc())),
+    ),
+    "/devoluciones/": (
+        _anterior(DevolucionResponse, lambda db: db.query(Devolucion).options(
+            joinedload(Devolucion.alquiler).joinedload(Alquiler.cliente),
+            joinedload(Devolucion.alquiler).joinedload(Alquiler.vehiculo)
+        ).order_by(Devolucion.created_at.desc())),
+        _rapido(LISTADO_DEVOLUCIONES, lambda stmt: stmt.order_by(Devolucion.created_at.desc())),
+    ),
+}
+
+
+def medir(funcion, limit: int, repeticiones: int):
+    tiempos = []
+    cuerpo = None
+    for _ in range(repeticiones):
+        db = SessionLocal()
+        inicio = time.perf_counter()
+        cuerpo = funcion(db, limit)
+        tiempos.append(time.perf_counter() - inicio)
+        db.close()
+    return statistics.median(tiempos), cuerpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alquileres", type=int, default=20000)
+    parser.add_argument("--limit", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeticiones", type=int, default=30)
+    args = parser.parse_args()
+
+    sembrar(args.alquileres)
+    print(f"{'listado':<16}{'limit':>7}{'anterior ms':>13}{'rápido ms':>11}{'filas/s rápido':>16}{'mejora':>8}  igual")
+    for nombre, (anterior, rapido) in CASOS.items():
+        for limit in args.limit:
+            t_anterior, cuerpo_anterior = medir(anterior, limit, args.repeticiones)
+            t_rapido, cuerpo_rapido = medir(rapido, limit, args.repeticiones)
+            filas = len(json.loads(cuerpo_rapido))
+            igual = "sí" if cuerpo_anterior == cuerpo_rapido else "NO"
+            print(
+                f"{nombre:<16}{limit:>7}{t_anterior * 1000:>13.2f}{t_rapido * 1000:>11.2f}"
+                f"{filas / t_rapido:>16,.0f}{t_anterior / t_rapido:>7.1f}x  {igual}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+ECO-MOVE API - Entorno de Benchmarks
+Prepara la base de datos de las herramientas de benchmarks/: una SQLite temporal
+o la base indicada (por ejemplo un Postgres local), con las tablas, las vistas
+de reportes y un usuario admin. configurar() debe llamarse antes de importar app.
+"""
+import os
+import sys
+import tempfile
+
+ADMIN_EMAIL = "bench-admin@ecomove.com"
+ADMIN_PASSWORD = "bench-admin"
+
+
+def configurar(database_url: str = None) -> str:
+    """Fija DATABASE_URL (SQLite temporal si no se indica) y deja app importable"""
+    if database_url is None:
+        directorio = tempfile.mkdtemp(prefix="ecomove-bench-")
+        database_url = f"sqlite:///{directorio}/bench.db"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("JWT_SECRET", "benchmark")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return database_url
+
+
+def preparar_esquema() -> None:
+    """Tablas, índices y vistas de reportes que falten (las existentes no se tocan)"""
+    from sqlalchemy import inspect, text
+
+    from app.analytics import CONSULTAS, VISTAS
+    from app.database import engine, init_db
+
+    init_db()
+    existentes = set(inspect(engine).get_view_names())
+    with engine.begin() as conn:
+        for reporte, vista in VISTAS.items():
+            # Las consultas del almacén analítico devuelven lo mismo que las vistas en vivo
+            if vista not in existentes:
+                conn.execute(text(f"CREATE VIEW {vista} AS {CONSULTAS[reporte][0]}"))
+
+
+def crear_admin() -> None:
+    """Usuario admin de los benchmarks (se crea una sola vez)"""
+    from app.auth import get_password_hash
+    from app.database import SessionLocal
+    from app.models import Usuario
+
+    db = SessionLocal()
+    try:
+        if db.query(Usuario.id).filter(Usuario.email == ADMIN_EMAIL).first() is None:
+            db.add(Usuario(
+                email=ADMIN_EMAIL, password_hash=get_password_hash(ADMIN_PASSWORD),
+                nombre="Bench", apellido="Admin", rol="admin"
+            ))
+            db.commit()
+    finally:
+        db.close()
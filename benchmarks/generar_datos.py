@@ -0,0 +1,330 @@
+"""
+ECO-MOVE API - Generador de Datos Sintéticos
+Carga masiva de usuarios, clientes, vehículos, alquileres y devoluciones con
+distribuciones realistas: pocos clientes concentran muchos alquileres (y son los
+frecuentes), duraciones log-normales, devoluciones tardías y cancelaciones.
+Cada vehículo tiene una línea de tiempo sin solapamientos que termina hoy, los
+ids crecen con la fecha y los importes salen de app.services.
+
+En PostgreSQL se usa COPY; en otras bases, executemany por lotes. Al terminar se
+reconstruye el acumulado de recaudación y se ejecuta ANALYZE.
+
+Uso (desde la raíz del repo):
+    DATABASE_URL=postgresql://localhost/ecomove_big python benchmarks/generar_datos.py \\
+        --clientes 500000 --vehiculos 20000 --alquileres 10000000
+"""
+import argparse
+import bisect
+import csv
+import heapq
+import io
+import itertools
+import operator
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as hora, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+PASSWORD_GENERADOS = "generado123"
+
+# Distribuciones
+SESGO_CLIENTES = 0.8          # exponente Zipf del peso de cada cliente
+PROPORCION_FRECUENTES = 0.1   # clientes de mayor peso marcados como frecuentes
+DURACION_MU, DURACION_SIGMA = 1.1, 0.6   # días: log-normal (mediana ~3, cola hasta 30)
+MAX_DIAS = 30
+PROB_TARDE = 0.18             # devoluciones con mora
+MORA_MEDIA = 2.0              # días de mora (geométrica) cuando hay retraso
+PROB_CANCELADO = 0.03
+BRECHA_MEDIA = 1.5            # días sin alquilar entre dos alquileres de un vehículo
+PROB_MANTENIMIENTO = 0.02
+
+
+def _columnas(modelo) -> list:
+    return [c.name for c in modelo.__table__.columns]
+
+
+class _Escritor:
+    """COPY en PostgreSQL, executemany en el resto; un commit por lote"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.postgres = engine.dialect.name == "postgresql"
+
+    def escribir(self, modelo, columnas: list, filas: list) -> None:
+        if not filas:
+            return
+        tabla = modelo.__table__
+        if self.postgres:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(filas)
+            buffer.seek(0)
+            crudo = self.engine.raw_connection()
+            try:
+                cursor = crudo.cursor()
+                cursor.copy_expert(f"COPY {tabla.name} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+                crudo.commit()
+            finally:
+                crudo.close()
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(tabla.insert(), [dict(zip(columnas, fila)) for fila in filas])
+
+    def finalizar(self, modelos: list) -> None:
+        """Ajusta las secuencias de id (las filas se insertan con id explícito) y actualiza estadísticas"""
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            for modelo in modelos:
+                tabla = modelo.__tablename__
+                if self.postgres:
+                    conn.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {tabla}), 1))"
+                    ))
+            conn.execute(text("ANALYZE"))
+
+
+def _siguiente_id(engine, modelo) -> int:
+    from sqlalchemy import func, select
+
+    with engine.connect() as conn:
+        return (conn.execute(select(func.max(modelo.id))).scalar() or 0) + 1
+
+
+class _Calculadora:
+    """app.services memorizado: los importes dependen solo de tarifa, frecuencia, días y mora"""
+
+    def __init__(self):
+        from app.services import calcular_alquiler, calcular_devolucion
+
+        self._calcular_alquiler = calcular_alquiler
+        self._calcular_devolucion = calcular_devolucion
+        self._alquileres = {}
+        self._devoluciones = {}
+
+    def alquiler(self, tarifa: Decimal, frecuente: bool, dias: int) -> dict:
+        clave = (tarifa, frecuente, dias)
+        valores = self._alquileres.get(clave)
+        if valores is None:
+            inicio = date(2000, 1, 1)
+            valores = self._calcular_alquiler(
+                SimpleNamespace(tarifa_diaria=tarifa), SimpleNamespace(es_frecuente=frecuente),
+                inicio, inicio + timedelta(days=dias)
+            )
+            self._alquileres[clave] = valores
+        return valores
+
+    def devolucion(self, tarifa: Decimal, frecuente: bool, dias: int, mora: int) -> dict:
+        clave = (tarifa, frecuente, dias, mora)
+        valores = self._devoluciones.get(clave)
+        if valores is None:
+            alquiler = self.alquiler(tarifa, frecuente, dias)
+            tentativa = date(2000, 1, 1)
+            valores = self._calcular_devolucion(
+                SimpleNamespace(fecha_tentativa_devolucion=tentativa, **alquiler),
+                tentativa + timedelta(days=mora)
+            )
+            self._devoluciones[clave] = valores
+        return valores
+
+
+def _marca(fecha: date, rnd: random.Random) -> datetime:
+    return datetime.combine(fecha, hora(rnd.randrange(8, 20), rnd.randrange(60)), tzinfo=timezone.utc)
+
+
+def _linea_de_tiempo(rnd: random.Random, vehiculo: int, cantidad: int, activo: bool, hoy: date):
+    """Alquileres de un vehículo del más reciente al más antiguo: (inicio, vehiculo, dias, mora, estado)"""
+    cursor = hoy
+    for j in range(cantidad):
+        dias = min(MAX_DIAS, max(1, int(rnd.lognormvariate(DURACION_MU, DURACION_SIGMA))))
+        if j == 0 and activo:
+            inicio = hoy - timedelta(days=rnd.randrange(dias))
+            yield inicio, vehiculo, dias, 0, "activo"
+        else:
+            cancelado = rnd.random() < PROB_CANCELADO
+            mora = 0
+            if not cancelado and rnd.random() < PROB_TARDE:
+                mora = 1 + int(rnd.expovariate(1 / MORA_MEDIA))
+            fin = cursor - timedelta(days=int(rnd.expovariate(1 / BRECHA_MEDIA)))
+            inicio = fin - timedelta(days=mora + dias)
+            yield inicio, vehiculo, dias, mora, "cancelado" if cancelado else "devuelto"
+        cursor = inicio
+
+
+def _repartir(rnd: random.Random, total: int, n: int) -> list:
+    """total en n partes con pesos log-normales (vehículos más y menos populares)"""
+    pesos = [rnd.lognormvariate(0, 0.5) for _ in range(n)]
+    suma = sum(pesos)
+    partes = [int(total * p / suma) for p in pesos]
+    for i in rnd.sample(range(n), total - sum(partes)):
+        partes[i] += 1
+    return partes
+
+
+def generar(
+    engine,
+    usuarios: int = 100,
+    clientes: int = 10000,
+    vehiculos: int = 500,
+    alquileres: int = 100000,
+    activos: float = 0.3,
+    semilla: int = 42,
+    lote: int = 50000,
+    recaudacion: bool = True,
+    progreso=print,
+) -> dict:
+    """Agrega los datos a la base (no borra nada); devuelve las filas insertadas por tabla"""
+    from sqlalchemy.orm import Session
+
+    from app.auth import get_password_hash
+    from app.models import Alquiler, Cliente, Devolucion, Usuario, Vehiculo
+    from app.services import reconstruir_recaudacion
+
+    if alquileres and not (clientes and vehiculos):
+        raise ValueError("Para generar alquileres hacen falta clientes y vehículos")
+    rnd = random.Random(semilla)
+    escritor = _Escritor(engine)
+    calculadora = _Calculadora()
+    hoy = date.today()
+    insertadas = {}
+
+    # Usuarios: 1 % admin, 4 % empleados, el resto clientes (todos con la misma contraseña)
+    id_usuario = _siguiente_id(engine, Usuario)
+    hash_generados = get_password_hash(PASSWORD_GENERADOS)
+    columnas = ["id", "email", "password_hash", "nombre", "apellido", "rol", "activo", "created_at", "updated_at"]
+    filas, usuarios_cliente = [], []
+    for i in range(usuarios):
+        uid = id_usuario + i
+        rol = "admin" if i % 100 == 0 else "empleado" if i % 100 < 5 else "cliente"
+        if rol == "cliente":
+            usuarios_cliente.append(uid)
+        marca = _marca(hoy - timedelta(days=rnd.randrange(1000)), rnd)
+        filas.append((uid, f"generado{uid}@generado.ecomove.com", hash_generados, f"Usuario{uid}", "Generado", rol, True, marca, marca))
+    escritor.escribir(Usuario, columnas, filas)
+    insertadas["usuarios"] = len(filas)
+
+    # Clientes: peso Zipf; los de mayor peso son los frecuentes
+    id_cliente = _siguiente_id(engine, Cliente)
+    acumulados = list(itertools.accumulate(1 / (r + 1) ** SESGO_CLIENTES for r in range(clientes)))
+    frecuentes = int(clientes * PROPORCION_FRECUENTES)
+    columnas = ["id", "usuario_id", "dni", "nombre", "apellido", "telefono", "email", "fecha_nacimiento",
+                "es_frecuente", "direccion", "created_at", "updated_at"]
+    filas = []
+    for i in range(clientes):
+        cid = id_cliente + i
+        nacimiento = hoy - timedelta(days=rnd.randrange(18 * 366, 75 * 365))
+        marca = _marca(hoy - timedelta(days=rnd.randrange(1500)), rnd)
+        filas.append((
+            cid, usuarios_cliente[i] if i < len(usuarios_cliente) else None, f"{40000000 + cid}",
+            f"Nombre{cid}", f"Apellido{cid % 5000}", f"09{cid % 100000000:08d}", f"cliente{cid}@correo.com",
+            nacimiento, i < frecuentes, f"Calle {cid % 900} #{cid % 97}", marca, marca,
+        ))
+        if len(filas) >= lote:
+            escritor.escribir(Cliente, columnas, filas)
+            filas = []
+    escritor.escribir(Cliente, columnas, filas)
+    insertadas["clientes"] = clientes
+
+    # Vehículos: el estado refleja si su último alquiler sigue activo
+    id_vehiculo = _siguiente_id(engine, Vehiculo)
+    cantidades = _repartir(rnd, alquileres, vehiculos) if vehiculos else []
+    con_activo = [c > 0 and rnd.random() < activos for c in cantidades]
+    tarifas = [Decimal(rnd.choice((6, 8, 10, 12, 15, 18, 20, 25, 30, 40))) for _ in range(vehiculos)]
+    columnas = ["id", "codigo", "nombre", "descripcion", "tarifa_diaria", "requiere_mayor_edad", "estado",
+                "imagen_url", "created_at", "updated_at"]
+    filas = []
+    for i in range(vehiculos):
+        vid = id_vehiculo + i
+        estado = "alquilado" if con_activo[i] else "mantenimiento" if rnd.random() < PROB_MANTENIMIENTO else "disponible"
+        marca = _marca(hoy - timedelta(days=rnd.randrange(1500)), rnd)
+        filas.append((vid, f"G{vid:06d}", f"Vehículo {vid}", None, tarifas[i], i % 3 == 0, estado, None, marca, marca))
+    escritor.escribir(Vehiculo, columnas, filas)
+    insertadas["vehiculos"] = vehiculos
+
+    # Alquileres y devoluciones: líneas de tiempo mezcladas de la más reciente a la más antigua,
+    # con ids descendentes para que el id crezca con la fecha como en producción
+    id_alquiler = _siguiente_id(engine, Alquiler)
+    id_devolucion = _siguiente_id(engine, Devolucion)
+    columnas_alquiler = _columnas(Alquiler)
+    columnas_devolucion = _columnas(Devolucion)
+    fila_alquiler = operator.itemgetter(*columnas_alquiler)
+    fila_devolucion = operator.itemgetter(*columnas_devolucion)
+    lineas = [
+        _linea_de_tiempo(random.Random(f"{semilla}-{i}"), i, cantidades[i], con_activo[i], hoy)
+        for i in range(vehiculos)
+    ]
+    filas_alquiler, filas_devolucion = [], []
+    devoluciones = 0
+    inicio_carga = time.perf_counter()
+    for indice, (inicio, v, dias, mora, estado) in enumerate(heapq.merge(*lineas, key=lambda t: t[0], reverse=True)):
+        desplazamiento = alquileres - 1 - indice
+        aid = id_alquiler + desplazamiento
+        c = bisect.bisect_left(acumulados, rnd.random() * acumulados[-1])
+        frecuente = c < frecuentes
+        valores = calculadora.alquiler(tarifas[v], frecuente, dias)
+        tentativa = inicio + timedelta(days=dias)
+        creado = _marca(inicio, rnd)
+        actualizado = creado
+        if estado == "devuelto":
+            real = tentativa + timedelta(days=mora)
+            actualizado = _marca(real, rnd)
+            devolucion = calculadora.devolucion(tarifas[v], frecuente, dias, mora)
+            filas_devolucion.append(fila_devolucion({
+                "id": id_devolucion + desplazamiento, "alquiler_id": aid, "fecha_devolucion_real": real,
+                "observaciones": None, "created_at": actualizado, **devolucion,
+            }))
+            devoluciones += 1
+        filas_alquiler.append(fila_alquiler({
+            "id": aid, "cliente_id": id_cliente + c, "vehiculo_id": id_vehiculo + v, "fecha_inicio": inicio,
+            "fecha_tentativa_devolucion": tentativa, "estado": estado, "notas": None,
+            "created_at": creado, "updated_at": actualizado, **valores,
+        }))
+
+        if len(filas_alquiler) >= lote:
+            escritor.escribir(Alquiler, columnas_alquiler, filas_alquiler)
+            escritor.escribir(Devolucion, columnas_devolucion, filas_devolucion)
+            filas_alquiler, filas_devolucion = [], []
+            hechos = indice + 1
+            progreso(f"  {hechos:,} / {alquileres:,} alquileres ({hechos / (time.perf_counter() - inicio_carga):,.0f}/s)")
+    escritor.escribir(Alquiler, columnas_alquiler, filas_alquiler)
+    escritor.escribir(Devolucion, columnas_devolucion, filas_devolucion)
+    insertadas["alquileres"] = alquileres
+    insertadas["devoluciones"] = devoluciones
+
+    escritor.finalizar([Usuario, Cliente, Vehiculo, Alquiler, Devolucion])
+    if recaudacion:
+        progreso("  reconstruyendo recaudación por periodo ...")
+        with Session(engine) as db:
+            insertadas["recaudacion_periodos"] = reconstruir_recaudacion(db)
+    return insertadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=100)
+    parser.add_argument("--clientes", type=int, default=10000)
+    parser.add_argument("--vehiculos", type=int, default=500)
+    parser.add_argument("--alquileres", type=int, default=100000)
+    parser.add_argument("--activos", type=float, default=0.3, help="Fracción de vehículos con un alquiler activo")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=50000)
+    parser.add_argument("--sin-recaudacion", action="store_true", help="No reconstruir recaudacion_periodos")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.database import engine, init_db
+
+    init_db()
+    inicio = time.perf_counter()
+    insertadas = generar(
+        engine, args.usuarios, args.clientes, args.vehiculos, args.alquileres,
+        activos=args.activos, semilla=args.semilla, lote=args.lote, recaudacion=not args.sin_recaudacion,
+    )
+    print(f"Listo en {time.perf_counter() - inicio:.1f} s: " + ", ".join(f"{t}={n:,}" for t, n in insertadas.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+ECO-MOVE API - Regresiones de Planes de Consulta
+Recorre los endpoints de lectura en el mismo proceso contra una base grande,
+captura cada SELECT que emiten, ejecuta EXPLAIN y compara la forma del plan y el
+coste estimado con la línea base guardada. Falla si aparece un seq scan nuevo
+sobre una tabla grande, si un sort o hash se derrama a disco o si el coste crece
+más que la tolerancia.
+
+PostgreSQL usa EXPLAIN (ANALYZE, FORMAT JSON): sin ANALYZE no se ven los
+derrames. En SQLite se usa EXPLAIN QUERY PLAN (sin costes ni derrames).
+
+Uso (desde la raíz del repo):
+    python benchmarks/planes.py --database-url postgresql://localhost/ecomove_big --sin-sembrar --actualizar
+    python benchmarks/planes.py --database-url postgresql://localhost/ecomove_big --sin-sembrar
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+import entorno
+from bench_api import _commit
+from generar_datos import generar
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Listas de parámetros de IN (...) expandidas: su largo no cambia la consulta
+_LISTA_PARAMETROS = re.compile(r"\((?:\s*(?:%\(\w+\)s|\?)\s*,)+\s*(?:%\(\w+\)s|\?)\s*\)")
+_ALIAS = re.compile(r"\b(\w+) AS (\w+)\b")
+
+
+def _normalizar(sql: str) -> str:
+    return _LISTA_PARAMETROS.sub("(...)", " ".join(sql.split()))
+
+
+class Captura:
+    """SELECTs emitidos por el engine mientras se atiende cada endpoint"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.actual = None
+        self.consultas = {}
+        event.listen(engine, "before_cursor_execute", self._registrar)
+
+    def _registrar(self, conn, cursor, statement, parameters, context, executemany):
+        if self.actual is None or executemany:
+            return
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return
+        normalizada = _normalizar(statement)
+        clave = f"{self.actual} #{hashlib.sha1(normalizada.encode()).hexdigest()[:10]}"
+        # La primera ejecución queda como representante (mismos parámetros que el endpoint)
+        self.consultas.setdefault(clave, (self.actual, statement, parameters, normalizada))
+
+
+def _muestras(db) -> dict:
+    """Ids reales para las rutas con parámetros (clientes y alquileres con historia)"""
+    from sqlalchemy import func
+
+    from app.models import Alquiler, Cliente, Devolucion, Vehiculo
+
+    activo = db.query(Alquiler).filter(Alquiler.estado == "activo").order_by(Alquiler.id.desc()).first()
+    cliente_id = (
+        db.query(Alquiler.cliente_id).group_by(Alquiler.cliente_id)
+        .order_by(func.count(Alquiler.id).desc()).limit(1).scalar()
+    )
+    cliente = db.get(Cliente, cliente_id) if cliente_id else db.query(Cliente).first()
+    vehiculo = db.query(Vehiculo).order_by(Vehiculo.id).first()
+    return {
+        "cliente": cliente,
+        "vehiculo": vehiculo,
+        "activo": activo,
+        "devolucion_id": db.query(Devolucion.id).order_by(Devolucion.id.desc()).limit(1).scalar(),
+    }
+
+
+def endpoints(m: dict) -> list:
+    """(nombre, método, ruta, cuerpo) de cada endpoint de lectura a revisar"""
+    from bench_api import REPORTES
+
+    hoy = date.today()
+    cliente, vehiculo, activo = m["cliente"], m["vehiculo"], m["activo"]
+    casos = [
+        ("auth/me", "GET", "/auth/me", None),
+        ("usuarios", "GET", "/usuarios/", None),
+        ("clientes", "GET", "/clientes/", None),
+        ("clientes?es_frecuente", "GET", "/clientes/?es_frecuente=true", None),
+        ("clientes?ids", "GET", f"/clientes/?ids={cliente.id},{cliente.id + 1}", None),
+        ("clientes/buscar", "GET", f"/clientes/buscar?q={cliente.apellido[:4]}", None),
+        ("clientes/{id}", "GET", f"/clientes/{cliente.id}", None),
+        ("clientes/dni/{dni}", "GET", f"/clientes/dni/{cliente.dni}", None),
+        ("vehiculos", "GET", "/vehiculos/", None),
+        ("vehiculos/disponibles", "GET", "/vehiculos/disponibles", None),
+        ("vehiculos/{id}", "GET", f"/vehiculos/{vehiculo.id}", None),
+        ("vehiculos/codigo/{codigo}", "GET", f"/vehiculos/codigo/{vehiculo.codigo}", None),
+        ("alquileres", "GET", "/alquileres/", None),
+        ("alquileres?estado", "GET", "/alquileres/?estado=devuelto", None),
+        ("alquileres?cliente_id", "GET", f"/alquileres/?cliente_id={cliente.id}", None),
+        ("alquileres?ids", "GET", "/alquileres/?ids=1,2,3", None),
+        ("alquileres?fields&expand", "GET", "/alquileres/?fields=id,estado,total_pagar&expand=cliente,vehiculo", None),
+        ("alquileres/activos", "GET", "/alquileres/activos", None),
+        ("alquileres/calcular", "POST", "/alquileres/calcular", {
+            "cliente_id": cliente.id, "vehiculo_id": vehiculo.id, "fecha_inicio": hoy.isoformat(),
+            "fecha_tentativa_devolucion": (hoy + timedelta(days=3)).isoformat(),
+        }),
+        ("devoluciones", "GET", "/devoluciones/", None),
+        ("devoluciones?expand", "GET", "/devoluciones/?fields=id,total_final&expand=alquiler.cliente", None),
+    ]
+    if activo is not None:
+        casos += [
+            ("alquileres/{id}", "GET", f"/alquileres/{activo.id}", None),
+            ("devoluciones/calcular", "POST", "/devoluciones/calcular", {
+                "alquiler_id": activo.id, "fecha_devolucion_real": (hoy + timedelta(days=2)).isoformat(),
+            }),
+        ]
+    if m["devolucion_id"] is not None:
+        casos.append(("devoluciones/{id}", "GET", f"/devoluciones/{m['devolucion_id']}", None))
+    casos += [(ruta.split("?")[0].lstrip("/"), "GET", ruta, None) for ruta in REPORTES]
+    return casos
+
+
+def recorrer(captura: Captura) -> list:
+    """Atiende cada endpoint una vez (reportes en frío) y devuelve los que fallaron"""
+    from fastapi.testclient import TestClient
+
+    from app.cache import incrementar_version_datos
+    from app.database import SessionLocal
+    from app.main import app
+
+    with SessionLocal() as db:
+        casos = endpoints(_muestras(db))
+
+    fallidos = []
+    with TestClient(app) as cliente:
+        token = cliente.post(
+            "/auth/login", json={"email": entorno.ADMIN_EMAIL, "password": entorno.ADMIN_PASSWORD}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for nombre, metodo, ruta, cuerpo in casos:
+            # Sin caché de reportes: se quiere la consulta, no la respuesta guardada
+            incrementar_version_datos()
+            captura.actual = nombre
+            try:
+                respuesta = cliente.request(metodo, ruta, json=cuerpo, headers=headers)
+            finally:
+                captura.actual = None
+            if respuesta.status_code >= 400:
+                fallidos.append(f"{nombre}: {metodo} {ruta} -> {respuesta.status_code}")
+    return fallidos
+
+
+def tamanos(engine) -> dict:
+    """Filas por tabla (estimadas en PostgreSQL, contadas en otras bases)"""
+    from sqlalchemy import inspect, text
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            filas = conn.execute(text(
+                "SELECT relname, reltuples::bigint FROM pg_class "
+                "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+            ))
+            return {nombre: max(int(n), 0) for nombre, n in filas}
+        return {
+            tabla: conn.execute(text(f'SELECT COUNT(*) FROM "{tabla}"')).scalar()
+            for tabla in inspect(engine).get_table_names()
+        }
+
+
+def _nodos(nodo: dict, nivel: int = 0):
+    yield nivel, nodo
+    for hijo in nodo.get("Plans", []):
+        yield from _nodos(hijo, nivel + 1)
+
+
+def _plan_postgres(cursor, sql: str, parametros, analizar: bool) -> dict:
+    opciones = "ANALYZE, FORMAT JSON" if analizar else "FORMAT JSON"
+    cursor.execute(f"EXPLAIN ({opciones}) {sql}", parametros)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    raiz = plan[0]["Plan"]
+    forma, scans, derrames = [], [], []
+    for nivel, nodo in _nodos(raiz):
+        tipo = nodo["Node Type"]
+        objeto = nodo.get("Relation Name") or ""
+        if nodo.get("Index Name"):
+            objeto += f" using {nodo['Index Name']}"
+        forma.append("  " * nivel + (f"{tipo} on {objeto.strip()}" if objeto else tipo))
+        if tipo == "Seq Scan":
+            scans.append(nodo["Relation Name"])
+        if nodo.get("Sort Space Type") == "Disk":
+            derrames.append(f"{tipo}: {nodo.get('Sort Method')} {nodo.get('Sort Space Used')} kB")
+        if nodo.get("Hash Batches", 1) > 1:
+            derrames.append(f"{tipo}: {nodo['Hash Batches']} lotes")
+    return {"forma": forma, "coste": raiz["Total Cost"], "scans": scans, "derrames": derrames}
+
+
+def _plan_sqlite(cursor, sql: str, parametros) -> dict:
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parametros or ())
+    alias = {a: tabla for tabla, a in _ALIAS.findall(sql)}
+    forma, scans = [], []
+    for _, _, _, detalle in cursor.fetchall():
+        forma.append(detalle)
+        partes = detalle.split()
+        if partes[0] == "SCAN" and len(partes) > 1:
+            scans.append(alias.get(partes[1], partes[1]))
+    return {"forma": forma, "coste": None, "scans": scans, "derrames": []}
+
+
+def explicar(engine, captura: Captura, grandes: set, analizar: bool) -> dict:
+    planes = {}
+    conexion = engine.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        for clave, (endpoint, sql, parametros, normalizada) in sorted(captura.consultas.items()):
+            if engine.dialect.name == "postgresql":
+                plan = _plan_postgres(cursor, sql, parametros, analizar)
+            else:
+                plan = _plan_sqlite(cursor, sql, parametros)
+            conexion.rollback()
+            planes[clave] = {
+                "endpoint": endpoint,
+                "sql": normalizada,
+                "forma": plan["forma"],
+                "coste": plan["coste"],
+                "seq_scans": sorted({t for t in plan["scans"] if t in grandes}),
+                "derrames": plan["derrames"],
+            }
+    finally:
+        conexion.close()
+    return planes
+
+
+def comparar(base: dict, actual: dict, tolerancia: float) -> tuple:
+    """(fallos, avisos) del plan actual frente a la línea base"""
+    fallos, avisos = [], []
+    for clave, plan in actual.items():
+        anterior = base.get(clave)
+        previos = set(anterior["seq_scans"]) if anterior else set()
+        for tabla in plan["seq_scans"]:
+            if tabla not in previos:
+                fallos.append(f"{clave}: seq scan nuevo sobre {tabla}")
+        for derrame in plan["derrames"]:
+            fallos.append(f"{clave}: derrame a disco ({derrame})")
+        if anterior is None:
+            avisos.append(f"{clave}: consulta nueva")
+            continue
+        if anterior["coste"] and plan["coste"] and plan["coste"] > anterior["coste"] * (1 + tolerancia):
+            fallos.append(f"{clave}: coste {anterior['coste']:.0f} -> {plan['coste']:.0f}")
+        if plan["forma"] != anterior["forma"]:
+            avisos.append(f"{clave}: cambió la forma del plan")
+    for clave in base.keys() - actual.keys():
+        avisos.append(f"{clave}: ya no se ejecuta")
+    return fallos, avisos
+
+
+def _imprimir(planes: dict, base: dict) -> None:
+    print(f"\n{'consulta':<52}{'coste':>14}{'base':>14}  seq scans")
+    for clave, plan in planes.items():
+        anterior = base.get(clave) or {}
+        coste = f"{plan['coste']:.0f}" if plan["coste"] is not None else "-"
+        coste_base = f"{anterior['coste']:.0f}" if anterior.get("coste") is not None else "-"
+        print(f"{clave:<52}{coste:>14}{coste_base:>14}  {', '.join(plan['seq_scans'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Base a usar (por defecto una SQLite temporal)")
+    parser.add_argument("--sin-sembrar", action="store_true", help="La base ya tiene datos")
+    parser.add_argument("--clientes", type=int, default=20000)
+    parser.add_argument("--vehiculos", type=int, default=500)
+    parser.add_argument("--alquileres", type=int, default=200000)
+    parser.add_argument("--base", help="Línea base (por defecto benchmarks/planes_<dialecto>.json)")
+    parser.add_argument("--actualizar", action="store_true", help="Guarda los planes actuales como línea base")
+    parser.add_argument("--filas-grandes", type=int, default=10000, help="Desde cuántas filas una tabla es grande")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="Aumento de coste estimado tolerado")
+    parser.add_argument("--sin-analyze", action="store_true", help="Solo EXPLAIN (no ejecuta; no detecta derrames)")
+    args = parser.parse_args()
+
+    url = entorno.configurar(args.database_url)
+    entorno.preparar_esquema()
+    entorno.crear_admin()
+
+    from app.database import engine
+
+    if not args.sin_sembrar:
+        print(f"Sembrando {args.alquileres} alquileres en {url} ...")
+        generar(engine, usuarios=0, clientes=args.clientes, vehiculos=args.vehiculos,
+                alquileres=args.alquileres, progreso=lambda mensaje: None)
+
+    dialecto = engine.dialect.name
+    ruta_base = args.base or os.path.join(DIRECTORIO, f"planes_{dialecto}.json")
+    filas = tamanos(engine)
+    grandes = {tabla for tabla, n in filas.items() if n >= args.filas_grandes}
+
+    captura = Captura(engine)
+    fallidos = recorrer(captura)
+    planes = explicar(engine, captura, grandes, analizar=not args.sin_analyze)
+
+    if args.actualizar:
+        with open(ruta_base, "w", encoding="utf-8") as archivo:
+            json.dump({
+                "meta": {
+                    "commit": _commit(),
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "base": dialecto,
+                    "filas": filas,
+                },
+                "planes": planes,
+            }, archivo, ensure_ascii=False, indent=2)
+        _imprimir(planes, {})
+        print(f"\n{len(planes)} consultas guardadas en {ruta_base}")
+        return
+
+    if not os.path.exists(ruta_base):
+        sys.exit(f"No existe la línea base {ruta_base}: generarla con --actualizar")
+    with open(ruta_base, encoding="utf-8") as archivo:
+        base = json.load(archivo)
+
+    _imprimir(planes, base["planes"])
+    fallos, avisos = comparar(base["planes"], planes, args.tolerancia)
+    fallos = [f"endpoint con error: {f}" for f in fallidos] + fallos
+    if avisos:
+        print("\nAvisos:\n  " + "\n  ".join(avisos))
+    if fallos:
+        print("\nRegresiones:\n  " + "\n  ".join(fallos))
+        sys.exit(1)
+    print(f"\nSin regresiones frente a {base['meta'].get('commit')}")
+
+
+if __name__ == "__main__":
+    main()
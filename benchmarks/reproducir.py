@@ -0,0 +1,191 @@
+"""
+ECO-MOVE API - Reproducción de Tráfico
+Vuelve a emitir una captura de CAPTURE_PATH contra una instancia local,
+respetando los tiempos entre solicitudes a 1× o N× de velocidad. Informa la
+latencia por ruta (p50/p90/p99 y la p50 capturada en producción).
+
+Los valores saneados se reemplazan al reproducir: el texto enmascarado se envía
+como "x" del mismo largo, las fechas personales como una fecha fija y los logins
+usan las credenciales de --usuario. Las rutas con datos enmascarados (dni,
+búsquedas) pueden responder 404 o vacío.
+
+Uso (desde la raíz del repo):
+    python benchmarks/reproducir.py capture.jsonl --url http://localhost:8000 \\
+        --usuario admin=admin@ecomove.com:admin123 --usuario empleado=emp@ecomove.com:emp123
+    python benchmarks/reproducir.py capture.jsonl --velocidad 4 --salida reproduccion.json
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+from bench_api import _percentil
+
+RUTA_LOGIN = "/auth/login"
+
+# Reemplazo de las fechas personales enmascaradas (mayor de edad)
+FECHA_ENMASCARADA = "1990-01-01"
+
+_PARAMETRO_RUTA = re.compile(r"\{(\w+)(?::\w+)?\}")
+_TEXTO = re.compile(r"^<str:(\d+)>$")
+
+
+def _valor(forma):
+    """Cuerpo reproducible a partir de la forma capturada"""
+    if isinstance(forma, dict):
+        return {k: _valor(v) for k, v in forma.items()}
+    if isinstance(forma, list):
+        return [_valor(v) for v in forma]
+    if forma == "<fecha>":
+        return FECHA_ENMASCARADA
+    if isinstance(forma, str):
+        texto = _TEXTO.match(forma)
+        if texto:
+            return "x" * int(texto.group(1))
+    return forma
+
+
+def _desenmascarar(valor: str) -> str:
+    return "x" * len(valor) if valor and set(valor) == {"*"} else valor
+
+
+def leer(ruta: str) -> list:
+    with open(ruta, encoding="utf-8") as archivo:
+        registros = [json.loads(linea) for linea in archivo if linea.strip()]
+    return sorted(registros, key=lambda r: r["t"])
+
+
+def solicitud(registro: dict, credenciales: dict) -> tuple:
+    """(método, ruta, query, cuerpo) listos para enviar"""
+    params = registro.get("path_params", {})
+    ruta = _PARAMETRO_RUTA.sub(lambda m: _desenmascarar(params.get(m.group(1), "")), registro["ruta"])
+    query = [(k, _desenmascarar(v)) for k, v in registro.get("query", [])]
+    cuerpo = _valor(registro["cuerpo"]) if "cuerpo" in registro else None
+    if ruta == RUTA_LOGIN and credenciales:
+        email, password = credenciales.get("admin") or next(iter(credenciales.values()))
+        cuerpo = {"email": email, "password": password}
+    return registro["metodo"], ruta, query, cuerpo
+
+
+async def _tokens(cliente, credenciales: dict) -> dict:
+    tokens = {}
+    for rol, (email, password) in credenciales.items():
+        respuesta = await cliente.post(RUTA_LOGIN, json={"email": email, "password": password})
+        if respuesta.status_code != 200:
+            sys.exit(f"No se pudo iniciar sesión como {rol} ({email}): {respuesta.status_code}")
+        tokens[rol] = respuesta.json()["access_token"]
+    return tokens
+
+
+async def reproducir(registros: list, url: str, velocidad: float, credenciales: dict, en_vuelo: int) -> dict:
+    import httpx
+
+    tiempos = defaultdict(list)
+    errores = defaultdict(int)
+    sin_token = set()
+    limite = asyncio.Semaphore(en_vuelo)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=httpx.Limits(max_connections=en_vuelo)) as cliente:
+        tokens = await _tokens(cliente, credenciales)
+
+        async def emitir(registro: dict, momento: float):
+            clave = f"{registro['metodo']} {registro['ruta']}"
+            metodo, ruta, query, cuerpo = solicitud(registro, credenciales)
+            headers = {}
+            rol = registro.get("rol", "anonimo")
+            if rol in tokens:
+                headers["Authorization"] = f"Bearer {tokens[rol]}"
+            elif rol != "anonimo":
+                sin_token.add(rol)
+            await asyncio.sleep(max(0.0, momento - time.perf_counter()))
+            async with limite:
+                inicio = time.perf_counter()
+                try:
+                    respuesta = await cliente.request(metodo, ruta, params=query, json=cuerpo, headers=headers)
+                    fallo = respuesta.status_code >= 400
+                except httpx.HTTPError:
+                    fallo = True
+                tiempos[clave].append(time.perf_counter() - inicio)
+                if fallo:
+                    errores[clave] += 1
+
+        origen = registros[0]["t"]
+        comienzo = time.perf_counter()
+        await asyncio.gather(*(
+            emitir(r, comienzo + (r["t"] - origen) / velocidad) for r in registros
+        ))
+        duracion = time.perf_counter() - comienzo
+
+    if sin_token:
+        print(f"Sin credenciales para los roles {', '.join(sorted(sin_token))}: se enviaron sin token")
+
+    capturados = defaultdict(list)
+    for r in registros:
+        capturados[f"{r['metodo']} {r['ruta']}"].append(r["ms"])
+
+    resultados = {}
+    for clave, valores in sorted(tiempos.items(), key=lambda par: -len(par[1])):
+        ordenadas = sorted(valores)
+        resultados[clave] = {
+            "n": len(ordenadas),
+            "errores": errores[clave],
+            "media_ms": round(statistics.fmean(ordenadas) * 1000, 3),
+            "p50_ms": round(_percentil(ordenadas, 50) * 1000, 3),
+            "p90_ms": round(_percentil(ordenadas, 90) * 1000, 3),
+            "p99_ms": round(_percentil(ordenadas, 99) * 1000, 3),
+            "capturado_p50_ms": round(statistics.median(capturados[clave]), 3),
+        }
+    return {"duracion_s": round(duracion, 3), "rutas": resultados}
+
+
+def _credenciales(valores: list) -> dict:
+    credenciales = {}
+    for valor in valores or []:
+        rol, _, cuenta = valor.partition("=")
+        email, _, password = cuenta.partition(":")
+        if not (rol and email and password):
+            sys.exit(f"--usuario debe ser rol=email:password (recibido {valor!r})")
+        credenciales[rol] = (email, password)
+    return credenciales
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captura", help="Archivo JSONL generado con CAPTURE_ENABLED=true")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="Factor de velocidad (2 = el doble de rápido)")
+    parser.add_argument("--usuario", action="append", help="rol=email:password para firmar las solicitudes de ese rol")
+    parser.add_argument("--rutas", nargs="*", help="Solo las rutas que contengan alguno de estos textos")
+    parser.add_argument("--en-vuelo", type=int, default=256, help="Máximo de solicitudes simultáneas")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    registros = leer(args.captura)
+    if args.rutas:
+        registros = [r for r in registros if any(filtro in r["ruta"] for filtro in args.rutas)]
+    if not registros:
+        sys.exit("La captura no tiene solicitudes para reproducir")
+
+    print(f"Reproduciendo {len(registros)} solicitudes a {args.velocidad}× contra {args.url} ...")
+    resultado = asyncio.run(reproducir(registros, args.url, args.velocidad, _credenciales(args.usuario), args.en_vuelo))
+
+    print(f"\n{'ruta':<52}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'capt. p50':>11}")
+    for clave, r in resultado["rutas"].items():
+        linea = f"{clave:<52}{r['n']:>6}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['capturado_p50_ms']:>11.2f}"
+        if r["errores"]:
+            linea += f"  errores={r['errores']}"
+        print(linea)
+    print(f"\nDuración: {resultado['duracion_s']} s")
+
+    if args.salida:
+        resultado["meta"] = {"captura": args.captura, "velocidad": args.velocidad, "url": args.url}
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
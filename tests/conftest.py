@@ -0,0 +1,59 @@
+"""
+ECO-MOVE API - Fixtures de Pruebas
+Las pruebas unitarias corren contra una SQLite temporal (sin servidor). test_api.py
+es el script de pruebas contra un servidor en marcha y no se recolecta.
+"""
+import datetime
+import os
+import sys
+import tempfile
+
+import pytest
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="ecomove-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DIRECTORIO}/tests.db"
+os.environ.setdefault("JWT_SECRET", "pruebas")
+os.environ["STARTUP_WARMUP"] = "false"
+os.environ["OPENAPI_PATH"] = ""
+os.environ["CAPTURE_ENABLED"] = "false"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+collect_ignore = ["test_api.py"]
+
+ADMIN_EMAIL = "admin@ecomove.com"
+ADMIN_PASSWORD = "admin123"
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.auth import get_password_hash
+    from app.database import SessionLocal, init_db
+    from app.main import app
+    from app.models import Cliente, Usuario, Vehiculo
+
+    init_db()
+    db = SessionLocal()
+    db.add(Usuario(email=ADMIN_EMAIL, password_hash=get_password_hash(ADMIN_PASSWORD),
+                   nombre="Admin", apellido="Pruebas", rol="admin"))
+    db.add_all([
+        Vehiculo(codigo=f"V{i}", nombre=f"Vehículo {i}", tarifa_diaria=10 + i, requiere_mayor_edad=False)
+        for i in range(3)
+    ])
+    db.add_all([
+        Cliente(dni="1234567", nombre="Ana", apellido="Pérez", fecha_nacimiento=datetime.date(1990, 1, 1)),
+        Cliente(dni="7654321", nombre="Luis", apellido="Sol", fecha_nacimiento=datetime.date(1985, 1, 1)),
+    ])
+    db.commit()
+    db.close()
+    return app
+
+
+@pytest.fixture(scope="session")
+def cliente(app):
+    """TestClient autenticado como admin"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as cliente:
+        respuesta = cliente.post("/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        cliente.headers["Authorization"] = f"Bearer {respuesta.json()['access_token']}"
+        yield cliente
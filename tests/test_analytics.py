@@ -0,0 +1,28 @@
+"""
+ECO-MOVE API - Pruebas del Almacén Analítico
+Con DuckDB, un segundo proceso sobre ANALYTICS_PATH usa un archivo propio.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.analytics import AlmacenAnalitico
+
+duckdb = pytest.importorskip("duckdb")
+
+RETENER = "import duckdb, sys; c = duckdb.connect(sys.argv[1]); print('listo', flush=True); sys.stdin.read()"
+
+
+def test_duckdb_con_el_archivo_tomado_por_otro_proceso(tmp_path):
+    ruta = str(tmp_path / "analytics.duckdb")
+    otro = subprocess.Popen([sys.executable, "-c", RETENER, ruta], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert otro.stdout.readline().strip() == "listo"
+        almacen = AlmacenAnalitico("duckdb", ruta, intervalo=60)
+        propio = str(tmp_path / f"analytics.{os.getpid()}.duckdb")
+        assert os.path.exists(propio)
+        assert almacen._conn.execute("SELECT count(*) FROM sincronizacion").fetchone() is not None
+    finally:
+        otro.communicate("")
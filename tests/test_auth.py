@@ -0,0 +1,73 @@
+"""
+ECO-MOVE API - Pruebas de la Caché de Principales
+Los cambios que no llegan por el bus se aplican al vencer PRINCIPAL_CACHE_TTL_S y
+el usuario cacheado nunca reemplaza a las filas que lee la solicitud.
+"""
+from fastapi.testclient import TestClient
+
+from app import auth
+from app.auth import get_password_hash
+from app.database import SessionLocal
+from app.models import Usuario
+
+
+def _crear_usuario(email: str, rol: str) -> int:
+    db = SessionLocal()
+    try:
+        usuario = Usuario(email=email, password_hash=get_password_hash("clave123"),
+                          nombre="Original", apellido="Pruebas", rol=rol)
+        db.add(usuario)
+        db.commit()
+        return usuario.id
+    finally:
+        db.close()
+
+
+def _editar_en_la_base(usuario_id: int, **valores) -> None:
+    """Edición directa, como update_password.py: no publica en el bus"""
+    db = SessionLocal()
+    try:
+        db.query(Usuario).filter(Usuario.id == usuario_id).update(valores)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _sesion(app, email: str) -> TestClient:
+    cliente = TestClient(app)
+    respuesta = cliente.post("/auth/login", json={"email": email, "password": "clave123"})
+    cliente.headers["Authorization"] = f"Bearer {respuesta.json()['access_token']}"
+    return cliente
+
+
+def test_desactivacion_fuera_del_bus_vence_con_el_ttl(app, monkeypatch):
+    usuario_id = _crear_usuario("ttl@ecomove.com", "empleado")
+    cliente = _sesion(app, "ttl@ecomove.com")
+    assert cliente.get("/auth/me").status_code == 200
+
+    _editar_en_la_base(usuario_id, activo=False)
+    assert cliente.get("/auth/me").status_code == 200
+    monkeypatch.setattr(auth.settings, "principal_cache_ttl_s", 0)
+    assert cliente.get("/auth/me").status_code == 403
+
+
+def test_principal_cacheado_no_reemplaza_filas_frescas(app):
+    usuario_id = _crear_usuario("fresco@ecomove.com", "admin")
+    cliente = _sesion(app, "fresco@ecomove.com")
+    assert cliente.get("/auth/me").json()["nombre"] == "Original"
+
+    _editar_en_la_base(usuario_id, nombre="Editado")
+    # /auth/me devuelve el principal cacheado; /usuarios/{id} consulta la base
+    assert cliente.get("/auth/me").json()["nombre"] == "Original"
+    assert cliente.get(f"/usuarios/{usuario_id}").json()["nombre"] == "Editado"
+    assert [u["nombre"] for u in cliente.get("/usuarios/").json() if u["id"] == usuario_id] == ["Editado"]
+
+
+def test_cambio_de_clave_con_principal_cacheado(app):
+    _crear_usuario("clave@ecomove.com", "empleado")
+    cliente = _sesion(app, "clave@ecomove.com")
+    cliente.get("/auth/me")
+    respuesta = cliente.post("/auth/change-password", params={"old_password": "clave123", "new_password": "nueva123"})
+    assert respuesta.status_code == 200
+    login = cliente.post("/auth/login", json={"email": "clave@ecomove.com", "password": "nueva123"})
+    assert login.status_code == 200
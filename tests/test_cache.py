@@ -0,0 +1,85 @@
+"""
+ECO-MOVE API - Pruebas de las Solicitudes Condicionales
+304 con If-None-Match / If-Modified-Since y 412 con If-Match (comparación fuerte).
+"""
+import time
+from datetime import date, timedelta
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from fastapi.testclient import TestClient
+
+from app.cache import etag_coincide_fuerte
+from app.compression import CompresionMiddleware
+
+RECURSOS = [("/clientes/1", {"telefono": "0990000001"}), ("/vehiculos/1", {"nombre": "Vehículo editado"})]
+
+
+def test_comparacion_fuerte():
+    assert etag_coincide_fuerte('"1-2"', '"1-2"')
+    assert etag_coincide_fuerte('"0-0", "1-2"', '"1-2"')
+    assert etag_coincide_fuerte("*", '"1-2"')
+    assert not etag_coincide_fuerte('W/"1-2"', '"1-2"')
+    assert not etag_coincide_fuerte('"1-2"', 'W/"1-2"')
+    assert not etag_coincide_fuerte('"1-3"', '"1-2"')
+
+
+@pytest.mark.parametrize("url", [url for url, _ in RECURSOS])
+def test_304(cliente, url):
+    respuesta = cliente.get(url)
+    etag, ultima = respuesta.headers["etag"], respuesta.headers["last-modified"]
+    assert not etag.startswith("W/")
+    no_modificada = cliente.get(url, headers={"If-None-Match": etag})
+    assert no_modificada.status_code == 304
+    assert no_modificada.headers["etag"] == etag
+    # La comparación de If-None-Match es débil
+    assert cliente.get(url, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert cliente.get(url, headers={"If-Modified-Since": ultima}).status_code == 304
+    assert cliente.get(url, headers={"If-None-Match": '"0-0"'}).status_code == 200
+
+
+@pytest.mark.parametrize("url,cambio", RECURSOS)
+def test_412(cliente, url, cambio):
+    etag = cliente.get(url).headers["etag"]
+    # If-Match exige comparación fuerte: la forma débil del mismo ETag no coincide
+    assert cliente.put(url, json=cambio, headers={"If-Match": f"W/{etag}"}).status_code == 412
+    time.sleep(1.1)  # SQLite guarda updated_at con resolución de segundos
+    actualizada = cliente.put(url, json=cambio, headers={"If-Match": etag})
+    assert actualizada.status_code == 200
+    assert actualizada.headers["etag"] != etag
+    assert cliente.put(url, json=cambio, headers={"If-Match": etag}).status_code == 412
+    assert cliente.get(url, headers={"If-None-Match": etag}).status_code == 200
+    assert cliente.put(url, json=cambio, headers={"If-Match": actualizada.headers["etag"]}).status_code == 200
+
+
+def test_304_alquiler(cliente):
+    inicio = date.today()
+    creado = cliente.post("/alquileres/", json={
+        "cliente_id": 2, "vehiculo_id": 2,
+        "fecha_inicio": inicio.isoformat(),
+        "fecha_tentativa_devolucion": (inicio + timedelta(days=2)).isoformat(),
+    })
+    assert creado.status_code in (200, 201), creado.text
+    url = f"/alquileres/{creado.json()['id']}"
+    etag = cliente.get(url).headers["etag"]
+    assert etag.startswith("W/")
+    assert cliente.get(url, headers={"If-None-Match": etag}).status_code == 304
+    time.sleep(1.1)
+    assert cliente.put("/clientes/2", json={"telefono": "0990000002"}).status_code == 200
+    # El alquiler incluye al cliente: cambia si cambia el cliente
+    assert cliente.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_etag_fuerte_sin_comprimir():
+    def recurso(request):
+        return Response(b"x" * 4096, media_type="application/json", headers={"ETag": '"1-2"'})
+
+    def listado(request):
+        return Response(b"x" * 4096, media_type="application/json", headers={"ETag": 'W/"1-2"'})
+
+    app = Starlette(routes=[Route("/recurso", recurso), Route("/listado", listado)])
+    cliente = TestClient(CompresionMiddleware(app, algoritmos="gzip", minimo=0))
+    assert "content-encoding" not in cliente.get("/recurso", headers={"Accept-Encoding": "gzip"}).headers
+    assert cliente.get("/listado", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
@@ -0,0 +1,67 @@
+"""
+ECO-MOVE API - Pruebas de la Captura de Tráfico
+Ningún valor de credenciales ni dato personal de las rutas reales debe llegar al JSONL.
+"""
+import json
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from app import capture
+from app.capture import CapturaMiddleware, _saneados, es_sensible, forma
+from app.routers import auth, usuarios
+
+# Parámetros de auth/usuarios que se pueden guardar tal cual (enums, booleanos y
+# paginación); cualquier parámetro nuevo debe enmascararse o agregarse aquí
+NO_SENSIBLES = {"rol", "activo", "skip", "limit"}
+
+VALOR = "valor-que-no-debe-guardarse"
+
+
+def _parametros_texto(*routers) -> set:
+    """Nombres de los parámetros de query y de los campos del cuerpo de las rutas"""
+    nombres = set()
+    for ruta in (r for router in routers for r in router.routes if isinstance(r, APIRoute)):
+        nombres.update(p.name for p in ruta.dependant.query_params)
+        for cuerpo in ruta.dependant.body_params:
+            campos = getattr(cuerpo.field_info.annotation, "model_fields", {})
+            nombres.update(campos or {cuerpo.name})
+    return nombres
+
+
+def test_parametros_de_auth_enmascarados():
+    nombres = _parametros_texto(auth.router, usuarios.router) - NO_SENSIBLES
+    assert {"old_password", "new_password", "password", "email"} <= nombres
+    for nombre in nombres:
+        assert es_sensible(nombre), f"{nombre} se guardaría en la captura"
+        assert VALOR not in json.dumps(_saneados([(nombre, VALOR)]))
+        assert VALOR not in json.dumps(forma({nombre: VALOR}))
+
+
+@pytest.mark.parametrize("nombre", ["old_password", "Refresh_Token", "client_secret", "api_token"])
+def test_credenciales_por_nombre(nombre):
+    assert _saneados([(nombre, "abc")]) == [[nombre, "***"]]
+    assert forma({nombre: "abc"}) == {nombre: "<str:3>"}
+
+
+def test_forma_conserva_lo_no_sensible():
+    assert forma({"cliente_id": 3, "fecha_inicio": "2026-01-02", "fecha_nacimiento": "1990-01-01", "rol": "admin"}) == {
+        "cliente_id": 3, "fecha_inicio": "2026-01-02", "fecha_nacimiento": "<fecha>", "rol": "<str:5>",
+    }
+    assert _saneados([("limit", "10"), ("q", "pérez")]) == [["limit", "10"], ["q", "*****"]]
+
+
+def test_captura_de_rutas_reales(app, cliente, monkeypatch):
+    registros = []
+    monkeypatch.setattr(capture.escritor, "escribir", registros.append)
+    with TestClient(CapturaMiddleware(app)) as capturado:
+        capturado.post("/auth/login", json={"email": "admin@ecomove.com", "password": VALOR})
+        capturado.post(
+            "/auth/change-password", params={"old_password": VALOR, "new_password": VALOR},
+            headers={"Authorization": cliente.headers["Authorization"]},
+        )
+    assert [r["ruta"] for r in registros] == ["/auth/login", "/auth/change-password"]
+    linea = json.dumps(registros)
+    assert VALOR not in linea and "admin@ecomove.com" not in linea
+    assert registros[1]["query"] == [["old_password", "*" * len(VALOR)], ["new_password", "*" * len(VALOR)]]
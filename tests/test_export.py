@@ -0,0 +1,62 @@
+"""
+ECO-MOVE API - Pruebas de la Exportación Columnar
+Las consultas se envían por lotes (un row group de Parquet por lote).
+"""
+import asyncio
+import io
+
+import pytest
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app import export
+from app.database import SessionLocal
+from app.models import Alquiler, Vehiculo
+from app.schemas import FormatoExportEnum
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+
+async def _leer(iterador) -> list:
+    return [parte async for parte in iterador]
+
+
+def _exportar(formato, monkeypatch) -> tuple:
+    monkeypatch.setattr(export, "TAMANO_LOTE", 1)
+    stmt = select(*Vehiculo.__table__.columns).order_by(Vehiculo.id)
+    respuesta = export.exportar_consulta(SessionLocal(), stmt, formato, "vehiculos")
+    assert isinstance(respuesta, StreamingResponse)
+    partes = asyncio.run(_leer(respuesta.body_iterator))
+    return partes, b"".join(partes)
+
+
+def test_parquet_un_row_group_por_lote(app, monkeypatch):
+    partes, contenido = _exportar(FormatoExportEnum.parquet, monkeypatch)
+    archivo = pa.parquet.ParquetFile(io.BytesIO(contenido))
+    assert archivo.metadata.num_rows == 3
+    assert archivo.num_row_groups == 3
+    assert len(partes) == 4
+
+
+def test_arrow_un_mensaje_por_lote(app, monkeypatch):
+    partes, contenido = _exportar(FormatoExportEnum.arrow, monkeypatch)
+    lector = pa.ipc.open_stream(contenido)
+    assert [lote.num_rows for lote in lector] == [1, 1, 1]
+    assert len(partes) == 4
+
+
+def test_exportacion_de_alquileres_sin_limite_json(cliente, monkeypatch):
+    capturados = []
+    original = export.exportar_consulta
+    monkeypatch.setattr(
+        "app.routers.alquileres.exportar_consulta",
+        lambda db, stmt, *args: capturados.append(stmt) or original(db, stmt, *args),
+    )
+    respuesta = cliente.get("/alquileres/", params={"format": "parquet"})
+    assert respuesta.status_code == 200
+    assert capturados[0]._limit_clause is None
+    with SessionLocal() as db:
+        total = db.query(Alquiler).count()
+    assert pa.parquet.read_table(io.BytesIO(respuesta.content)).num_rows == total
@@ -0,0 +1,71 @@
+"""
+ECO-MOVE API - Pruebas del Perfilado bajo demanda
+El perfil cpu no debe incluir hilos ajenos a la solicitud; alloc informa el pico.
+"""
+import os
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.profiling import PerfiladoMiddleware
+
+
+def _endpoint_lento() -> dict:
+    fin = time.perf_counter() + 0.3
+    while time.perf_counter() < fin:
+        pass
+    return {"ok": True}
+
+
+def _ocupado_ajeno(parar: threading.Event) -> None:
+    while not parar.is_set():
+        pass
+
+
+def _temporal_grande() -> dict:
+    bloque = bytearray(8 * 1024 * 1024)
+    del bloque
+    return {"ok": True}
+
+
+@pytest.fixture
+def perfilado(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling.settings, "profiling_dir", str(tmp_path))
+    monkeypatch.setattr(profiling.settings, "profiling_interval_ms", 5)
+    monkeypatch.setattr(profiling, "_autorizar", lambda headers: None)
+    app = FastAPI()
+    app.get("/lento")(_endpoint_lento)
+    app.get("/temporal")(_temporal_grande)
+    with TestClient(PerfiladoMiddleware(app)) as cliente:
+        yield cliente, tmp_path
+
+
+def test_cpu_solo_hilos_de_la_solicitud(perfilado):
+    cliente, directorio = perfilado
+    parar = threading.Event()
+    ajeno = threading.Thread(target=_ocupado_ajeno, args=(parar,), name="ajeno")
+    ajeno.start()
+    try:
+        respuesta = cliente.get("/lento", headers={"X-Profile": "cpu"})
+    finally:
+        parar.set()
+        ajeno.join()
+    assert respuesta.status_code == 200
+    folded = (directorio / respuesta.headers["x-profile-id"]).read_text()
+    assert "_endpoint_lento" in folded
+    assert "_ocupado_ajeno" not in folded
+
+
+def test_alloc_informa_el_pico(perfilado):
+    cliente, directorio = perfilado
+    respuesta = cliente.get("/temporal", headers={"X-Profile": "alloc"})
+    assert respuesta.status_code == 200
+    nombre = respuesta.headers["x-profile-id"].replace(".folded", ".top.txt")
+    resumen = (directorio / nombre).read_text().splitlines()[0]
+    pico_kib = float(resumen.split()[1])
+    assert pico_kib >= 8 * 1024
+    assert os.path.isfile(directorio / respuesta.headers["x-profile-id"])
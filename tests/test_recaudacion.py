@@ -0,0 +1,38 @@
+"""
+ECO-MOVE API - Pruebas del Acumulado de Recaudación
+El acumulado incremental, la reconstrucción y el llenado inicial coinciden.
+"""
+from datetime import date, timedelta
+
+from app.database import SessionLocal, engine, init_db
+from app.models import RecaudacionPeriodo
+from app.services import reconstruir_recaudacion
+
+
+def _acumulado() -> set:
+    with SessionLocal() as db:
+        return {
+            (f.granularidad, f.periodo, f.vehiculo_id, f.alquileres, f.importe, f.descuentos, f.depositos, f.multas)
+            for f in db.query(RecaudacionPeriodo)
+        }
+
+
+def test_llenado_inicial_y_reconstruccion(cliente):
+    inicio = date.today()
+    respuesta = cliente.post("/alquileres/", json={
+        "cliente_id": 1, "vehiculo_id": 1,
+        "fecha_inicio": inicio.isoformat(),
+        "fecha_tentativa_devolucion": (inicio + timedelta(days=6)).isoformat(),
+    })
+    assert respuesta.status_code in (200, 201), respuesta.text
+    incremental = _acumulado()
+    assert {g for g, *_ in incremental} == {"dia", "semana", "mes"}
+
+    with SessionLocal() as db:
+        reconstruir_recaudacion(db)
+    assert _acumulado() == incremental
+
+    # Base existente sin la tabla: init_db la crea y la llena con el historial
+    RecaudacionPeriodo.__table__.drop(engine)
+    init_db()
+    assert _acumulado() == incremental
@@ -0,0 +1,70 @@
+"""
+ECO-MOVE API - Pruebas de Carga de Relaciones
+Las relaciones son lazy="raise": un acceso sin cargar (un O(historial) accidental)
+debe fallar aquí y no pasar desapercibido en producción.
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app.database import SessionLocal
+from app.models import Alquiler, Cliente, Devolucion, Usuario, Vehiculo
+
+
+@pytest.mark.parametrize("modelo, relacion", [
+    (Cliente, "alquileres"),
+    (Cliente, "usuario"),
+    (Vehiculo, "alquileres"),
+    (Usuario, "cliente"),
+])
+def test_relacion_sin_cargar_falla(app, modelo, relacion):
+    with SessionLocal() as db:
+        fila = db.query(modelo).first()
+        with pytest.raises(InvalidRequestError):
+            getattr(fila, relacion)
+
+
+def _ok(respuesta, esperado=200):
+    assert respuesta.status_code == esperado, respuesta.text
+    return respuesta.json()
+
+
+def test_endpoints_cargan_sus_relaciones(cliente):
+    hoy = date.today()
+    nuevo_cliente = _ok(cliente.post("/clientes/", json={
+        "dni": "5550001", "nombre": "Rita", "apellido": "Lazo", "fecha_nacimiento": "1992-05-05",
+    }), 201)
+    nuevo_vehiculo = _ok(cliente.post("/vehiculos/", json={
+        "codigo": "REL1", "nombre": "Vehículo relaciones", "tarifa_diaria": "12.50",
+    }), 201)
+    alquiler = _ok(cliente.post("/alquileres/", json={
+        "cliente_id": nuevo_cliente["id"], "vehiculo_id": nuevo_vehiculo["id"],
+        "fecha_inicio": hoy.isoformat(),
+        "fecha_tentativa_devolucion": (hoy + timedelta(days=3)).isoformat(),
+    }), 201)
+
+    assert _ok(cliente.get(f"/alquileres/{alquiler['id']}"))["cliente"]["id"] == nuevo_cliente["id"]
+    _ok(cliente.get("/alquileres/"))
+    _ok(cliente.get("/alquileres/activos"))
+    _ok(cliente.get("/alquileres/", params={"fields": "id,estado"}))
+    _ok(cliente.get("/alquileres/", params={"fields": "id", "expand": "cliente,vehiculo"}))
+    _ok(cliente.get("/alquileres/activos", params={"expand": "vehiculo"}))
+    por_ids = _ok(cliente.get("/alquileres/", params={"ids": f"{alquiler['id']},999999"}))
+    assert por_ids[str(alquiler["id"])]["vehiculo"]["id"] == nuevo_vehiculo["id"]
+    assert por_ids["999999"] is None
+
+    devolucion = _ok(cliente.post("/devoluciones/", json={
+        "alquiler_id": alquiler["id"], "fecha_devolucion_real": hoy.isoformat(),
+    }), 201)
+    _ok(cliente.get(f"/devoluciones/{devolucion['id']}"))
+    _ok(cliente.get("/devoluciones/"))
+    _ok(cliente.get("/devoluciones/", params={"fields": "id", "expand": "alquiler.cliente,alquiler.vehiculo"}))
+
+    _ok(cliente.get(f"/clientes/{nuevo_cliente['id']}"))
+    _ok(cliente.get("/clientes/", params={"ids": str(nuevo_cliente["id"])}))
+    _ok(cliente.get(f"/vehiculos/{nuevo_vehiculo['id']}"))
+    _ok(cliente.get("/vehiculos/", params={"ids": str(nuevo_vehiculo["id"])}))
+
+    _ok(cliente.delete(f"/clientes/{nuevo_cliente['id']}"))
+    _ok(cliente.delete(f"/vehiculos/{nuevo_vehiculo['id']}"))
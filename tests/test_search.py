@@ -0,0 +1,116 @@
+"""
+ECO-MOVE API - Pruebas de la Búsqueda de Clientes
+Ranking del índice de prefijos en memoria y búsqueda sin tildes. Los casos de
+CASOS_COMUNES se corren también contra la consulta de trigramas si TEST_POSTGRES_URL
+apunta a una base PostgreSQL desechable (se crean y borran usuarios y clientes).
+"""
+import os
+from collections import namedtuple
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import Cliente, Usuario
+from app.search import DDL_TRIGRAMAS, _buscar_trigramas, _IndicePrefijos, normalizar
+
+Fila = namedtuple("Fila", "id nombre apellido dni telefono email")
+
+FILAS = [
+    Fila(1, "María", "Pérez", "10000001", "0991-234-567", "maria.perez@mail.com"),
+    Fila(2, "Mariana", "Peralta", "10000002", None, None),
+    Fila(3, "José", "García", "10000003", None, "jgarcia@mail.com"),
+    Fila(4, "Mario", "Pereira", "10000004", None, None),
+    Fila(5, "Ana", "Letra", "AB123456", None, None),
+]
+
+# (búsqueda, primer resultado) que ambos backends deben resolver igual
+CASOS_COMUNES = [
+    ("perez", 1),
+    ("gárcía", 3),
+    ("maria", 1),
+    ("10000003", 3),
+    ("ab123456", 5),
+    ("0991234", 1),
+    ("jgarcia@", 3),
+]
+
+
+def test_normalizar():
+    assert normalizar("  PÉREZ Muñoz ") == "  perez munoz "
+
+
+def test_sin_tildes_en_ambos_sentidos():
+    indice = _IndicePrefijos(FILAS)
+    assert indice.buscar("perez", 10) == [1]
+    assert indice.buscar("gárcía", 10) == [3]
+    assert indice.buscar("JOSE", 10) == [3]
+
+
+def test_exacto_antes_que_prefijo():
+    indice = _IndicePrefijos(FILAS)
+    # "maria" es exacto para 1 y prefijo de "mariana" para 2; "mario" no coincide
+    assert indice.buscar("maria", 10) == [1, 2]
+    # Todos los términos deben coincidir; los puntajes se suman
+    assert indice.buscar("mari per", 10) == [1, 2, 4]
+    assert indice.buscar("mari pera", 10) == [2]
+    assert indice.buscar("maria perez", 1) == [1]
+
+
+def test_dni_telefono_y_email():
+    indice = _IndicePrefijos(FILAS)
+    assert indice.buscar("10000003", 10) == [3]
+    assert indice.buscar("0991234", 10) == [1]
+    assert indice.buscar("jgarcia@", 10) == [3]
+
+
+def test_quitar_y_agregar():
+    indice = _IndicePrefijos(FILAS)
+    indice.quitar(1)
+    assert indice.buscar("perez", 10) == []
+    indice.agregar(Fila(1, "María", "Ramírez", "10000001", None, None))
+    assert indice.buscar("ramirez", 10) == [1]
+    assert indice.buscar("maria", 10) == [1, 2]
+
+
+def test_endpoint(cliente):
+    assert cliente.get("/clientes/buscar", params={"q": "pe"}).status_code == 422
+    respuesta = cliente.get("/clientes/buscar", params={"q": "perez"})
+    assert respuesta.status_code == 200
+    assert [c["apellido"] for c in respuesta.json()] == ["Pérez"]
+
+
+@pytest.fixture(scope="module")
+def sesion_postgres():
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL no definida")
+    engine = create_engine(url)
+    tablas = [Usuario.__table__, Cliente.__table__]
+    Base.metadata.create_all(engine, tables=tablas)
+    try:
+        with engine.begin() as conn:
+            for sentencia in DDL_TRIGRAMAS:
+                conn.execute(text(sentencia))
+        with Session(engine) as db:
+            db.add_all([Cliente(**fila._asdict(), fecha_nacimiento=date(1990, 1, 1)) for fila in FILAS])
+            db.commit()
+            yield db
+    finally:
+        Base.metadata.drop_all(engine, tables=tablas)
+        engine.dispose()
+
+
+@pytest.fixture(params=["memoria", "postgres"])
+def buscar(request):
+    if request.param == "memoria":
+        return _IndicePrefijos(FILAS).buscar
+    db = request.getfixturevalue("sesion_postgres")
+    return lambda q, limit: _buscar_trigramas(db, q, limit)
+
+
+@pytest.mark.parametrize("q, primero", CASOS_COMUNES)
+def test_mismo_primer_resultado_en_ambos_backends(buscar, q, primero):
+    assert buscar(q, 10)[0] == primero